@@ -7,6 +7,9 @@ from client.client_file_manager import OpenYaML, get_available_models, get_model
 from client.client_trainer import ClientTrainer
 from utils.logger import FedLogger
 
+# cancellations kept for rounds that have not started, oldest dropped first
+MAX_CANCELLED_ROUNDS = 64
+
 
 class Client:
     def __init__(
@@ -25,6 +28,10 @@ class Client:
         self.train_loader, self.test_loader = None, None
         self.logger = FedLogger(id=client_id, loggername="CLIENT")
         self.dataset_id = None
+        # {(session_id, round_idx): ClientTrainer} of the rounds in progress,
+        # and, oldest first, the rounds cancelled before their trainer was set up
+        self.trainers = dict()
+        self.cancelled_rounds = dict()
 
     def StreamFile(self):
         pass
@@ -131,6 +138,7 @@ class Client:
         timeout_duration_s: float = None,
         max_epochs: int = None,
         max_mini_batches: int = None,
+        training_key: tuple = None,
     ):
         model_dir_path: str = join(self.temp_dir_path, "model_cache", model_id)
 
@@ -197,21 +205,45 @@ class Client:
                     "fedclient.StartTraining.DataLoader", f"Loaded default Dataloader"
                 )
 
-        result = model_trainer.train_model(
-            train_loader=self.train_loader,
-            test_loader=self.test_loader,
-            lr=learning_rate,
-            num_epochs=num_epochs,
-            timeout_duration_s=timeout_duration_s,
-            max_mini_batches=max_mini_batches,
-            max_epochs=max_epochs,
-            model_checkpoint=model_wts,
-        )
+        self.trainers[training_key] = model_trainer
+        # a cancellation of this round or an earlier one of the session can
+        # no longer be for a round that is still to start
+        for key in list(self.cancelled_rounds):
+            if training_key and key[0] == training_key[0] and key[1] < training_key[1]:
+                self.cancelled_rounds.pop(key, None)
+        if self.cancelled_rounds.pop(training_key, None):
+            model_trainer.stop_training()
+        try:
+            result = model_trainer.train_model(
+                train_loader=self.train_loader,
+                test_loader=self.test_loader,
+                lr=learning_rate,
+                num_epochs=num_epochs,
+                timeout_duration_s=timeout_duration_s,
+                max_mini_batches=max_mini_batches,
+                max_epochs=max_epochs,
+                model_checkpoint=model_wts,
+            )
+        finally:
+            self.trainers.pop(training_key, None)
 
         model_weights = model_trainer.get_model_wts()
 
         return result, model_weights
 
+    def CancelTraining(self, training_key: tuple) -> bool:
+        """Stops the round "training_key" at its next mini batch, so that it
+        returns what it has trained so far. Returns False if the round has
+        not started yet, it is then stopped as soon as it does."""
+        model_trainer = self.trainers.get(training_key)
+        if model_trainer is None:
+            self.cancelled_rounds[training_key] = True
+            while len(self.cancelled_rounds) > MAX_CANCELLED_ROUNDS:
+                self.cancelled_rounds.pop(next(iter(self.cancelled_rounds)), None)
+            return False
+        model_trainer.stop_training()
+        return True
+
     def Validate(
         self,
         model_id: str,
@@ -160,18 +160,14 @@ class ClientGRPCManager(grpc_pb2_grpc.EdgeServiceServicer):
         loss_function = p_loads(request.loss_function)
         optimizer = p_loads(request.optimizer)
 
-        if request.timeout_duration_s:
-            max_mini_batches = None
+        # the round is bounded either by time or by a mini-batch budget
+        max_mini_batches = None
+        max_epochs = None
+        budget = request.WhichOneof("request")
+        if budget == "timeout_duration_s":
             timeout_duration_s = request.timeout_duration_s
-            max_epochs = None
-        elif request.max_epochs:
-            max_mini_batches = None
-            timeout_duration_s = None
-            max_epochs = request.max_epochs
-        else:
-            max_mini_batches = request.max_mini_batches
-            timeout_duration_s = None
-            max_epochs = None
+        elif budget == "max_mini_batch_count":
+            max_mini_batches = request.max_mini_batch_count
 
         self.logger.debug("fedclient.gRPC.train.round.model", model_id)
         print(f"\nfedclient.gRPC.train.round:: Training Round:{round_id}")
@@ -195,6 +191,7 @@ class ClientGRPCManager(grpc_pb2_grpc.EdgeServiceServicer):
             timeout_duration_s=timeout_duration_s,
             max_epochs=max_epochs,
             max_mini_batches=max_mini_batches,
+            training_key=(request.session_id, round_id),
         )
         print("[FLOW] client_grpc_manager.py: Local training finished")
 
@@ -229,6 +226,14 @@ class ClientGRPCManager(grpc_pb2_grpc.EdgeServiceServicer):
                 "fedclient.gRPC.train.response.time", f"{time()-response_time}"
             )
 
+    def CancelTraining(self, request, context) -> grpc_pb2.CancelTrainingResponse:
+        self.logger.info(
+            "fedclient.gRPC.train.cancel",
+            f"session_id-round_no,{request.session_id},{request.round_idx}",
+        )
+        cancelled = self.client.CancelTraining((request.session_id, request.round_idx))
+        return grpc_pb2.CancelTrainingResponse(cancelled=cancelled)
+
     def StartValidation(self, request, context) -> grpc_pb2.InitValidationResponse:
         self.logger.info("fedclient.gRPC.validation.round.init", "")
         grpc_validation_time = time()
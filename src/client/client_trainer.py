@@ -78,6 +78,8 @@ class ClientTrainer:
         start_time,
         timeout_duration_s,
     ):
+        # "num_mini_batches" counts over all epochs of the round, so that
+        # "max_mini_batches" is a budget for the whole round
         exit_flag = False
         if max_mini_batches and (num_mini_batches >= max_mini_batches):
             exit_flag = True
@@ -147,7 +149,7 @@ class ClientTrainer:
                     epochs,
                     max_epochs,
                     max_mini_batches,
-                    num_mini_batches,
+                    total_num_mini_batches,
                     start_time,
                     timeout_duration_s,
                 )
@@ -186,7 +188,7 @@ class ClientTrainer:
                     epochs,
                     max_epochs,
                     max_mini_batches,
-                    num_mini_batches,
+                    total_num_mini_batches,
                     start_time,
                     timeout_duration_s,
                 )
@@ -194,12 +196,15 @@ class ClientTrainer:
                     break
 
                 if self.stop_training_flag:
+                    # stopped by the server, report the partial round with the
+                    # same keys as a full one
                     return {
-                        "run_time": (time.time() - start_time),
+                        "time_taken_s": (time.time() - start_time),
                         "num_epochs": float_epochs,
-                        "total_num_minibatches": total_num_mini_batches,
+                        "total_mini_batches": total_num_mini_batches,
                         "loss": avg_loss,
                         "accuracy": total_accuracy,
+                        "stopped": True,
                     }
             if exit_flag:
                 break
@@ -6,15 +6,25 @@ Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/L
 """
 
 import asyncio
+import json
 from argparse import ArgumentParser
 from os import getpid
-from threading import Event
+from threading import Lock, Thread
+from time import time
 from uuid import uuid4
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from waitress import serve
 
 from server.server_file_manager import OpenYaML
+from server.server_job_queue import (
+    CANCELLED,
+    FAILED,
+    FINISHED,
+    QUEUED,
+    TERMINAL,
+    to_native,
+)
 from server.server_manager import FlotillaServerManager
 from utils.monitor import Monitor
 
@@ -22,8 +32,12 @@ app = Flask("flo_server")
 
 
 process_id: int = getpid()
-session_running = Event()
 server_config = OpenYaML("./config/server_config.yaml")
+restful_config: dict = server_config["comm_config"]["restful"]
+cancel_timeout: float = server_config["comm_config"]["grpc"].get("cancel_timeout_s", 10)
+scheduler_poll_s: float = 1.0
+sse_poll_s: float = restful_config.get("sse_poll_s", 1.0)
+sse_keepalive_s: float = 15.0
 
 parser = ArgumentParser()
 parser.add_argument(
@@ -38,6 +52,12 @@ if is_monitoring:
     monitor = Monitor("0", process_id)
 
 
+# {session_id: (loop, task)} of the running sessions, to cancel them from
+# a request thread
+running_tasks = dict()
+running_tasks_lock = Lock()
+
+
 def handle_request(
     session_id,
     session_config,
@@ -45,67 +65,261 @@ def handle_request(
     revive=False,
     file=False,
 ):
-    session_running.set()
     if is_monitoring:
         monitor.set_session(session_id)
     print("Starting Session:", session_id)
+    # every session runs on its own event loop in its own thread
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    task = loop.create_task(
+        flo_server.run(session_id, session_config, restore, revive, file)
+    )
+    with running_tasks_lock:
+        running_tasks[session_id] = (loop, task)
+    status, fields = FAILED, dict()
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(
-            asyncio.gather(
-                flo_server.run(session_id, session_config, restore, revive, file)
-            )
-        )
+        fields["results"] = loop.run_until_complete(task)
+        status = FINISHED
     except asyncio.CancelledError:
         print("Session Cancelled")
+        status, fields["message"] = CANCELLED, "Cancelled while running"
     except KeyboardInterrupt:
         print("Received KeyboardInterrupt")
+        fields["message"] = "Interrupted"
     except Exception as e:
         print(e)
         print("Exception in Gather loop")
+        fields["message"] = str(e)
     finally:
-        session_running.clear()
-        if is_monitoring:
+        with running_tasks_lock:
+            running_tasks.pop(session_id, None)
+        # let a cancelled session tell its clients to stop training
+        pending = asyncio.all_tasks(loop)
+        if pending:
+            loop.run_until_complete(asyncio.wait(pending, timeout=cancel_timeout))
+            for leftover in pending:
+                leftover.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*pending, return_exceptions=True)
+            )
+        loop.close()
+        flo_server.jobs.finish(session_id, status, **fields)
+        if is_monitoring and not flo_server.running_sessions():
             monitor.reset_session()
-        return session_id
+    return session_id
+
+
+def run_job(job: dict):
+    data = job["request"]
+    handle_request(
+        session_id=job["session_id"],
+        session_config=data["federated_learning_config"],
+        restore=data["restore"],
+        revive=data["revive"],
+        file=data["file"],
+    )
+
+
+def job_scheduler():
+    """Starts queued sessions, highest priority first, whenever a session
+    slot is free and clients are online."""
+    while True:
+        for job in flo_server.jobs.queued():
+            if len(flo_server.get_active_clients()) == 0:
+                break
+            # no free slot, the job keeps its place in the queue
+            if flo_server.reserve_session(job["session_id"]):
+                break
+            if not flo_server.jobs.start(job["session_id"]):
+                # cancelled since the queue was read
+                flo_server.release_session(job["session_id"])
+                continue
+            print(f"[FLOW] flo_server.py: Starting queued session {job['session_id']}")
+            Thread(
+                target=run_job, args=(job,), name=f"Session_{job['session_id']}"
+            ).start()
+        flo_server.jobs.wait(timeout=scheduler_poll_s)
+
+
+def parse_submission(data) -> dict:
+    """The part of a submission the job queue keeps, or None if "data" is
+    not a valid one."""
+    if not data or "federated_learning_config" not in data:
+        return None
+    return {
+        "federated_learning_config": data["federated_learning_config"],
+        "restore": bool(data.get("restore")),
+        "revive": bool(data.get("revive")),
+        "file": bool(data.get("file")),
+    }
+
+
+def describe(job: dict) -> dict:
+    """A job as reported by the REST API, with its place in the queue or the
+    progress of its running session."""
+    job = {
+        key: value for key, value in job.items() if key not in ("request", "metrics")
+    }
+    if job["status"] == QUEUED:
+        job["position"] = flo_server.jobs.position(job["session_id"])
+    session = flo_server.get_session(job["session_id"])
+    if session is not None:
+        job["progress"] = session.progress()
+    return to_native(job)
+
+
+def sse(event: str, data, id=None) -> str:
+    message = f"event: {event}\n"
+    if id is not None:
+        message += f"id: {id}\n"
+    return message + f"data: {json.dumps(to_native(data), default=str)}\n\n"
+
+
+def session_event_stream(session_id, next_round=None):
+    """
+    Server-sent events of session "session_id": a "metrics" event with the
+    global validation metrics of every round, "progress" whenever the
+    session moves to another round, and "status" whenever the job's status
+    changes. The stream ends with the final status. Once the session is
+    over its metrics are read from the job record, so a stream opened after
+    the session finished replays them.
+    """
+    status, round_no, last_sent = None, None, time()
+    while True:
+        # the job record is read before the session registry: a session
+        # leaves the registry only after its metrics are in the job record
+        job = flo_server.jobs.get(session_id)
+        session = flo_server.get_session(session_id)
+        start = next_round if next_round else 0
+        if session is not None:
+            progress = session.progress(start=start)
+        elif job.get("metrics") is not None:
+            progress = {
+                **job["progress"],
+                "metrics": [entry for entry in job["metrics"] if entry[0] >= start],
+            }
+        else:
+            progress = None
+        if progress is not None:
+            for metrics_round, metrics in progress["metrics"]:
+                yield sse(
+                    "metrics",
+                    {"round_no": metrics_round, "metrics": metrics},
+                    id=metrics_round,
+                )
+                next_round = metrics_round + 1
+                last_sent = time()
+            if progress["round_no"] != round_no:
+                round_no = progress["round_no"]
+                yield sse(
+                    "progress",
+                    {
+                        "round_no": round_no,
+                        "num_training_rounds": progress["num_training_rounds"],
+                    },
+                )
+                last_sent = time()
+        if job["status"] != status:
+            status = job["status"]
+            yield sse("status", describe(job))
+            last_sent = time()
+            if status in TERMINAL:
+                return
+        if time() - last_sent > sse_keepalive_s:
+            yield ": keepalive\n\n"
+            last_sent = time()
+        flo_server.jobs.wait(timeout=sse_poll_s)
+
+
+@app.route("/sessions", methods=["POST"])
+def submit_session():
+    """Queues a session and returns its id without waiting for it to run."""
+    data = request.get_json()
+    submission = parse_submission(data)
+    if submission is None:
+        print("[FLOW] flo_server.py: Received Invalid Request")
+        return jsonify({"message": "Invalid request"}), 400
+    session_id = data.get("session_id") or str(uuid4())
+    job = flo_server.jobs.submit(
+        session_id, submission, priority=int(data.get("priority") or 0)
+    )
+    if job is None:
+        return (
+            jsonify({"message": f"Session {session_id} is already queued or running"}),
+            409,
+        )
+    print(f"[FLOW] flo_server.py: Queued session {session_id}")
+    return jsonify(describe(job)), 202
+
+
+@app.route("/sessions", methods=["GET"])
+def list_sessions():
+    return jsonify([describe(job) for job in flo_server.jobs.jobs()]), 200
+
+
+@app.route("/sessions/<session_id>", methods=["GET"])
+def session_status(session_id):
+    job = flo_server.jobs.get(session_id)
+    if job is None:
+        return jsonify({"message": f"No session {session_id}"}), 404
+    return jsonify(describe(job)), 200
+
+
+@app.route("/sessions/<session_id>/cancel", methods=["POST"])
+def cancel_session(session_id):
+    if flo_server.jobs.cancel(session_id):
+        return jsonify(describe(flo_server.jobs.get(session_id))), 200
+    with running_tasks_lock:
+        running = running_tasks.get(session_id)
+    if running:
+        loop, task = running
+        loop.call_soon_threadsafe(task.cancel)
+        return jsonify({"session_id": session_id, "status": "cancelling"}), 202
+    job = flo_server.jobs.get(session_id)
+    if job is None:
+        return jsonify({"message": f"No session {session_id}"}), 404
+    return jsonify({"message": f"Session {session_id} is {job['status']}"}), 409
+
+
+@app.route("/sessions/<session_id>/events", methods=["GET"])
+def session_events(session_id):
+    if flo_server.jobs.get(session_id) is None:
+        return jsonify({"message": f"No session {session_id}"}), 404
+    # a reconnecting client resumes after the last round it has seen
+    last_event_id = request.headers.get("Last-Event-ID")
+    next_round = int(last_event_id) + 1 if last_event_id else None
+    return Response(
+        session_event_stream(session_id, next_round),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/execute_command", methods=["POST"])
 def execute_command():
+    """Queues a session like POST /sessions and holds the request until the
+    session is over."""
     print("\n[FLOW] flo_server.py: Received request at /execute_command")
     data = request.get_json()
-    if session_running.is_set():
-        print("[FLOW] flo_server.py: Session Already Running")
-        return jsonify({"message": "A session is already running"}), 400
-    elif len(flo_server.get_active_clients()) == 0:
+    submission = parse_submission(data)
+    if len(flo_server.get_active_clients()) == 0:
         print("[FLOW] flo_server.py: No active clients")
         return jsonify({"message": "No active clients"}), 400
-    elif data and "federated_learning_config" in data:
-        print("[FLOW] flo_server.py: Processing federated_learning_config")
-        session_config = data["federated_learning_config"]
-
-        if (data["file"] or data["restore"] or data["revive"]) and data["session_id"]:
-            restore_session_id = data["session_id"]
-            print(f"[FLOW] flo_server.py: Restoring/Reviving session {restore_session_id}")
-            session_id = handle_request(
-                session_id=restore_session_id,
-                session_config=session_config,
-                restore=data["restore"],
-                revive=data["revive"],
-                file=data["file"],
-            )
-        elif data["session_id"]:
-            session_id = data["session_id"]
-            print(f"[FLOW] flo_server.py: Starting new session {session_id}")
-            handle_request(session_id=session_id,session_config=session_config)
-
-        print(f"[FLOW] flo_server.py: Session {session_id} finished execution")
-        return jsonify({"message": f"Session {session_id} finished"}), 200
-    else:
+    elif submission is None or not data.get("session_id"):
         print("[FLOW] flo_server.py: Received Invalid Request")
         return jsonify({"message": "Invalid request"}), 400
 
+    session_id = data["session_id"]
+    if flo_server.jobs.submit(session_id, submission) is None:
+        message = f"Session {session_id} is already queued or running"
+        print(f"[FLOW] flo_server.py: {message}")
+        return jsonify({"message": message}), 400
+    while flo_server.jobs.get(session_id)["status"] not in TERMINAL:
+        flo_server.jobs.wait(timeout=scheduler_poll_s)
+
+    print(f"[FLOW] flo_server.py: Session {session_id} finished execution")
+    return jsonify({"message": f"Session {session_id} finished"}), 200
+
 
 def main():
     print("\n[FLOW] flo_server.py: Starting FLo_Server")
@@ -127,10 +341,13 @@ def main():
     global flo_server
     flo_server = FlotillaServerManager(server_config)
     print("[FLOW] flo_server.py: FlotillaServerManager initialized")
+    Thread(target=job_scheduler, name="Job_Scheduler_Thread", daemon=True).start()
     serve(
         app,
-        host=server_config["comm_config"]["restful"]["rest_hostname"],
-        port=server_config["comm_config"]["restful"]["rest_port"],
+        host=restful_config["rest_hostname"],
+        port=restful_config["rest_port"],
+        # open event streams and /execute_command calls each hold a thread
+        threads=restful_config.get("threads", 8),
     )
     print("[FLOW] flo_server.py: Server stopped")
 
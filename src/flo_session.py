@@ -6,6 +6,7 @@ Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/L
 """
 
 import argparse
+import json
 import pprint
 import sys
 from uuid import uuid4
@@ -65,6 +66,20 @@ parser.add_argument(
     help="Port of the Federated Learning Server REST API (default: 12345)",
 )
 
+parser.add_argument(
+    "--priority",
+    type=int,
+    default=0,
+    help="Priority of the session in the server's queue, higher runs first (default: 0)",
+)
+
+parser.add_argument(
+    "--follow",
+    action="store_true",
+    default=False,
+    help="Stay attached after submitting and print the session's progress and per-round metrics until it is over",
+)
+
 # Legacy argument support (optional)
 parser.add_argument(
     "--federated_server_endpoint",
@@ -82,10 +97,11 @@ else:
     # Use new arguments
     endpoint = f"{args.server_ip}:{args.server_port}"
 
-api_url = f"http://{endpoint}/execute_command"
+api_url = f"http://{endpoint}/sessions"
 
 federated_learning_config = dict()
 federated_learning_config["session_id"] = str(uuid4())
+federated_learning_config["priority"] = args.priority
 
 with open(args.config_path) as file:
     federated_learning_config["federated_learning_config"] = yaml.safe_load(file)
@@ -107,14 +123,42 @@ if args.file:
 else:
     federated_learning_config["file"] = False
 
+
+def follow(session_id):
+    """Prints the server-sent events of the session until it is over."""
+    with requests.get(f"{api_url}/{session_id}/events", stream=True) as events:
+        event = None
+        for line in events.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:") :])
+                if event == "metrics":
+                    print(f"Round {data['round_no']}: {data['metrics']}")
+                elif event == "progress":
+                    print(
+                        f"Training round {data['round_no']} of {data['num_training_rounds']}"
+                    )
+                elif event == "status":
+                    print(f"Session {session_id} is {data['status']}")
+                    if data.get("message"):
+                        print(data["message"])
+
+
 # Send a POST request with the dictionary as JSON data
 try:
     pprint.pprint(federated_learning_config)
     print(f"\n[FLOW] flo_session.py: Sending POST request to {api_url}")
     response = requests.post(api_url, json=federated_learning_config)
-    if response.status_code == 200:
-        print("[FLOW] flo_session.py: Request was successful!")
+    if response.status_code == 202:
+        print("[FLOW] flo_session.py: Session queued!")
         print("Response JSON:", response.json())
+        session_id = response.json()["session_id"]
+        print(f"Status:  GET  {api_url}/{session_id}")
+        print(f"Events:  GET  {api_url}/{session_id}/events")
+        print(f"Cancel:  POST {api_url}/{session_id}/cancel")
+        if args.follow:
+            follow(session_id)
     else:
         print(f"[FLOW] flo_session.py: Request failed with status code {response.status_code}")
         print("Response JSON:", response.json())
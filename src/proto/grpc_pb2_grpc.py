@@ -39,6 +39,11 @@ class EdgeServiceStub(object):
                 request_serializer=grpc__pb2.InitValidationRequest.SerializeToString,
                 response_deserializer=grpc__pb2.InitValidationResponse.FromString,
                 )
+        self.CancelTraining = channel.unary_unary(
+                '/EdgeService/CancelTraining',
+                request_serializer=grpc__pb2.CancelTrainingRequest.SerializeToString,
+                response_deserializer=grpc__pb2.CancelTrainingResponse.FromString,
+                )
 
 
 class EdgeServiceServicer(object):
@@ -74,6 +79,12 @@ class EdgeServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def CancelTraining(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_EdgeServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -102,6 +113,11 @@ def add_EdgeServiceServicer_to_server(servicer, server):
                     request_deserializer=grpc__pb2.InitValidationRequest.FromString,
                     response_serializer=grpc__pb2.InitValidationResponse.SerializeToString,
             ),
+            'CancelTraining': grpc.unary_unary_rpc_method_handler(
+                    servicer.CancelTraining,
+                    request_deserializer=grpc__pb2.CancelTrainingRequest.FromString,
+                    response_serializer=grpc__pb2.CancelTrainingResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'EdgeService', rpc_method_handlers)
@@ -196,3 +212,20 @@ class EdgeService(object):
             grpc__pb2.InitValidationResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CancelTraining(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/EdgeService/CancelTraining',
+            grpc__pb2.CancelTrainingRequest.SerializeToString,
+            grpc__pb2.CancelTrainingResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
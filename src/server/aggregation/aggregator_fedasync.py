@@ -5,6 +5,9 @@ Copyright 2023 Indian Institute of Science
 Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
 """
 
+# updates trained on an older global model are folded in by staleness
+ACCEPTS_STALE_UPDATES = True
+
 
 def aggregate(
     session_id,
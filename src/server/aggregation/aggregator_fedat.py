@@ -3,6 +3,10 @@ from collections import OrderedDict
 import numpy as np
 from torch import zeros
 
+# tiers finish at their own pace, so an update for an older round still
+# counts towards its tier
+ACCEPTS_STALE_UPDATES = True
+
 
 def aggregate(
     session_id,
@@ -47,17 +51,37 @@ def aggregate(
 
         return global_model
 
-    aggregator_state.put(f"clientweights_{client_id}", client_local_weights)
-
-    client_to_tier_dict = client_selection_state.get("client_to_tier_id_dict")
-    num_tiers = len(np.unique(list(client_to_tier_dict.values())))
-
-    tier = client_to_tier_dict[client_id]
+    if client_active:
+        aggregator_state.put(f"clientweights_{client_id}", client_local_weights)
+
+    num_tiers = client_selection_state.get("num_tiers")
+
+    # tiers can be reclustered while a client trains, so the update belongs to
+    # the tier the client was selected for rather than its current tier
+    tier = None
+    for i in range(num_tiers):
+        if client_id in client_selection_state.get(f"selected_clients_tier_{i}"):
+            tier = i
+            break
+    if tier is None:
+        print(f"AGGREGATOR.FEDAT:: {client_id} is not selected in any tier")
+        aggregator_state.deletebykey(f"clientweights_{client_id}")
+        return None
 
     selected_clients_in_tier = client_selection_state.get(
         f"selected_clients_tier_{tier}"
     )
 
+    if not client_active:
+        # a dropped client is no longer waited for, its tier is aggregated
+        # from the clients that remain
+        selected_clients_in_tier.remove(client_id)
+        client_selection_state.put(
+            f"selected_clients_tier_{tier}", selected_clients_in_tier
+        )
+        if not selected_clients_in_tier:
+            return None
+
     print("-------------------------- Aggregrator -----------------------")
     client_id_recv_weights = [
         c for c in aggregator_state.keys() if "clientweights" in c
@@ -69,7 +93,9 @@ def aggregate(
         f"clientweights_{c}" in client_id_recv_weights for c in selected_clients_in_tier
     ):
         tier_model = OrderedDict()
-        client_local_weights = aggregator_state.get(f"clientweights_{client_id}")
+        client_local_weights = aggregator_state.get(
+            f"clientweights_{selected_clients_in_tier[0]}"
+        )
 
         for layer in client_local_weights:
             shape = client_local_weights[layer].shape
@@ -29,9 +29,7 @@ def aggregate(
     finished_clients = list(aggregator_state.keys())
     print("FINISHED CLIENTS", finished_clients)
 
-    active_clients = [
-        c for c in client_info.keys() if client_info.get(f"{c}.is_active")
-    ]
+    active_clients = client_info.active_clients()
 
     selected_clients = client_selection_state.get("selected_clients")
 
@@ -44,9 +42,13 @@ def aggregate(
             print("EXCEPTION E", e)
 
     clients_to_wait_for = [c for c in selected_clients if c in active_clients]
+    # with over-commit the round closes once the first "round_quorum" of the
+    # selected clients have returned
+    quorum = client_selection_state.get("round_quorum")
 
-    if len(finished_clients) > 0 and all(
-        c in finished_clients for c in clients_to_wait_for
+    if len(finished_clients) > 0 and (
+        all(c in finished_clients for c in clients_to_wait_for)
+        or (quorum and len(finished_clients) >= quorum)
     ):
         try:
             print("AGGREGATOR:: Aggregating clients - ", finished_clients)
@@ -64,14 +66,50 @@ def aggregate(
 
             client_weights = list()
 
+            # "weight_by": "work" weighs every update by the samples the
+            # client processed in the round instead of its dataset size, for
+            # rounds bounded by per-client mini-batch budgets
+            weight_by = (
+                args.get("weight_by", "dataset") if isinstance(args, dict) else "dataset"
+            )
+
+            work_done = dict()
+            if weight_by == "work":
+                work_done = {
+                    c: training_state.get(f"{c}.work_done") for c in finished_clients
+                }
+                unreported = [c for c, work in work_done.items() if work is None]
+                if len(unreported) == len(finished_clients) or not any(
+                    work_done.values()
+                ):
+                    # nothing to weigh by, every update counts by its dataset
+                    logger.warn(
+                        "fedserver.aggregation.fedavg.no_work_reported",
+                        f"{','.join(str(c) for c in finished_clients)}",
+                    )
+                    weight_by = "dataset"
+                elif unreported:
+                    # samples and dataset sizes are not comparable, so these
+                    # updates are left out of the round
+                    logger.warn(
+                        "fedserver.aggregation.fedavg.work_unreported",
+                        f"{','.join(str(c) for c in unreported)}",
+                    )
+                    finished_clients = [
+                        c for c in finished_clients if c not in unreported
+                    ]
+
             N_k = np.array(list())
             for client_id in finished_clients:
-                N_k = np.append(
-                    N_k,
-                    training_state.get(f"{client_id}.current_dataset_detail")[
-                        "metadata"
-                    ]["num_items"],
-                )
+                if weight_by == "work":
+                    N_k = np.append(N_k, work_done[client_id])
+                else:
+                    N_k = np.append(
+                        N_k,
+                        training_state.get(f"{client_id}.current_dataset_detail")[
+                            "metadata"
+                        ]["num_items"],
+                    )
                 client_weights.append(
                     aggregator_state.get(f"{client_id}.client_local_weights")
                 )
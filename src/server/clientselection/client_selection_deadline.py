@@ -0,0 +1,135 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+
+from server.clientselection.transfer_cost import (
+    get_arg,
+    transfer_preference,
+    transfer_seconds,
+)
+from server.server_availability import stay_online_probabilities
+from server.server_client_view import ClientView, build_client_view
+from server.server_round_time_predictor import predicted_round_times
+
+
+def client_selection(
+    selectable_clients: list,
+    session_id: str,
+    client_info: dict,
+    training_state: dict,
+    training_session: dict,
+    aggregate_state: dict,
+    client_selection_state: dict,
+    args: dict = None,
+    client_view: ClientView = None,
+):
+    """
+    FedAvg style random selection restricted to clients that are predicted to
+    finish before "selection_deadline_s". Clients without any prediction are
+    kept eligible so that they get observed. If too few clients meet the
+    deadline the selection is topped up with the fastest remaining ones. It
+    is separate from the session's "round_deadline_s", which bounds how long
+    the server waits for a round. With
+    "min_stay_online_probability", clients whose availability history makes
+    them unlikely to stay online for their predicted round time are only
+    used as a last resort.
+    """
+    print("CLIENT SELECTION CALLED!")
+    if len(selectable_clients) == 0 or len(aggregate_state.keys()) != 0:
+        return None, None
+
+    try:
+        C = args["client_fraction"]
+    except Exception as e:
+        C = 0.1
+        print(
+            f"CLIENT_SELECTION.DEADLINE:: Exception - {e} \nSetting client_fraction = 0.1"
+        )
+    try:
+        deadline = args["selection_deadline_s"]
+    except Exception as e:
+        deadline = np.inf
+        print(f"CLIENT_SELECTION.DEADLINE:: Exception - {e} \nSetting no deadline")
+    try:
+        z = args["deadline_confidence_z"]
+    except Exception:
+        z = 1.0
+
+    if client_view is None:
+        client_view = build_client_view(selectable_clients, client_info, training_state)
+
+    M = max(1, int(C * len(selectable_clients)))
+    clients = np.array(selectable_clients)
+    predicted = predicted_round_times(client_view, selectable_clients, z)
+    if get_arg(args, "transfer_cost_weight", 0.0):
+        # round times observed so far include the transfers those rounds
+        # needed, so only the clients that have not trained yet are charged
+        transfer = transfer_seconds(
+            selectable_clients,
+            client_info,
+            training_state,
+            training_session,
+            session_id,
+        )
+        rows = client_view.rows(selectable_clients)
+        unobserved = np.isnan(client_view.round_time_mean[rows])
+        if transfer is not None:
+            predicted[unobserved] += np.nan_to_num(transfer[unobserved], nan=0.0)
+    eligible = np.isnan(predicted) | (predicted <= deadline)
+
+    min_availability = get_arg(args, "min_stay_online_probability", None)
+    if min_availability:
+        # a client that is likely to go offline before it would finish only
+        # costs the dispatch and stalls the aggregation
+        stay_online = np.array(
+            stay_online_probabilities(
+                selectable_clients, client_info, predicted.tolist()
+            ),
+            dtype=float,
+        )
+        likely_to_drop = stay_online < min_availability
+        eligible &= ~likely_to_drop
+        predicted[likely_to_drop] = np.inf
+        print(
+            "CLIENT_SELECTION.DEADLINE:: likely to drop = ",
+            clients[likely_to_drop].tolist(),
+        )
+    print(
+        "CLIENT_SELECTION.DEADLINE:: predicted round times = ",
+        dict(zip(selectable_clients, predicted.tolist())),
+    )
+
+    rng = np.random.default_rng()
+    eligible_clients = clients[eligible]
+    if len(eligible_clients) >= M:
+        preference = transfer_preference(
+            eligible_clients,
+            client_info,
+            training_state,
+            training_session,
+            session_id,
+            args,
+        )
+        selected_clients = rng.choice(
+            a=eligible_clients,
+            size=M,
+            replace=False,
+            p=preference / preference.sum(),
+        )
+    else:
+        stragglers = np.argsort(predicted[~eligible])[: M - len(eligible_clients)]
+        selected_clients = np.concatenate(
+            [eligible_clients, clients[~eligible][stragglers]]
+        )
+        print(
+            f"CLIENT_SELECTION.DEADLINE:: only {len(eligible_clients)} clients meet the deadline of {deadline}s"
+        )
+
+    selected_clients = selected_clients.tolist()
+    client_selection_state.put("selected_clients", selected_clients)
+    return selected_clients, None
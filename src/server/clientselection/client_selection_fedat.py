@@ -1,5 +1,31 @@
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+
+from server.clientselection.tiering import IncrementalTiering
+from server.server_client_view import ClientView, build_client_view
+
+
+def init_tier_bookkeeping(
+    num_tiers, session_id, training_session, aggregate_state, client_selection_state
+):
+    """Gives every tier that does not have one yet a tier model, an update
+    count and an empty selection. Tiers dropped by a recluster stay counted
+    until the clients selected for them have reported back, so that their
+    updates still find their tier."""
+    previous_num_tiers = client_selection_state.get("num_tiers") or 0
+    for i in range(previous_num_tiers - 1, num_tiers - 1, -1):
+        if client_selection_state.get(f"selected_clients_tier_{i}"):
+            num_tiers = i + 1
+            break
+    global_model = None
+    for i in range(num_tiers):
+        if client_selection_state.get(f"selected_clients_tier_{i}") is None:
+            client_selection_state.put(f"selected_clients_tier_{i}", [])
+        if aggregate_state.get(f"update_count_tier_{i}") is None:
+            if global_model is None:
+                global_model = training_session.get(f"{session_id}.global_model")
+            aggregate_state.put(f"update_count_tier_{i}", 0)
+            aggregate_state.put(f"tier_model_tier_{i}", global_model)
+    client_selection_state.put("num_tiers", num_tiers)
 
 
 def client_selection(
@@ -11,61 +37,38 @@ def client_selection(
     aggregate_state: dict,
     client_selection_state: dict,
     args: dict = None,
+    client_view: ClientView = None,
 ):
     if len(selectable_clients) == 0:
         return None, None
 
+    try:
+        num_tiers = args["num_tiers"]
+    except Exception as e:
+        num_tiers = 1
+        print(f"CLIENT_SELECTION.FEDAT:: Exception - {e} \nSetting num_tiers = 1")
+    try:
+        drift_threshold = args["tier_drift_threshold"]
+    except Exception:
+        drift_threshold = 0.1
+
+    if client_view is None:
+        client_view = build_client_view(selectable_clients, client_info, training_state)
+    client_latencies = client_view.to_dict(client_view.latency, selectable_clients)
+    print("Client Latencies = ", client_latencies)
+
+    tiering = IncrementalTiering(client_selection_state, num_tiers, drift_threshold)
+
     current_round = training_session.get(f"{session_id}.last_round_number")
     print("CURRENT_ROUND = ", current_round)
     # print(type(aggregate_state))
     if current_round == 0 and len(aggregate_state.keys()) == 0:
-        try:
-            num_tiers = args["num_tiers"]
-        except Exception as e:
-            print(f"CLIENT_SELECTION.TiFL:: Exception - {e} \nSetting num_tiers = 1")
-
-        if len(selectable_clients) < num_tiers:
-            print(
-                "CLIENT_SELECTION.client_selection_tifl_lite:: More num_tiers set than available clients. Setting number of tiers equal to available clients"
-            )
-            num_tiers = len(selectable_clients)
-
-        model_id = training_state.get(f"{selectable_clients[0]}.current_model_id")
-        client_latencies = list()
-        for client in selectable_clients:
-            client_benchmark_info = client_info.get(f"{client}.benchmark_info")[
-                model_id
-            ]
-            client_latency = (
-                client_benchmark_info["time_taken_s"]
-                / client_benchmark_info["num_mini_batches"]
-            ) * 100
-            client_latencies.append(client_latency)
-
-        print("Client Latencies = ", client_latencies)
-
-        reshaped_client_latencies = np.array(client_latencies).reshape(-1, 1)
-        agglomerative = AgglomerativeClustering(
-            n_clusters=num_tiers, metric="euclidean"
-        )
-        client_tiers_id = agglomerative.fit_predict(reshaped_client_latencies)
-        client_to_tier_id = dict()
-
-        for i in range(len(selectable_clients)):
-            client_to_tier_id[selectable_clients[i]] = client_tiers_id[i]
-
+        tiering.fit(client_latencies)
+        num_tiers = tiering.num_tiers
+        client_to_tier_id = tiering.client_to_tier
         print("CLIENT_TO_TIER_ID = ", client_to_tier_id)
 
-        selectable_client_to_tier_id = {
-            c: client_to_tier_id[c] for c in selectable_clients
-        }
-
-        # print("SELECTABLE_CLIENT TO", selectable_client_to_tier_id)
-        tier_ids = np.unique(list(selectable_client_to_tier_id.values()))
-        client_tiers = [list() for i in tier_ids]
-
-        for client_id in selectable_client_to_tier_id.keys():
-            client_tiers[selectable_client_to_tier_id[client_id]].append(client_id)
+        client_tiers = [tiering.tier_members(i) for i in range(num_tiers)]
 
         print("CLIENT_TIERS = ", client_tiers)
 
@@ -77,6 +80,14 @@ def client_selection(
                 f"CLIENT_SELECTION.TIFL:: Exception - {e} \nSetting num_clients_selected_per_tier = minimin tier size = {num_clients}"
             )
 
+        init_tier_bookkeeping(
+            num_tiers,
+            session_id,
+            training_session,
+            aggregate_state,
+            client_selection_state,
+        )
+
         selected_clients = []
         for i, tier in enumerate(client_tiers):
             num_clients = min(len(tier), num_clients)
@@ -87,23 +98,29 @@ def client_selection(
             client_selection_state.put(f"selected_clients_tier_{i}", clients)
 
         print("SELECTED_CLIENTS", selected_clients)
-
-        global_model = training_session.get(f"{session_id}.global_model")
-        for i in range(num_tiers):
-            aggregate_state.put(f"update_count_tier_{i}", 0)
-            aggregate_state.put(
-                f"tier_model_tier_{i}",
-                global_model,
-            )
-        client_selection_state.put("client_to_tier_id_dict", client_to_tier_id)
         return selected_clients, None
 
     else:
-        client_to_tier_dict = client_selection_state.get("client_to_tier_id_dict")
+        # clients that stopped sending heartbeats leave their tier, new and
+        # re-benchmarked clients are placed in the nearest one
+        active_clients = set(client_info.active_clients())
+        tiering.remove([c for c in tiering.clients() if c not in active_clients])
+        if tiering.update(client_latencies):
+            print("CLIENT_SELECTION.FEDAT:: Tiers reclustered")
+        init_tier_bookkeeping(
+            tiering.num_tiers,
+            session_id,
+            training_session,
+            aggregate_state,
+            client_selection_state,
+        )
+        client_to_tier_dict = tiering.client_to_tier
         # active_client_to_tier_id = [client_to_tier_dict[c] for c in selectable_clients]
 
         selectable_client_to_tier_id = {
-            c: client_to_tier_dict[c] for c in selectable_clients
+            c: client_to_tier_dict[c]
+            for c in selectable_clients
+            if c in client_to_tier_dict
         }
         tier_ids = np.unique(list(selectable_client_to_tier_id.values()))
         print("-------------------------- Client Selection -----------------------")
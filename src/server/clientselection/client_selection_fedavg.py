@@ -9,6 +9,8 @@ import math
 
 import numpy as np
 
+from server.clientselection.transfer_cost import transfer_preference
+
 
 def client_selection(
     selectable_clients: list,
@@ -25,9 +27,21 @@ def client_selection(
         C = args["client_fraction"]
         M = max(1, int(C * len(selectable_clients)))
         rng = np.random.default_rng()
+        # uniform unless the session opts into the transfer cost term
+        preference = transfer_preference(
+            selectable_clients,
+            client_info,
+            training_state,
+            training_session,
+            session_id,
+            args,
+        )
         if len(selectable_clients) >= M:
             selected_clients = rng.choice(
-                a=selectable_clients, size=M, replace=False
+                a=selectable_clients,
+                size=M,
+                replace=False,
+                p=preference / preference.sum(),
             ).tolist()
         else:
             return None, None
@@ -9,7 +9,9 @@ import math
 import random
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+
+from server.clientselection.histogram_clustering import cluster_histograms
+from server.server_client_view import ClientView, build_client_view
 
 
 def client_selection(
@@ -21,36 +23,28 @@ def client_selection(
     aggregate_state: dict,
     client_selection_state: dict,
     args: dict = None,
+    client_view: ClientView = None,
 ):
     if len(selectable_clients) == 0:
         return None, None
 
+    if client_view is None:
+        client_view = build_client_view(selectable_clients, client_info, training_state)
+
     def get_client_clusters(num_clusters):
-        client_histograms = dict()
-        unique_labels = []
-        for c in selectable_clients:
-            client_histograms[c] = training_state.get(f"{c}.current_dataset_detail")[
-                "metadata"
-            ]["label_distribution"]
-            unique_labels.extend(client_histograms[c].keys())
-
-        print("CLIENT_HISTOGRAMS = ", client_histograms)
-        unique_labels = list(set(unique_labels))
-
-        client_label_histograms = []
-        for c in selectable_clients:
-            client_label_histograms.append(
-                [
-                    client_histograms[c][x] if x in client_histograms[c].keys() else 0.0
-                    for x in unique_labels
-                ]
-            )
+        client_label_histograms = client_view.label_histograms[
+            client_view.rows(selectable_clients)
+        ]
         print("CLIENT_LABEL_HISTOGRAMS = ", client_label_histograms)
-        agglomerative = AgglomerativeClustering(
-            n_clusters=num_clusters, metric="euclidean"
+        client_to_cluster = cluster_histograms(
+            selectable_clients,
+            client_label_histograms,
+            client_view.labels,
+            num_clusters,
+            client_selection_state,
+            method=args.get("clustering_method", "auto") if args else "auto",
         )
-        agglomerative.fit(client_label_histograms)
-        return agglomerative.labels_
+        return [client_to_cluster[c] for c in selectable_clients]
 
     current_round = training_session.get(f"{session_id}.last_round_number")
     print("CURRENT_ROUND = ", current_round)
@@ -70,18 +64,9 @@ def client_selection(
             for i, client_id in enumerate(selectable_clients):
                 client_to_cluster_dict[client_id] = cluster_labels[i]
             print("CLIENT_TO_CLUSTER_DICT =", client_to_cluster_dict)
-            client_latencies = dict()
-
-            model_id = training_state.get(f"{selectable_clients[0]}.current_model_id")
-            for client in selectable_clients:
-                client_benchmark_info = client_info.get(f"{client}.benchmark_info")[
-                    model_id
-                ]
-                client_latency = (
-                    client_benchmark_info["time_taken_s"]
-                    / client_benchmark_info["num_mini_batches"]
-                ) * 100
-                client_latencies[client] = client_latency
+            client_latencies = client_view.to_dict(
+                client_view.latency, selectable_clients
+            )
 
             print("CLIENT_LATENCIES", client_latencies)
             client_selection_state.put("client_to_cluster_dict", client_to_cluster_dict)
@@ -132,17 +117,18 @@ def client_selection(
         print("CLIENT_LATENCIES = ", client_latencies)
         print("CLIENT_CLUSTERS = ", client_clusters)
 
-        cluster_loss = []
-
+        # clients that have not trained yet have no loss. A cluster none of
+        # whose clients has one is given the mean loss of the other clusters
+        cluster_loss = list()
         for cluster in client_clusters:
-            avg_loss = 0.0
-            for client in cluster:
-                # print(client)
-                # print(training_state.get(f"{client}.training_metrics")[training_state.get(f"{client}.last_round_participated")])
-                avg_loss += training_state.get(f"{client}.training_metrics")[
-                    training_state.get(f"{client}.last_round_participated")
-                ]["loss"]
-            cluster_loss.append(avg_loss / len(cluster))
+            losses = client_view.last_loss[client_view.rows(cluster)]
+            known = losses[~np.isnan(losses)]
+            cluster_loss.append(float(known.mean()) if len(known) else np.nan)
+        known_loss = [loss for loss in cluster_loss if not np.isnan(loss)]
+        default_loss = float(np.mean(known_loss)) if known_loss else 1.0
+        cluster_loss = [
+            default_loss if np.isnan(loss) else loss for loss in cluster_loss
+        ]
 
         print("CLUSTER_LOSS = ", cluster_loss)
         cluster_latency = []
@@ -4,25 +4,29 @@ Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
 Copyright 2023 Indian Institute of Science
 Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
 """
-import copy
 import math
 import random
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+
+from server.clientselection.histogram_clustering import cluster_histograms
+from server.server_client_view import ClientView, build_client_view
 
 
 def client_selection(
-    logger_id: str,
-    client_list: list,
-    client_tiers,
-    client_info,
-    round_no: int,
-    client_state: dict = None,
-    client_session: dict = None,
-    global_model_metrics: dict = None,
+    selectable_clients: list,
+    session_id: str,
+    client_info: dict,
+    training_state: dict,
+    training_session: dict,
+    aggregate_state: dict,
+    client_selection_state: dict,
     args: dict = None,
+    client_view: ClientView = None,
 ):
+    if len(selectable_clients) == 0:
+        return None, None
+
     try:
         percent_clients = args["percentage_client_selection"]
         num_tiers = args["num_tiers"]
@@ -33,8 +37,8 @@ def client_selection(
             f"CLIENT_SELECTION.HACCS_LITE:: Exception - {e} \nSetting num_tiers = 1, percentage_client_selection = 100"
         )
 
+    client_list = list(selectable_clients)
     num_clients = math.floor(len(client_list) * (percent_clients / 100))
-    dataset_id = client_session["current_dataset"]
 
     if num_clients == 0:
         num_clients = 1
@@ -47,30 +51,23 @@ def client_selection(
             "CLIENT_SELECTION.HACCS_LITE:: num_clients > total available clients. num_clients = total available clients."
         )
 
-    client_histograms = dict()
-    unique_labels = []
-    for c in client_list:
-        client_histograms[c] = client_state[c][dataset_id]["metadata"][
-            "label_distribution"
-        ]
-        unique_labels.extend(client_histograms[c].keys())
-    unique_labels = list(set(unique_labels))
+    if client_view is None:
+        client_view = build_client_view(client_list, client_info, training_state)
+    client_label_histograms = client_view.label_histograms[
+        client_view.rows(client_list)
+    ]
 
-    client_label_histograms = []
+    client_to_cluster = cluster_histograms(
+        client_list,
+        client_label_histograms,
+        client_view.labels,
+        num_tiers,
+        client_selection_state,
+        method=args.get("clustering_method", "auto") if args else "auto",
+    )
+    client_tiers = [list() for _ in range(num_tiers)]
     for c in client_list:
-        client_label_histograms.append(
-            [
-                client_histograms[c][x] if x in client_histograms[c].keys() else 0.0
-                for x in unique_labels
-            ]
-        )
-
-    # kmeans = KMeans(n_clusters=num_tiers, random_state=0, n_init="auto")
-    agglomerative = AgglomerativeClustering(n_clusters=num_tiers, metric="euclidean")
-    agglomerative_labels = agglomerative.fit_predict(client_label_histograms)
-    cluster_labels = agglomerative_labels
-    client_list = np.array(client_list)
-    client_tiers = [list(client_list[cluster_labels == x]) for x in range(num_tiers)]
+        client_tiers[client_to_cluster[c]].append(c)
 
     print("CLIENT_SELECTION.HACCS_LITE:: client_tiers - ", client_tiers)
 
@@ -91,4 +88,4 @@ def client_selection(
 
     print("CLIENT_SELECTION.HACCS_LITE:: selected clients - ", selected_clients)
 
-    return client_tiers, selected_clients
+    return selected_clients, None
@@ -0,0 +1,168 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+
+from server.clientselection.transfer_cost import get_arg, transfer_preference
+from server.server_client_view import ClientView, build_client_view
+
+
+def client_utilities(
+    client_view: ClientView,
+    clients: list,
+    current_round: int,
+    preferred_duration: float,
+    straggler_penalty: float,
+) -> np.ndarray:
+    """
+    Oort utility of every explored client: dataset size times last training
+    loss, plus a bonus that grows with the rounds since the client last
+    trained. Clients slower than the preferred duration are scaled down by
+    (preferred_duration / round_time) ** straggler_penalty.
+    """
+    rows = client_view.rows(clients)
+    statistical = client_view.dataset_size[rows] * client_view.last_loss[rows]
+    rounds_since = np.maximum(current_round - client_view.last_round[rows], 1)
+    staleness = np.sqrt(0.1 * np.log(max(current_round, 1) + 1) / rounds_since)
+    utility = statistical + staleness
+
+    round_time = client_view.round_time_mean[rows]
+    slow = ~np.isnan(round_time) & (round_time > preferred_duration)
+    utility[slow] *= (preferred_duration / round_time[slow]) ** straggler_penalty
+    return utility
+
+
+def client_selection(
+    selectable_clients: list,
+    session_id: str,
+    client_info: dict,
+    training_state: dict,
+    training_session: dict,
+    aggregate_state: dict,
+    client_selection_state: dict,
+    args: dict = None,
+    client_view: ClientView = None,
+):
+    """
+    Oort style guided participant selection (Lai et al., OSDI 2021).
+
+    A share "epsilon" of the slots explores clients that have not trained
+    yet, fastest benchmark first. The rest exploit explored clients, sampled
+    in proportion to their utility among those within "cutoff" of the
+    K-th best. Utility rewards high loss on large datasets and penalises
+    clients whose observed round time exceeds the preferred round duration.
+    The pacer relaxes that duration by "pacer_step" seconds when the utility
+    collected over the last "pacer_window" rounds drops, trading round
+    length for statistical progress.
+    """
+    print("CLIENT SELECTION CALLED!")
+    if len(selectable_clients) == 0 or len(aggregate_state.keys()) != 0:
+        return None, None
+
+    C = get_arg(args, "client_fraction", 0.1)
+    cutoff = get_arg(args, "cutoff", 0.95)
+    straggler_penalty = get_arg(args, "straggler_penalty", 2.0)
+    pacer_window = get_arg(args, "pacer_window", 5)
+    pacer_step = get_arg(args, "pacer_step", 10.0)
+    epsilon_decay = get_arg(args, "exploration_decay", 0.98)
+    epsilon_min = get_arg(args, "exploration_min", 0.2)
+
+    if client_view is None:
+        client_view = build_client_view(selectable_clients, client_info, training_state)
+    current_round = training_session.get(f"{session_id}.last_round_number")
+    num_clients = max(1, int(C * len(selectable_clients)))
+
+    epsilon = client_selection_state.get("oort_epsilon")
+    if epsilon is None:
+        epsilon = get_arg(args, "exploration_factor", 0.9)
+
+    rows = client_view.rows(selectable_clients)
+    clients = np.array(selectable_clients)
+    explored = ~np.isnan(client_view.last_loss[rows])
+
+    preferred_duration = client_selection_state.get("oort_preferred_duration")
+    if preferred_duration is None:
+        # without a configured duration, start from the median observed one
+        round_times = client_view.round_time_mean[rows]
+        round_times = round_times[~np.isnan(round_times)]
+        preferred_duration = get_arg(args, "round_preferred_duration_s", None)
+        if preferred_duration is None and len(round_times) > 0:
+            preferred_duration = float(np.median(round_times))
+        if preferred_duration is not None:
+            client_selection_state.put("oort_preferred_duration", preferred_duration)
+        else:
+            preferred_duration = np.inf
+
+    num_explore = min(int(round(epsilon * num_clients)), int((~explored).sum()))
+    num_exploit = min(num_clients - num_explore, int(explored.sum()))
+    num_explore = min(num_clients - num_exploit, int((~explored).sum()))
+
+    rng = np.random.default_rng()
+    selected_clients = list()
+    round_utility = 0.0
+
+    if num_exploit > 0:
+        explored_clients = clients[explored].tolist()
+        utility = client_utilities(
+            client_view,
+            explored_clients,
+            current_round,
+            preferred_duration,
+            straggler_penalty,
+        )
+        utility = np.nan_to_num(utility, nan=0.0) * transfer_preference(
+            explored_clients,
+            client_info,
+            training_state,
+            training_session,
+            session_id,
+            args,
+        )
+        threshold = cutoff * np.sort(utility)[::-1][num_exploit - 1]
+        candidates = np.flatnonzero(utility >= threshold)
+        weights = utility[candidates]
+        p = None
+        if (weights > 0).sum() >= num_exploit:
+            p = weights / weights.sum()
+        chosen = rng.choice(candidates, size=num_exploit, replace=False, p=p)
+        selected_clients.extend(np.array(explored_clients)[chosen].tolist())
+        round_utility = float(utility[chosen].sum())
+
+    if num_explore > 0:
+        unexplored_clients = clients[~explored]
+        latency = client_view.latency[client_view.rows(unexplored_clients)]
+        # faster clients are explored first, unknown speeds last
+        order = np.argsort(np.nan_to_num(latency, nan=np.inf))
+        selected_clients.extend(unexplored_clients[order[:num_explore]].tolist())
+
+    client_selection_state.put(
+        "oort_epsilon", max(epsilon * epsilon_decay, epsilon_min)
+    )
+
+    # pacer: if the utility of the last window is below that of the window
+    # before it, allow longer rounds so that high utility stragglers get in
+    history = client_selection_state.get("oort_utility_history") or list()
+    history.append(round_utility)
+    history = history[-2 * pacer_window :]
+    if (
+        len(history) == 2 * pacer_window
+        and sum(history[pacer_window:]) < sum(history[:pacer_window])
+        and np.isfinite(preferred_duration)
+    ):
+        preferred_duration += pacer_step
+        client_selection_state.put("oort_preferred_duration", preferred_duration)
+        history = list()
+        print(
+            f"CLIENT_SELECTION.OORT:: utility dropped, preferred round duration = {preferred_duration}"
+        )
+    client_selection_state.put("oort_utility_history", history)
+
+    print(
+        f"CLIENT_SELECTION.OORT:: explore = {num_explore}, exploit = {num_exploit}, selected = {selected_clients}"
+    )
+    client_selection_state.put("selected_clients", selected_clients)
+    return selected_clients, None
@@ -6,50 +6,77 @@ Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/L
 """
 
 import math
-import random
 
 import numpy as np
 
+from server.clientselection.transfer_cost import transfer_preference
+from server.server_client_view import ClientView, build_client_view
+
 
 def client_selection(
-    logger_id: str,
-    client_list: list,
-    client_tiers,
-    round_no: int,
-    client_state: dict = None,
-    client_session: dict = None,
-    global_model_metrics: dict = None,
+    selectable_clients: list,
+    session_id: str,
+    client_info: dict,
+    training_state: dict,
+    training_session: dict,
+    aggregate_state: dict,
+    client_selection_state: dict,
     args: dict = None,
+    client_view: ClientView = None,
 ):
-    percent_clients = args["percentage_client_selection"]
+    if len(selectable_clients) == 0 or len(aggregate_state.keys()) != 0:
+        return None, None
 
-    if round_no == 1:
-        # selected_clients = client_list
-        selected_clients = np.random.choice(
-            a=client_list, size=num_clients, replace=False
-        )
-    else:
-        latest_loss = []
+    percent_clients = args["percentage_client_selection"]
 
-        for client in client_list:
-            latest_loss.append(client_session[client]["valdiation_metrics"][0])
+    num_clients = math.floor(len(selectable_clients) * (percent_clients / 100))
 
-        loss_sum = sum(latest_loss)
-        client_probabilities = [item / loss_sum for item in latest_loss]
+    if num_clients > len(selectable_clients):
+        num_clients = len(selectable_clients)
 
-        num_clients = math.floor(len(client_list) * (percent_clients / 100))
+    if num_clients == 0:
+        print(
+            "CLIENT_SELECTION.probabilistic_high_loss:: Number of clients to be selected from a tier came to be zero. Setting value to one."
+        )
+        num_clients = 1
 
-        if num_clients > len(client_list):
-            num_clients = len(client_list)
+    if client_view is None:
+        client_view = build_client_view(selectable_clients, client_info, training_state)
+    latest_loss = client_view.last_loss[client_view.rows(selectable_clients)]
+    preference = transfer_preference(
+        selectable_clients,
+        client_info,
+        training_state,
+        training_session,
+        session_id,
+        args,
+    )
 
-        if num_clients == 0:
-            print(
-                "CLIENT_SELECTION.probabilistic_high_loss:: Number of clients to be selected from a tier came to be zero. Setting value to one."
-            )
-            num_clients = 1
+    if np.isnan(latest_loss).all():
+        # no client has trained yet
+        selected_clients = np.random.choice(
+            a=selectable_clients,
+            p=preference / preference.sum(),
+            size=num_clients,
+            replace=False,
+        )
+    else:
+        # clients without a loss yet are weighted like the lossiest client
+        latest_loss = np.where(
+            np.isnan(latest_loss), np.nanmax(latest_loss), latest_loss
+        )
+        latest_loss = latest_loss * preference
+        client_probabilities = latest_loss / latest_loss.sum()
+        if np.count_nonzero(client_probabilities) < num_clients:
+            client_probabilities = None
 
         selected_clients = np.random.choice(
-            a=client_list, p=client_probabilities, size=num_clients, replace=False
+            a=selectable_clients,
+            p=client_probabilities,
+            size=num_clients,
+            replace=False,
         )
 
-    return None, selected_clients
+    selected_clients = selected_clients.tolist()
+    client_selection_state.put("selected_clients", selected_clients)
+    return selected_clients, None
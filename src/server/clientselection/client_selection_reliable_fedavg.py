@@ -21,9 +21,8 @@ def client_selection(
     args: dict = None,
 ):
     print("CLIENT SELECTION CALLED!")
-    training_clients = [
-        c for c in client_info.keys() if client_info.get(f"{c}.is_training")
-    ]
+    # clients other sessions are training are not this round's concern
+    training_clients = client_info.session_clients(session_id)
     if len(aggregate_state.keys()) == 0:
         C = args["client_fraction"]
         M = max(1, int(C * len(selectable_clients)))
@@ -8,7 +8,9 @@ Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/L
 import time
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+
+from server.clientselection.tiering import IncrementalTiering
+from server.server_client_view import ClientView, build_client_view
 
 np.random.seed()
 
@@ -22,6 +24,7 @@ def client_selection(
     aggregate_state: dict,
     client_selection_state: dict,
     args: dict = None,
+    client_view: ClientView = None,
 ):
     current_round = training_session.get(f"{session_id}.last_round_number")
 
@@ -55,9 +58,7 @@ def client_selection(
                 #     "clients_validating = ",
                 #     client_selection_state.get("client_ids_validating"),
                 # )
-                active_clients = [
-                    c for c in client_info.keys() if client_info.get(f"{c}.is_active")
-                ]
+                active_clients = client_info.active_clients()
 
                 clients_to_wait_for = [
                     c
@@ -68,9 +69,11 @@ def client_selection(
                     client_selection_state.put("val_ongoing", False)
                     latest_loss = dict()
                     for client in selectable_clients:
-                        latest_loss[client] = training_state.get(
-                            f"{client}.validation_metrics"
-                        )[current_round]["loss"]
+                        latest_loss[client] = training_state.series_range(
+                            f"{client}.validation_metrics",
+                            start=current_round,
+                            end=current_round,
+                        )[-1][1]["loss"]
                     client_selection_state.put("client_validation_losses", latest_loss)
                     print("Validation for round ", current_round, " ends")
 
@@ -83,71 +86,64 @@ def client_selection(
                     f"CLIENT_SELECTION.TIFL:: Error {e}. Setting client_fraction = 1."
                 )
 
-            if current_round == 0:
-                try:
-                    num_tiers = args["num_tiers"]
-                except Exception as e:
-                    num_tiers = 1
-                    print(f"CLIENT_SELECTION.TIFL:: Error {e}. Setting num_tiers = 1.")
-
-                try:
-                    credits_per_tier = args["credits_per_tier"]
-                except Exception as e:
-                    credits_per_tier = 10
-                    print(
-                        f"CLIENT_SELECTION.TIFL:: Error {e}. Setting credits_per_tier = 10."
-                    )
+            try:
+                num_tiers = args["num_tiers"]
+            except Exception as e:
+                num_tiers = 1
+                print(f"CLIENT_SELECTION.TIFL:: Error {e}. Setting num_tiers = 1.")
 
-                model_id = training_state.get(
-                    f"{selectable_clients[0]}.current_model_id"
+            try:
+                credits_per_tier = args["credits_per_tier"]
+            except Exception as e:
+                credits_per_tier = 10
+                print(
+                    f"CLIENT_SELECTION.TIFL:: Error {e}. Setting credits_per_tier = 10."
                 )
 
-                print("Current model id = ", model_id)
-
-                client_latencies = list()
-                for client in selectable_clients:
-                    print(
-                        "Benchmark info = ", client_info.get(f"{client}.benchmark_info")
-                    )
-                    client_benchmark_info = client_info.get(f"{client}.benchmark_info")[
-                        model_id
-                    ]
-                    client_latency = (
-                        client_benchmark_info["time_taken_s"]
-                        / client_benchmark_info["num_mini_batches"]
-                    ) * 100
-                    client_latencies.append(client_latency)
-
-                print("CLIENT LATENCIES = ", client_latencies)
+            try:
+                drift_threshold = args["tier_drift_threshold"]
+            except Exception:
+                drift_threshold = 0.1
 
-                reshaped_client_latencies = np.array(client_latencies).reshape(-1, 1)
-                agglomerative = AgglomerativeClustering(
-                    n_clusters=num_tiers, metric="euclidean"
+            if client_view is None:
+                client_view = build_client_view(
+                    selectable_clients, client_info, training_state
                 )
-                client_tiers = agglomerative.fit_predict(reshaped_client_latencies)
+            client_latencies = client_view.to_dict(
+                client_view.latency, selectable_clients
+            )
 
-                client_to_tier_id = dict()
+            print("CLIENT LATENCIES = ", client_latencies)
 
-                for i in range(len(selectable_clients)):
-                    client_to_tier_id[selectable_clients[i]] = client_tiers[i]
+            tiering = IncrementalTiering(
+                client_selection_state, num_tiers, drift_threshold
+            )
+            if current_round == 0 and tiering.num_tiers == 0:
+                tiering.fit(client_latencies)
+            else:
+                # clients that stopped sending heartbeats leave their tier, new
+                # and re-benchmarked clients are placed in the nearest one
+                active_clients = set(client_info.active_clients())
+                tiering.remove(
+                    [c for c in tiering.clients() if c not in active_clients]
+                )
+                if tiering.update(client_latencies):
+                    print("CLIENT_SELECTION.TIFL:: Tiers reclustered")
 
-                print(f"CLIENT_SELECTION:: client_tiers = ", client_to_tier_id)
+            print(f"CLIENT_SELECTION:: client_tiers = ", tiering.client_to_tier)
 
-                # tier_credits = {
-                #     t_id: credits_per_tier for t_id in np.unique(client_tiers)
-                # }
-                print("CREDITS_PER_TIER = ", credits_per_tier)
-                for i in range(num_tiers):
+            # tiers that did not exist before start with full credits
+            for i in range(tiering.num_tiers):
+                if client_selection_state.get(f"tier_{i}_credits") is None:
                     client_selection_state.put(f"tier_{i}_credits", credits_per_tier)
 
-                # client_selection_state.put("tier_credits_dict", tier_credits)
-                client_selection_state.put("client_to_tier_id_dict", client_to_tier_id)
-
-            client_to_tier_dict = client_selection_state.get("client_to_tier_id_dict")
+            client_to_tier_dict = tiering.client_to_tier
             latest_loss = client_selection_state.get("client_validation_losses")
 
             selectable_client_to_tier_id_dict = {
-                c: client_to_tier_dict[c] for c in selectable_clients
+                c: client_to_tier_dict[c]
+                for c in selectable_clients
+                if c in client_to_tier_dict
             }
 
             selectable_tier_ids_list = np.unique(
@@ -201,11 +197,13 @@ def client_selection(
 
             print("CLIENT TIERS = ", client_tiers)
             for i, tier in enumerate(client_tiers):
-                loss_sum = 0.0
-                for _, client in enumerate(tier):
-                    loss_sum += latest_loss[client]
                 assert len(client_tiers[i]) != 0  # asserting that a tier is not empty
-                tier_avg_loss.append(loss_sum / len(client_tiers[i]))
+                # clients that joined after the last validation round have no
+                # loss yet and are left out of the tier average
+                tier_losses = [latest_loss[c] for c in tier if c in latest_loss]
+                tier_avg_loss.append(
+                    sum(tier_losses) / len(tier_losses) if tier_losses else 0.0
+                )
 
             sorted_tier_index = (-np.array(tier_avg_loss)).argsort()
             print("TIER AVG LOSS = ", tier_avg_loss)
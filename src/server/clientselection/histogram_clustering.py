@@ -0,0 +1,129 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+from hashlib import md5
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+
+# above this many clients agglomerative clustering, which needs O(N^2) memory,
+# is replaced by mini-batch k-means
+AGGLOMERATIVE_MAX_CLIENTS = 1000
+
+
+def row_digest(row: np.ndarray) -> str:
+    return md5(np.ascontiguousarray(row, dtype=np.float64).tobytes()).hexdigest()
+
+
+def fit_clusters(histograms: np.ndarray, num_clusters: int, method: str = "auto"):
+    """Returns (labels, centroids) for the rows of "histograms"."""
+    num_clusters = max(1, min(num_clusters, len(histograms)))
+    if method == "auto":
+        method = (
+            "agglomerative"
+            if len(histograms) <= AGGLOMERATIVE_MAX_CLIENTS
+            else "minibatch_kmeans"
+        )
+
+    if num_clusters == 1:
+        labels = np.zeros(len(histograms), dtype=int)
+    elif method == "agglomerative":
+        labels = AgglomerativeClustering(
+            n_clusters=num_clusters, metric="euclidean"
+        ).fit_predict(histograms)
+    else:
+        kmeans = MiniBatchKMeans(
+            n_clusters=num_clusters,
+            batch_size=min(len(histograms), 1024),
+            n_init=3,
+            random_state=0,
+        )
+        labels = kmeans.fit_predict(histograms)
+
+    centroids = np.zeros((num_clusters, histograms.shape[1]))
+    counts = np.bincount(labels, minlength=num_clusters)
+    np.add.at(centroids, labels, histograms)
+    centroids /= np.maximum(counts, 1)[:, None]
+    return labels, centroids
+
+
+def nearest_centroid(histograms: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (
+        (histograms**2).sum(axis=1)[:, None]
+        - 2 * histograms @ centroids.T
+        + (centroids**2).sum(axis=1)[None, :]
+    )
+    return distances.argmin(axis=1)
+
+
+def cluster_histograms(
+    client_ids: list,
+    histograms: np.ndarray,
+    labels: list,
+    num_clusters: int,
+    client_selection_state=None,
+    method: str = "auto",
+) -> dict:
+    """
+    Clusters clients by their label histograms and returns {client: cluster}.
+
+    With "client_selection_state" the assignment is cached under
+    "histogram_clusters", together with a digest of every client's histogram.
+    Later calls reuse it as long as the histograms of the cached clients are
+    unchanged. Clients that were not seen before are placed with their
+    nearest centroid, and the clustering is refit only when a cached client's
+    data summary or the label set changed.
+    """
+    client_ids = list(client_ids)
+    cache = None
+    if client_selection_state is not None:
+        cache = client_selection_state.get("histogram_clusters")
+
+    # a subset of the clients may not cover every label, so lay the histograms
+    # out in the cached label order when they fit into it
+    if cache is not None and set(labels) <= set(cache["labels"]):
+        columns = [cache["labels"].index(label) for label in labels]
+        reordered = np.zeros((len(histograms), len(cache["labels"])))
+        reordered[:, columns] = histograms
+        histograms = reordered
+        labels = cache["labels"]
+
+    digests = {c: row_digest(histograms[i]) for i, c in enumerate(client_ids)}
+
+    if (
+        cache is not None
+        and cache["labels"] == list(labels)
+        and cache["num_clusters"] == num_clusters
+        and all(
+            cache["digests"][c] == digests[c]
+            for c in client_ids
+            if c in cache["digests"]
+        )
+    ):
+        new_rows = [i for i, c in enumerate(client_ids) if c not in cache["digests"]]
+        if not new_rows:
+            return {c: cache["assignment"][c] for c in client_ids}
+        centroids = np.array(cache["centroids"])
+        new_labels = nearest_centroid(histograms[new_rows], centroids)
+        for i, label in zip(new_rows, new_labels):
+            cache["assignment"][client_ids[i]] = int(label)
+            cache["digests"][client_ids[i]] = digests[client_ids[i]]
+    else:
+        cluster_labels, centroids = fit_clusters(histograms, num_clusters, method)
+        cache = {
+            "labels": list(labels),
+            "num_clusters": num_clusters,
+            "centroids": centroids.tolist(),
+            "digests": digests,
+            "assignment": {
+                c: int(cluster_labels[i]) for i, c in enumerate(client_ids)
+            },
+        }
+
+    if client_selection_state is not None:
+        client_selection_state.put("histogram_clusters", cache)
+    return {c: cache["assignment"][c] for c in client_ids}
@@ -0,0 +1,185 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+
+
+class IncrementalTiering:
+    """
+    Latency tiers for TiFL and FedAT that follow client churn without
+    reclustering the whole fleet.
+
+    Tiers are numbered from the fastest (0) to the slowest. A client that
+    joins, or whose benchmark latency changed, is moved to the tier with the
+    nearest centroid in O(tiers). Every tier keeps the count, sum and sum of
+    squares of its latencies, so centroids and the spread inside the tiers are
+    updated in O(1). The tiers are reclustered from scratch only when the
+    share of the latency variance left inside the tiers grows by more than
+    "drift_threshold" over its value after the last full clustering, or when
+    enough clients have joined to fill the configured number of tiers.
+
+    Everything is kept in client_selection_state so that the tiers survive a
+    checkpoint: "client_to_tier_id_dict", "client_tier_latency_dict" and
+    "tier_stats".
+    """
+
+    def __init__(
+        self, client_selection_state, num_tiers: int, drift_threshold: float = 0.1
+    ) -> None:
+        self.state = client_selection_state
+        self.max_tiers = num_tiers
+        self.drift_threshold = drift_threshold
+        self.client_to_tier = self.state.get("client_to_tier_id_dict") or dict()
+        self.client_latency = self.state.get("client_tier_latency_dict") or dict()
+        self.stats = self.state.get("tier_stats") or {
+            "count": list(),
+            "sum": list(),
+            "sumsq": list(),
+            "centroid": list(),
+            "baseline": 0.0,
+        }
+
+    @property
+    def num_tiers(self) -> int:
+        return len(self.stats["centroid"])
+
+    def clients(self) -> list:
+        return list(self.client_to_tier.keys())
+
+    def tier_members(self, tier: int) -> list:
+        return [c for c, t in self.client_to_tier.items() if t == tier]
+
+    def save(self) -> None:
+        self.state.put("client_to_tier_id_dict", self.client_to_tier)
+        self.state.put("client_tier_latency_dict", self.client_latency)
+        self.state.put("tier_stats", self.stats)
+
+    def fit(self, client_latencies: dict) -> None:
+        """Clusters all "client_latencies" into at most max_tiers tiers."""
+        client_latencies = {
+            c: float(l) for c, l in client_latencies.items() if not np.isnan(l)
+        }
+        clients = list(client_latencies.keys())
+        latencies = np.array([client_latencies[c] for c in clients]).reshape(-1, 1)
+        num_tiers = min(self.max_tiers, len(clients))
+
+        if num_tiers > 1:
+            labels = AgglomerativeClustering(
+                n_clusters=num_tiers, metric="euclidean"
+            ).fit_predict(latencies)
+        else:
+            labels = np.zeros(len(clients), dtype=int)
+
+        # renumber so that tier 0 is the fastest, which keeps tier ids
+        # comparable across reclustering
+        order = np.argsort([latencies[labels == t].mean() for t in range(num_tiers)])
+        rank = np.empty(num_tiers, dtype=int)
+        rank[order] = np.arange(num_tiers)
+
+        self.client_to_tier = {c: int(rank[labels[i]]) for i, c in enumerate(clients)}
+        self.client_latency = client_latencies
+        self.stats = {
+            "count": [0] * num_tiers,
+            "sum": [0.0] * num_tiers,
+            "sumsq": [0.0] * num_tiers,
+            "centroid": [0.0] * num_tiers,
+            "baseline": 0.0,
+        }
+        for c, tier in self.client_to_tier.items():
+            self.add_to_tier(tier, client_latencies[c])
+        self.stats["baseline"] = self.unexplained_variance()
+        self.save()
+
+    def update(self, client_latencies: dict) -> bool:
+        """Places new and re-benchmarked clients. Returns True if that caused a
+        full recluster."""
+        if self.num_tiers == 0:
+            self.fit(client_latencies)
+            return True
+
+        changed = False
+        for client, latency in client_latencies.items():
+            if np.isnan(latency):
+                continue
+            latency = float(latency)
+            if self.client_latency.get(client) == latency:
+                continue
+            if client in self.client_to_tier:
+                self.remove_from_tier(
+                    self.client_to_tier[client], self.client_latency[client]
+                )
+            tier = int(np.argmin(np.abs(np.array(self.stats["centroid"]) - latency)))
+            self.add_to_tier(tier, latency)
+            self.client_to_tier[client] = tier
+            self.client_latency[client] = latency
+            changed = True
+
+        if not changed:
+            return False
+        return self.rebalance()
+
+    def remove(self, clients) -> bool:
+        """Drops clients that left the fleet. Returns True if that caused a
+        full recluster."""
+        changed = False
+        for client in clients:
+            if client not in self.client_to_tier:
+                continue
+            self.remove_from_tier(
+                self.client_to_tier.pop(client), self.client_latency.pop(client)
+            )
+            changed = True
+
+        if not changed:
+            return False
+        return self.rebalance()
+
+    def rebalance(self) -> bool:
+        drifted = (
+            self.unexplained_variance()
+            > self.stats["baseline"] + self.drift_threshold
+        )
+        can_grow = self.num_tiers < min(self.max_tiers, len(self.client_latency))
+        if drifted or can_grow:
+            self.fit(self.client_latency)
+            return True
+        self.save()
+        return False
+
+    def add_to_tier(self, tier: int, latency: float) -> None:
+        self.stats["count"][tier] += 1
+        self.stats["sum"][tier] += latency
+        self.stats["sumsq"][tier] += latency**2
+        self.stats["centroid"][tier] = (
+            self.stats["sum"][tier] / self.stats["count"][tier]
+        )
+
+    def remove_from_tier(self, tier: int, latency: float) -> None:
+        self.stats["count"][tier] -= 1
+        self.stats["sum"][tier] -= latency
+        self.stats["sumsq"][tier] -= latency**2
+        if self.stats["count"][tier] > 0:
+            self.stats["centroid"][tier] = (
+                self.stats["sum"][tier] / self.stats["count"][tier]
+            )
+
+    def unexplained_variance(self) -> float:
+        """Share of the total latency variance that lies inside the tiers, 0
+        for perfectly separated tiers and 1 when tiering explains nothing."""
+        count = np.array(self.stats["count"], dtype=float)
+        total = np.array(self.stats["sum"])
+        sumsq = np.array(self.stats["sumsq"])
+        n = count.sum()
+        if n == 0:
+            return 0.0
+        nonempty = count > 0
+        within = (sumsq[nonempty] - total[nonempty] ** 2 / count[nonempty]).sum()
+        overall = sumsq.sum() - total.sum() ** 2 / n
+        if overall <= 1e-12:
+            return 0.0
+        return float(max(within, 0.0) / overall)
@@ -0,0 +1,102 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+
+
+def get_arg(args, key, default):
+    try:
+        return args[key]
+    except Exception:
+        return default
+
+
+def transfer_bytes(client_ids: list, client_info, training_state, model_transfer):
+    """
+    Bytes the server has to send each client before it can train. The model
+    files are needed only if "{client}.models" does not hold the session's
+    model hash. The global weights go out with every StartTraining request,
+    so they are charged to every client alike.
+    """
+    client_ids = list(client_ids)
+    models = client_info.get_records(client_ids, fields=["models"])
+
+    sizes = np.full(len(client_ids), float(model_transfer["weights_bytes"]))
+    for i, client in enumerate(client_ids):
+        cached = models[client].get("models") or dict()
+        if cached.get(model_transfer["model_id"]) != model_transfer["model_hash"]:
+            sizes[i] += model_transfer["model_bytes"]
+    return sizes
+
+
+def downlink_bandwidth(client_ids: list, client_info) -> np.ndarray:
+    """Measured server to client throughput in bytes/s from "{client}.link",
+    NaN where the link has not been measured."""
+    client_ids = list(client_ids)
+    links = client_info.get_records(client_ids, fields=["link"])
+    bandwidth = np.full(len(client_ids), np.nan)
+    for i, client in enumerate(client_ids):
+        link = links[client].get("link") or dict()
+        if link.get("downlink_Bps"):
+            bandwidth[i] = link["downlink_Bps"]
+    return bandwidth
+
+
+def transfer_seconds(
+    client_ids: list, client_info, training_state, training_session, session_id
+):
+    """
+    Expected time to ship each client what it is missing. Clients without a
+    bandwidth measurement are assumed to have the fleet's median bandwidth.
+    Returns NaN for every client while no link has been measured, and None
+    if the session has not published "{session_id}.model_transfer".
+    """
+    model_transfer = training_session.get(f"{session_id}.model_transfer")
+    if not model_transfer:
+        return None
+    sizes = transfer_bytes(client_ids, client_info, training_state, model_transfer)
+    bandwidth = downlink_bandwidth(client_ids, client_info)
+    measured = ~np.isnan(bandwidth)
+    if measured.any():
+        bandwidth[~measured] = np.median(bandwidth[measured])
+    return sizes / bandwidth
+
+
+def transfer_preference(
+    client_ids: list,
+    client_info,
+    training_state,
+    training_session,
+    session_id,
+    args=None,
+) -> np.ndarray:
+    """
+    Multiplicative weight in (0, 1] per client that favours clients needing
+    the least data transfer: exp(-transfer_cost_weight * cost), where cost is
+    the client's transfer time relative to the most expensive client, or its
+    transfer size while no bandwidth has been measured. All ones unless
+    "transfer_cost_weight" is set in client_selection_args, so a strategy
+    that multiplies its scores or sampling weights by it is unchanged for
+    sessions that do not opt in.
+    """
+    weight = get_arg(args, "transfer_cost_weight", 0.0)
+    preference = np.ones(len(client_ids))
+    if not weight or len(client_ids) == 0:
+        return preference
+
+    model_transfer = training_session.get(f"{session_id}.model_transfer")
+    if not model_transfer:
+        return preference
+    cost = transfer_seconds(
+        client_ids, client_info, training_state, training_session, session_id
+    )
+    if np.isnan(cost).all():
+        cost = transfer_bytes(client_ids, client_info, training_state, model_transfer)
+    cost = np.nan_to_num(cost, nan=0.0)
+    if cost.max() > 0:
+        preference = np.exp(-weight * cost / cost.max())
+    return preference
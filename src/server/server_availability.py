@@ -0,0 +1,180 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import math
+import time
+
+HOURS = 24
+
+
+def new_record() -> dict:
+    return {
+        "online_since": None,
+        "last_seen": None,
+        "sessions": 0,
+        "departures": 0,
+        "online_s": 0.0,
+        "hour_online_s": [0.0] * HOURS,
+        "hour_departures": [0] * HOURS,
+    }
+
+
+def hour_of_day(timestamp: float) -> int:
+    return time.localtime(timestamp).tm_hour
+
+
+def split_by_hour(start: float, end: float):
+    """Yields (hour_of_day, seconds) for the interval [start, end), cut at
+    the local hour boundaries hour_of_day buckets by, also in time zones
+    that are not a whole number of hours off UTC."""
+    while start < end:
+        local = time.localtime(start)
+        offset = local.tm_gmtoff
+        hour_end = (math.floor((start + offset) / 3600) + 1) * 3600 - offset
+        step_end = min(hour_end, end)
+        yield local.tm_hour, step_end - start
+        start = step_end
+
+
+def departure_rates(record: dict, prior_session_s: float) -> list:
+    """
+    Departures per online second for every hour of the day. The client's
+    overall rate, departures over online time with one pseudo departure per
+    "prior_session_s", is the prior each hour is shrunk to until it has
+    about "prior_session_s" seconds of history of its own.
+    """
+    overall = (record["departures"] + 1) / (record["online_s"] + prior_session_s)
+    return [
+        (record["hour_departures"][h] + overall * prior_session_s)
+        / (record["hour_online_s"][h] + prior_session_s)
+        for h in range(HOURS)
+    ]
+
+
+def stay_online_probability(
+    record: dict, horizon_s: float, now: float = None, prior_session_s=3600.0
+) -> float:
+    """
+    Probability that a client stays online for the next "horizon_s" seconds,
+    exp(-integral of the hourly departure rate over [now, now + horizon_s]).
+    0 for a client that is offline, and the prior alone for one without any
+    history.
+    """
+    if record is None:
+        record = new_record()
+    elif record.get("online_since") is None and record.get("last_seen") is not None:
+        return 0.0
+    now = time.time() if now is None else now
+    rates = departure_rates(record, prior_session_s)
+    hazard = sum(
+        rates[hour] * seconds for hour, seconds in split_by_hour(now, now + horizon_s)
+    )
+    return math.exp(-hazard)
+
+
+def close_session(record: dict) -> None:
+    """Ends the open session of "record" with a departure at its last
+    heartbeat."""
+    last_seen = record["last_seen"] or record["online_since"]
+    record["hour_departures"][hour_of_day(last_seen)] += 1
+    record["departures"] += 1
+    record["online_since"] = None
+
+
+class AvailabilityModel:
+    """
+    Long-run availability of every client, learnt from its join, heartbeat
+    and leave events. Online time and departures are binned by hour of the
+    day, so a client that reliably drops off in the evening is predicted to
+    do so again. The whole model is a few dozen numbers per client, kept in
+    client_info as "{client_id}.availability" and updated in O(1) per event.
+    """
+
+    def __init__(
+        self, client_info, prior_session_s: float = 3600.0, max_gap_s: float = None
+    ) -> None:
+        self.client_info = client_info
+        self.prior_session_s = prior_session_s
+        # silence after which a client is taken to have left, however its
+        # session was last closed or not
+        self.max_gap_s = max_gap_s
+
+    def get(self, client_id) -> dict:
+        return self.client_info.get(f"{client_id}.availability") or new_record()
+
+    def on_join(self, client_id, now: float = None) -> dict:
+        now = time.time() if now is None else now
+        record = self.get(client_id)
+        if record["online_since"] is None:
+            record["online_since"] = now
+            record["sessions"] += 1
+        record["last_seen"] = now
+        self.client_info.put(f"{client_id}.availability", record)
+        return record
+
+    def on_heartbeat(self, client_id, now: float = None) -> dict:
+        """Accounts the time since the last sign of life as online. A client
+        heard from again after it was given up on starts a new session. A
+        session still open after a silence longer than "max_gap_s", one the
+        server never saw end, is closed at its last heartbeat first."""
+        now = time.time() if now is None else now
+        record = self.get(client_id)
+        if (
+            record["online_since"] is not None
+            and self.max_gap_s is not None
+            and record["last_seen"] is not None
+            and now - record["last_seen"] > self.max_gap_s
+        ):
+            close_session(record)
+        if record["online_since"] is None:
+            record["online_since"] = now
+            record["sessions"] += 1
+        elif record["last_seen"] is not None:
+            for hour, seconds in split_by_hour(record["last_seen"], now):
+                record["hour_online_s"][hour] += seconds
+                record["online_s"] += seconds
+        record["last_seen"] = now
+        self.client_info.put(f"{client_id}.availability", record)
+        return record
+
+    def on_leave(self, client_id) -> dict:
+        """Records a departure at the client's last heartbeat."""
+        record = self.get(client_id)
+        if record["online_since"] is None:
+            return record
+        close_session(record)
+        self.client_info.put(f"{client_id}.availability", record)
+        return record
+
+    def stay_online_probability(
+        self, client_id, horizon_s: float, now: float = None
+    ) -> float:
+        return stay_online_probability(
+            self.get(client_id), horizon_s, now, self.prior_session_s
+        )
+
+
+def stay_online_probabilities(
+    client_ids: list,
+    client_info,
+    horizons_s,
+    now: float = None,
+    prior_session_s: float = 3600.0,
+) -> list:
+    """stay_online_probability of every client for its own horizon, from one
+    bulk read of client_info. Clients without a horizon get None."""
+    client_ids = list(client_ids)
+    records = client_info.get_records(client_ids, fields=["availability"])
+    now = time.time() if now is None else now
+    return [
+        None
+        if horizon is None or math.isnan(horizon)
+        else stay_online_probability(
+            records[client].get("availability"), horizon, now, prior_session_s
+        )
+        for client, horizon in zip(client_ids, horizons_s)
+    ]
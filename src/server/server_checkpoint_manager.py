@@ -0,0 +1,292 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import copy
+import json
+import os
+import pickle
+import shutil
+from queue import Queue
+from threading import Thread
+from time import time
+
+import torch
+
+from utils.logger import FedLogger
+
+
+class TensorRef:
+    """Placeholder left in a pickled record for a tensor stored in tensors.pt"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+def snapshot_value(value):
+    """Copy of "value" that later writes to the live state do not affect.
+    Containers and leaves are copied but tensors are shared, they are cloned
+    by split_tensors on the writer thread. Stored tensors are replaced, never
+    updated in place, so sharing them until then is safe."""
+    if isinstance(value, torch.Tensor):
+        return value
+    if isinstance(value, dict):
+        return type(value)((k, snapshot_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(snapshot_value(v) for v in value)
+    return copy.deepcopy(value)
+
+
+def split_tensors(value, path: str, tensors: dict):
+    """Walks "value" and moves a clone of every tensor into "tensors",
+    leaving a TensorRef behind."""
+    if isinstance(value, torch.Tensor):
+        tensors[path] = value.detach().to("cpu", copy=True).contiguous()
+        return TensorRef(path)
+    if isinstance(value, dict):
+        return type(value)(
+            (k, split_tensors(v, f"{path}/{k}", tensors)) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return type(value)(
+            split_tensors(v, f"{path}/{i}", tensors) for i, v in enumerate(value)
+        )
+    return value
+
+
+def join_tensors(value, tensors: dict):
+    if isinstance(value, TensorRef):
+        return tensors[value.name]
+    if isinstance(value, dict):
+        return type(value)((k, join_tensors(v, tensors)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(join_tensors(v, tensors) for v in value)
+    return value
+
+
+class CheckpointManager:
+    """
+    Writes incremental checkpoints of a session's state managers in the
+    background.
+
+    Every call to checkpoint() snapshots only the records that were written or
+    deleted, and the metric series points appended, since the previous call and
+    queues them as a new segment. A segment is a directory holding records.pkl,
+    with tensors replaced by references, and tensors.pt, which can be memory
+    mapped on restore so that model weights are only paged in when they are
+    used. Every "compaction_interval" segments the chain is folded into a
+    single base segment so that restore time does not grow with the session
+    length.
+
+    Unless "resume" is set, a chain left by an earlier session of the same id
+    is archived and a new one is started, so that a restore never folds in
+    records of a different run.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        checkpoint_dir_path: str,
+        states: dict,
+        compaction_interval: int = 10,
+        resume: bool = False,
+    ) -> None:
+        self.id = id
+        self.logger = FedLogger(id=self.id, loggername="CHECKPOINT_MANAGER")
+        self.states = states
+        self.compaction_interval = compaction_interval
+        self.checkpoint_dir = os.path.join(checkpoint_dir_path, f"checkpoint_{id}")
+        self.manifest_path = os.path.join(self.checkpoint_dir, "manifest.json")
+        if not resume and os.path.isdir(self.checkpoint_dir):
+            archive_dir = f"{self.checkpoint_dir}_archived_{int(time())}"
+            os.replace(self.checkpoint_dir, archive_dir)
+            self.logger.info("fedserver.checkpoint.archived", f"{archive_dir}")
+        self.manifest = self.read_manifest()
+        # without an existing chain the first segment has to hold everything
+        self.full_snapshot_pending = self.manifest is None
+        if self.manifest is None:
+            self.manifest = {"segments": list(), "next_segment": 0}
+
+        self.queue = Queue()
+        self.writer = Thread(target=self.write_loop, daemon=True)
+        self.writer.name = f"Checkpoint_Thread_{id}"
+        self.writer.start()
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.manifest_path)
+
+    def read_manifest(self):
+        if not self.exists():
+            return None
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def write_manifest(self) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def checkpoint(self, round_no) -> None:
+        """Snapshots the changed records and returns without waiting for disk."""
+        snapshot_start_time = time()
+        records = dict()
+        series = dict()
+        for name, state in self.states.items():
+            dirty = state.pop_dirty()
+            dirty_series = state.pop_dirty_series()
+            if self.full_snapshot_pending:
+                dirty = set(dirty) | set(state.keys())
+                dirty_series = {key: None for key in state.series_keys()}
+            series[name] = {
+                key: state.series_range(key, start=start)
+                for key, start in dirty_series.items()
+            }
+            live = set(state.keys())
+            present = [prefix for prefix in dirty if prefix in live]
+            state_records = {
+                prefix: snapshot_value(record)
+                for prefix, record in state.get_records(present).items()
+            }
+            for prefix in dirty:
+                if prefix not in live:
+                    state_records[prefix] = None
+            records[name] = state_records
+        self.full_snapshot_pending = False
+
+        self.queue.put((round_no, records, series))
+        self.logger.info(
+            "fedserver.checkpoint.snapshot",
+            f"{round_no},{sum(len(r) for r in records.values())},{time()-snapshot_start_time}",
+        )
+
+    def write_loop(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            round_no, records, series = item
+            write_start_time = time()
+            try:
+                tensors = dict()
+                records = {
+                    name: {
+                        prefix: split_tensors(record, f"{name}/{prefix}", tensors)
+                        for prefix, record in state_records.items()
+                    }
+                    for name, state_records in records.items()
+                }
+                self.write_segment(round_no, records, series, tensors)
+                if len(self.manifest["segments"]) > self.compaction_interval:
+                    self.compact()
+            except Exception as e:
+                self.logger.error("fedserver.checkpoint.write_failed", f"{e}")
+            self.logger.info(
+                "fedserver.train.checkpoint", f"{round_no},{time()-write_start_time}"
+            )
+            self.queue.task_done()
+
+    def write_segment(self, round_no, records: dict, series: dict, tensors: dict):
+        segment = f"segment_{self.manifest['next_segment']:06d}"
+        segment_dir = os.path.join(self.checkpoint_dir, segment)
+        os.makedirs(segment_dir, exist_ok=True)
+        with open(os.path.join(segment_dir, "records.pkl"), "wb") as f:
+            pickle.dump({"records": records, "series": series}, f)
+        torch.save(tensors, os.path.join(segment_dir, "tensors.pt"))
+
+        self.manifest["next_segment"] += 1
+        self.manifest["segments"].append(segment)
+        self.manifest["round_no"] = round_no
+        self.write_manifest()
+        return segment
+
+    def load_segment(self, segment: str, lazy: bool = True):
+        segment_dir = os.path.join(self.checkpoint_dir, segment)
+        with open(os.path.join(segment_dir, "records.pkl"), "rb") as f:
+            content = pickle.load(f)
+        tensors = torch.load(
+            os.path.join(segment_dir, "tensors.pt"), mmap=lazy, weights_only=True
+        )
+        records = {
+            name: {
+                prefix: join_tensors(record, tensors)
+                for prefix, record in state_records.items()
+            }
+            for name, state_records in content["records"].items()
+        }
+        return records, content["series"]
+
+    def fold(self, segments: list, lazy: bool = True):
+        folded = {name: dict() for name in self.states}
+        folded_series = {name: dict() for name in self.states}
+        for segment in segments:
+            records, series = self.load_segment(segment, lazy)
+            for name, state_records in records.items():
+                for prefix, record in state_records.items():
+                    if record is None:
+                        folded.setdefault(name, dict()).pop(prefix, None)
+                    else:
+                        folded.setdefault(name, dict())[prefix] = record
+            for name, state_series in series.items():
+                for key, points in state_series.items():
+                    folded_series.setdefault(name, dict()).setdefault(
+                        key, dict()
+                    ).update(points)
+        folded_series = {
+            name: {key: sorted(points.items()) for key, points in state_series.items()}
+            for name, state_series in folded_series.items()
+        }
+        return folded, folded_series
+
+    def compact(self) -> None:
+        """Folds the segment chain into a single base segment."""
+        compaction_start_time = time()
+        old_segments = list(self.manifest["segments"])
+        folded, folded_series = self.fold(old_segments, lazy=True)
+        records = dict()
+        tensors = dict()
+        for name, state_records in folded.items():
+            records[name] = {
+                prefix: split_tensors(record, f"{name}/{prefix}", tensors)
+                for prefix, record in state_records.items()
+            }
+        self.manifest["segments"] = list()
+        self.write_segment(
+            self.manifest.get("round_no"), records, folded_series, tensors
+        )
+        for segment in old_segments:
+            shutil.rmtree(os.path.join(self.checkpoint_dir, segment), ignore_errors=True)
+        self.logger.info(
+            "fedserver.checkpoint.compaction",
+            f"{len(old_segments)},{time()-compaction_start_time}",
+        )
+
+    def restore(self, lazy: bool = True):
+        """Returns ({state_name: {prefix: record}}, {state_name: {series_key:
+        [(index, value), ..]}}) from the latest checkpoint. With lazy=True the
+        tensors are memory mapped from disk."""
+        self.flush()
+        manifest = self.read_manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No checkpoint found at {self.checkpoint_dir}")
+        return self.fold(manifest["segments"], lazy)
+
+    def flush(self) -> None:
+        """Blocks until every queued segment has been written."""
+        self.queue.join()
+
+    def close(self) -> None:
+        self.flush()
+        self.queue.put(None)
+        self.writer.join()
+
+
+def put_series(state, series: dict) -> None:
+    """Appends restored metric series back into a state manager."""
+    for key, points in series.items():
+        for index, value in points:
+            state.series_append(key, index, value)
@@ -0,0 +1,176 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+
+CLIENT_INFO_FIELDS = ["benchmark_info", "is_active", "is_training", "link"]
+TRAINING_STATE_FIELDS = [
+    "current_model_id",
+    "current_dataset_detail",
+    "last_round_participated",
+    "last_training_metrics",
+    "round_time",
+]
+
+
+def benchmark_latency(benchmark_info: dict, model_id) -> float:
+    """Time per 100 mini batches from a client's benchmark, NaN if the model
+    has not been benchmarked on that client yet."""
+    if not benchmark_info or not benchmark_info.get(model_id):
+        return np.nan
+    model_benchmark = benchmark_info[model_id]
+    return (
+        model_benchmark["time_taken_s"] / model_benchmark["num_mini_batches"]
+    ) * 100
+
+
+class ClientView:
+    """
+    Column oriented snapshot of the per-client state read by client selection
+    strategies, built once per scheduling step. Row i of every array belongs to
+    client_ids[i]. Values that are not known yet are NaN.
+
+    latency          time per 100 mini batches from the benchmark
+    dataset_size     number of items in the client's current dataset
+    last_loss        training loss reported in the client's last round
+    last_round       round the client last trained in, -1 if it never did
+    round_time_mean  EWMA of the observed end to end round time
+    round_time_std   its standard deviation
+    rtt_s            estimated round trip time to the client
+    downlink_Bps     estimated server to client throughput in bytes/s
+    uplink_Bps       estimated client to server throughput in bytes/s
+    is_active        client is sending heartbeats
+    is_training      client is busy with a training or validation request
+    label_histograms (clients x labels) label distribution of the dataset
+    """
+
+    def __init__(
+        self,
+        client_ids: list,
+        latency: np.ndarray,
+        dataset_size: np.ndarray,
+        last_loss: np.ndarray,
+        last_round: np.ndarray,
+        round_time_mean: np.ndarray,
+        round_time_std: np.ndarray,
+        rtt_s: np.ndarray,
+        downlink_Bps: np.ndarray,
+        uplink_Bps: np.ndarray,
+        is_active: np.ndarray,
+        is_training: np.ndarray,
+        labels: list,
+        label_histograms: np.ndarray,
+    ) -> None:
+        self.client_ids = list(client_ids)
+        self.index = {client_id: i for i, client_id in enumerate(self.client_ids)}
+        self.latency = latency
+        self.dataset_size = dataset_size
+        self.last_loss = last_loss
+        self.last_round = last_round
+        self.round_time_mean = round_time_mean
+        self.round_time_std = round_time_std
+        self.rtt_s = rtt_s
+        self.downlink_Bps = downlink_Bps
+        self.uplink_Bps = uplink_Bps
+        self.is_active = is_active
+        self.is_training = is_training
+        self.labels = labels
+        self.label_histograms = label_histograms
+
+    def __len__(self) -> int:
+        return len(self.client_ids)
+
+    def rows(self, clients) -> np.ndarray:
+        """Row numbers of "clients", in the order given."""
+        return np.array([self.index[c] for c in clients], dtype=int)
+
+    def to_dict(self, column: np.ndarray, clients=None) -> dict:
+        clients = self.client_ids if clients is None else clients
+        return {c: column[self.index[c]].item() for c in clients}
+
+
+def build_client_view(client_ids, client_info, training_state) -> ClientView:
+    """Builds a ClientView from one bulk read of client_info and one of
+    training_state."""
+    client_ids = list(client_ids)
+    client_records = client_info.get_records(client_ids, fields=CLIENT_INFO_FIELDS)
+    training_records = training_state.get_records(
+        client_ids, fields=TRAINING_STATE_FIELDS
+    )
+
+    n = len(client_ids)
+    latency = np.full(n, np.nan)
+    dataset_size = np.full(n, np.nan)
+    last_loss = np.full(n, np.nan)
+    last_round = np.full(n, -1, dtype=int)
+    round_time_mean = np.full(n, np.nan)
+    round_time_std = np.full(n, np.nan)
+    link_columns = {
+        "rtt_s": np.full(n, np.nan),
+        "downlink_Bps": np.full(n, np.nan),
+        "uplink_Bps": np.full(n, np.nan),
+    }
+    is_active = np.zeros(n, dtype=bool)
+    is_training = np.zeros(n, dtype=bool)
+    label_distributions = list()
+
+    for i, client_id in enumerate(client_ids):
+        client_record = client_records.get(client_id, dict())
+        training_record = training_records.get(client_id, dict())
+
+        latency[i] = benchmark_latency(
+            client_record.get("benchmark_info"),
+            training_record.get("current_model_id"),
+        )
+        is_active[i] = bool(client_record.get("is_active"))
+        is_training[i] = bool(client_record.get("is_training"))
+        link = client_record.get("link") or dict()
+        for field, column in link_columns.items():
+            if field in link:
+                column[i] = link[field]
+
+        metadata = (training_record.get("current_dataset_detail") or dict()).get(
+            "metadata", dict()
+        )
+        if "num_items" in metadata:
+            dataset_size[i] = metadata["num_items"]
+        label_distributions.append(metadata.get("label_distribution", dict()))
+
+        if training_record.get("last_round_participated") is not None:
+            last_round[i] = training_record["last_round_participated"]
+        last_metrics = training_record.get("last_training_metrics")
+        if last_metrics and "loss" in last_metrics:
+            last_loss[i] = last_metrics["loss"]
+        round_time = training_record.get("round_time")
+        if round_time:
+            round_time_mean[i] = round_time["mean"]
+            round_time_std[i] = np.sqrt(round_time["var"])
+
+    labels = sorted(
+        {label for distribution in label_distributions for label in distribution},
+        key=str,
+    )
+    label_index = {label: j for j, label in enumerate(labels)}
+    label_histograms = np.zeros((n, len(labels)))
+    for i, distribution in enumerate(label_distributions):
+        for label, value in distribution.items():
+            label_histograms[i, label_index[label]] = value
+
+    return ClientView(
+        client_ids=client_ids,
+        latency=latency,
+        dataset_size=dataset_size,
+        last_loss=last_loss,
+        last_round=last_round,
+        round_time_mean=round_time_mean,
+        round_time_std=round_time_std,
+        **link_columns,
+        is_active=is_active,
+        is_training=is_training,
+        labels=labels,
+        label_histograms=label_histograms,
+    )
@@ -0,0 +1,145 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+from threading import Condition
+from time import time
+
+import numpy as np
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# running when the server went down
+INTERRUPTED = "interrupted"
+
+TERMINAL = (FINISHED, FAILED, CANCELLED, INTERRUPTED)
+
+
+def to_native(value):
+    """"value" with numpy scalars and arrays, also inside dicts, lists and
+    tuples, turned into Python numbers and lists, so that it can be stored
+    in any state backend and serialized to JSON."""
+    if isinstance(value, dict):
+        return {key: to_native(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_native(item) for item in value]
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return value
+
+
+class JobQueue:
+    """
+    Sessions submitted to the server, one record per session id in a state
+    manager, so that with redis state the queue and the job history outlive
+    the server process. A job record holds the submitted request, its
+    "priority" (higher runs first, ties in submission order), "status" and
+    the times it was submitted, started and finished. Queued jobs are kept
+    in the "queued" index.
+    """
+
+    QUEUE = "queued"
+    JOBS = "jobs"
+
+    def __init__(self, state) -> None:
+        self.state = state
+        # guards the records and wakes the scheduler on every change
+        self.changed = Condition()
+        with self.changed:
+            for session_id in self.state.index_members(self.JOBS):
+                if self.state.get(f"{session_id}.status") == RUNNING:
+                    self.state.put_record(
+                        session_id, {"status": INTERRUPTED, "finished_at": time()}
+                    )
+
+    def submit(self, session_id: str, request: dict, priority: int = 0) -> dict:
+        """Queues "request" as session "session_id". Returns None if a job
+        of that id is already queued or running."""
+        with self.changed:
+            if self.state.get(f"{session_id}.status") in (QUEUED, RUNNING):
+                return None
+            job = {
+                "session_id": session_id,
+                "request": request,
+                "priority": priority,
+                "status": QUEUED,
+                "submitted_at": time(),
+                "started_at": None,
+                "finished_at": None,
+                "message": None,
+            }
+            self.state.put_record(session_id, job)
+            self.state.index_add(self.JOBS, session_id)
+            self.state.index_add(self.QUEUE, session_id)
+            self.changed.notify_all()
+        return job
+
+    def get(self, session_id: str) -> dict:
+        job = self.state.get_record(session_id)
+        return job if job else None
+
+    def queued(self) -> list:
+        """Queued jobs in the order they will run."""
+        jobs = self.state.get_records(self.state.index_members(self.QUEUE))
+        return sorted(
+            jobs.values(), key=lambda job: (-job["priority"], job["submitted_at"])
+        )
+
+    def jobs(self) -> list:
+        jobs = self.state.get_records(self.state.index_members(self.JOBS))
+        return sorted(jobs.values(), key=lambda job: job["submitted_at"])
+
+    def position(self, session_id: str) -> int:
+        for position, job in enumerate(self.queued()):
+            if job["session_id"] == session_id:
+                return position
+        return None
+
+    def start(self, session_id: str) -> bool:
+        """Marks a queued job running. Returns False if it is not queued
+        anymore."""
+        with self.changed:
+            if self.state.get(f"{session_id}.status") != QUEUED:
+                return False
+            self.state.index_remove(self.QUEUE, session_id)
+            self.state.put_record(
+                session_id, {"status": RUNNING, "started_at": time()}
+            )
+            self.changed.notify_all()
+        return True
+
+    def finish(self, session_id: str, status: str, **fields) -> None:
+        with self.changed:
+            self.state.index_remove(self.QUEUE, session_id)
+            self.state.put_record(
+                session_id,
+                {**to_native(fields), "status": status, "finished_at": time()},
+            )
+            self.changed.notify_all()
+
+    def record(self, session_id: str, **fields) -> None:
+        """Stores "fields" in the record of job "session_id" without changing
+        its status."""
+        with self.changed:
+            self.state.put_record(session_id, to_native(fields))
+            self.changed.notify_all()
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancels a queued job. Returns False for any other job, those are
+        either over or have to be cancelled where they run."""
+        with self.changed:
+            if self.state.get(f"{session_id}.status") != QUEUED:
+                return False
+            self.finish(session_id, CANCELLED, message="Cancelled while queued")
+        return True
+
+    def wait(self, timeout: float = None) -> None:
+        """Blocks until a job changes or "timeout" passes."""
+        with self.changed:
+            self.changed.wait(timeout)
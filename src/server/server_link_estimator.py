@@ -0,0 +1,76 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+# transfers smaller than this are dominated by latency and say nothing about
+# throughput
+MIN_THROUGHPUT_BYTES = 64 * 1024
+
+
+class LinkEstimator:
+    """
+    Per-client estimates of round trip time and downlink (server to client)
+    and uplink throughput, learnt from the transfers the server makes anyway:
+
+    grpc_echo       round trip time, including the channel setup
+    grpc_send_model downlink throughput of the streamed model files
+    StartTraining   uplink throughput, from the time the call took minus the
+                    client's reported training time, the round trip and the
+                    time the request needs on the known downlink
+
+    Estimates are exponentially weighted with "alpha" as the weight of the
+    newest observation, and stored in client_info as "{client_id}.link" =
+    {"rtt_s": .., "downlink_Bps": .., "uplink_Bps": .., "samples": ..}.
+    Fields that have not been observed yet are missing.
+    """
+
+    def __init__(self, client_info, alpha: float = 0.3) -> None:
+        self.client_info = client_info
+        self.alpha = alpha
+
+    def get(self, client_id) -> dict:
+        return self.client_info.get(f"{client_id}.link") or dict()
+
+    def update(self, client_id, field: str, value: float) -> dict:
+        link = self.get(client_id)
+        if field in link:
+            link[field] += self.alpha * (value - link[field])
+        else:
+            link[field] = float(value)
+        link["samples"] = link.get("samples", 0) + 1
+        self.client_info.put(f"{client_id}.link", link)
+        return link
+
+    def observe_rtt(self, client_id, seconds: float) -> dict:
+        return self.update(client_id, "rtt_s", seconds)
+
+    def observe_downlink(self, client_id, num_bytes: int, seconds: float) -> dict:
+        link = self.get(client_id)
+        seconds -= link.get("rtt_s", 0.0)
+        if num_bytes < MIN_THROUGHPUT_BYTES or seconds <= 0:
+            return link
+        return self.update(client_id, "downlink_Bps", num_bytes / seconds)
+
+    def observe_exchange(
+        self, client_id, bytes_down: int, bytes_up: int, seconds: float
+    ) -> dict:
+        """A request of "bytes_down" answered with "bytes_up" that spent
+        "seconds" on the network. Without a downlink estimate yet, both
+        directions are taken to share the same throughput."""
+        link = self.get(client_id)
+        seconds -= link.get("rtt_s", 0.0)
+        if bytes_down + bytes_up < MIN_THROUGHPUT_BYTES or seconds <= 0:
+            return link
+        if not link.get("downlink_Bps"):
+            link = self.update(
+                client_id, "downlink_Bps", (bytes_down + bytes_up) / seconds
+            )
+            return self.update(client_id, "uplink_Bps", link["downlink_Bps"])
+
+        upload_seconds = seconds - bytes_down / link["downlink_Bps"]
+        if bytes_up < MIN_THROUGHPUT_BYTES or upload_seconds <= 0:
+            return link
+        return self.update(client_id, "uplink_Bps", bytes_up / upload_seconds)
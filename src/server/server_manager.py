@@ -11,9 +11,11 @@ import time
 import os
 from threading import Event
 
+from server.server_job_queue import JobQueue
 from server.server_mqtt_manager import MQTTManager
+from server.server_send_budget import SendBudget
 from server.server_session_manager import FloSessionManager
-from server.server_state_manager import StateManager
+from server.server_state_manager import ClientInfoState, StateManager
 from utils.logger import FedLogger
 
 
@@ -25,11 +27,12 @@ class FlotillaServerManager:
         self.server_config = server_config
         self.state = self.server_config["state"]
 
-        self.client_info = StateManager(
+        self.client_info = ClientInfoState(
             loc=self.state["state_location"],
             name="client_info",
             host=self.state["state_hostname"],
             port=self.state["state_port"],
+            endpoints=self.state.get("state_endpoints"),
         )
 
         self.mqtt_config: dict = self.server_config["comm_config"]["mqtt"]
@@ -47,6 +50,55 @@ class FlotillaServerManager:
         print("[FLOW] server_manager.py: Starting MQTT Task Thread")
         self.mqtt_task.start()
 
+        # sessions share the client pool, client_info leases clients to them
+        self.max_concurrent_sessions: int = self.server_config.get(
+            "max_concurrent_sessions", 1
+        )
+        # bounds what all sessions together send to clients at once
+        grpc_config: dict = self.server_config["comm_config"]["grpc"]
+        self.send_budget = SendBudget(
+            max_sends=grpc_config.get("max_concurrent_sends"),
+            max_bytes=grpc_config.get("max_inflight_bytes"),
+        )
+        # {session_id: FloSessionManager} of the sessions running now
+        self.sessions = dict()
+        self.sessions_lock = threading.Lock()
+
+        # sessions submitted through the REST API wait here for a free slot
+        self.jobs = JobQueue(
+            StateManager(
+                loc=self.state["state_location"],
+                name="job_queue",
+                host=self.state["state_hostname"],
+                port=self.state["state_port"],
+                # fixed, so that a restarted server finds the same queue
+                state_id="server",
+                endpoints=self.state.get("state_endpoints"),
+            )
+        )
+
+    def reserve_session(self, id: str) -> str:
+        """Claims a slot for session "id". Returns None if it can run, or
+        why it cannot."""
+        with self.sessions_lock:
+            if id in self.sessions:
+                return f"Session {id} is already running"
+            if len(self.sessions) >= self.max_concurrent_sessions:
+                return f"{len(self.sessions)} sessions are already running"
+            self.sessions[id] = None
+        return None
+
+    def release_session(self, id: str) -> None:
+        """Gives up a slot claimed by reserve_session for a session that was
+        not started after all."""
+        with self.sessions_lock:
+            if id in self.sessions and self.sessions[id] is None:
+                del self.sessions[id]
+
+    def running_sessions(self) -> list:
+        with self.sessions_lock:
+            return list(self.sessions)
+
     async def run(
         self, id: str, train_config: dict, restore=False, revive=False, file=False
     ):
@@ -55,29 +107,56 @@ class FlotillaServerManager:
 
         self.logger.debug("fedserver.run.started", f"{id},{session_run_time}")
         print("[FLOW] server_manager.py: Creating FloSessionManager")
-        session = FloSessionManager(
-            id=id,
-            client_info=self.client_info,
-            mqtt_init_event=self.mqtt_init_finish_event,
-            server_config=self.server_config,
-            session_config=train_config,
-            restore=restore,
-            revive=revive,
-            file=file,
-        )
-        print("[FLOW] server_manager.py: Starting session")
-        await session.start_session()
+        try:
+            session = FloSessionManager(
+                id=id,
+                client_info=self.client_info,
+                mqtt_init_event=self.mqtt_init_finish_event,
+                server_config=self.server_config,
+                session_config=train_config,
+                restore=restore,
+                revive=revive,
+                file=file,
+                send_budget=self.send_budget,
+            )
+            with self.sessions_lock:
+                self.sessions[id] = session
+            print("[FLOW] server_manager.py: Starting session")
+            results = await session.start_session()
+        finally:
+            # before the session leaves the registry, so that the REST API
+            # finds every round's metrics in one place or the other
+            self.keep_progress(id)
+            with self.sessions_lock:
+                self.sessions.pop(id, None)
         print("[FLOW] server_manager.py: Session finished, renaming logs")
         os.rename(f"logs/flotilla_{id}.log",f"logs/flotilla_{id}_{train_config['session_id']}")
         self.logger.debug(
             "fedserver.run.finished", f"{id},{time.time()-session_run_time}"
         )
+        return results
 
-    def get_active_clients(self):
-        active_clients = [
-            client_id
-            for client_id in self.client_info.keys()
-            if self.client_info.get(f"{client_id}.is_active")
-        ]
+    def keep_progress(self, id: str) -> None:
+        """Copies the global validation metrics of every round of running
+        session "id", and its last progress, into its job record, where the
+        REST API reads them once the session is over."""
+        session = self.get_session(id)
+        if session is None or self.jobs.get(id) is None:
+            return
+        try:
+            progress = session.progress(start=0)
+        except Exception as e:
+            self.logger.warn("fedserver.run.progress", f"{id},{e}")
+            return
+        metrics = progress["metrics"]
+        self.jobs.record(
+            id, metrics=metrics, progress={**progress, "metrics": metrics[-1:]}
+        )
+
+    def get_session(self, id: str):
+        """The running FloSessionManager of session "id", or None."""
+        with self.sessions_lock:
+            return self.sessions.get(id)
 
-        return active_clients
+    def get_active_clients(self):
+        return self.client_info.active_clients()
@@ -5,12 +5,26 @@ Copyright 2023 Indian Institute of Science
 Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
 """
 
+import copy
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import time
+
 import torch
 from tqdm import tqdm
 
 from server.load_loss import load_loss
 from server.load_optimizer import load_optimizer
 from server.server_file_manager import get_model_class
+from server.server_validation import (
+    build_tensor_cache,
+    forward,
+    forward_shard,
+    init_worker,
+    stratified_estimate,
+    stratified_sample,
+)
 from utils.logger import FedLogger
 
 
@@ -28,15 +42,28 @@ class ServerModelManager:
         custom_dataloader_args: dict = None,
         use_custom_validator=False,
         custom_validator_args=None,
+        validation_config: dict = None,
     ) -> None:
         self.id = id
         self.torch_device = torch_device
         self.model_dir = model_dir
+        self.model_class = model_class
+        self.model_args = model_args
 
         torch.manual_seed(1122001)
         self.model = get_model_class(path=model_dir, class_name=model_class)(
             device=torch_device, args=model_args
         )
+        # held while weights are loaded into the model or copied out of it.
+        # The copy validates a snapshot of the weights while the global model
+        # moves on
+        self.weights_lock = threading.Lock()
+        with self.weights_lock:
+            self.validation_model = copy.deepcopy(self.model)
+        # held from loading a snapshot into the copy until it is validated,
+        # so that overlapping validations do not overwrite each other's
+        # weights
+        self.validation_lock = threading.Lock()
 
         self.logger = FedLogger(id=self.id, loggername="SERVER_MODEL_MANAGER")
 
@@ -57,12 +84,31 @@ class ServerModelManager:
         self.use_custom_validator = use_custom_validator
         self.custom_validator_args = custom_validator_args
 
+        # default validator only: with "tensor_cache" the validation set is
+        # decoded once into contiguous tensors and evaluated in "batch_size"
+        # batches, or sharded over "num_processes" worker processes of
+        # "num_threads" intra-op threads each. The server process keeps its
+        # own torch thread count. With "subsample_fraction" every
+        # round but the final one is validated on a stratified sample and
+        # reports "confidence_z" confidence intervals
+        validation_config = validation_config or dict()
+        self.tensor_cache: bool = validation_config.get("tensor_cache", False)
+        self.cache_batch_size: int = validation_config.get("batch_size", 1024)
+        self.num_threads = validation_config.get("num_threads")
+        self.num_processes: int = validation_config.get("num_processes", 0)
+        self.cache_path = validation_config.get("cache_path")
+        self.subsample_fraction = validation_config.get("subsample_fraction")
+        self.confidence_z: float = validation_config.get("confidence_z", 1.96)
+        self.cache = None
+        self.worker_pool = None
+
     def get_model_weights(self):
         self.model.to("cpu")
         return self.model.state_dict()
 
     def set_model_weights(self, model_weights):
-        self.model.load_state_dict(model_weights)
+        with self.weights_lock:
+            self.model.load_state_dict(model_weights)
 
     def get_model_params(self):
         return sum(p.numel() for p in self.model.parameters() if p.requires_grad)
@@ -88,7 +134,7 @@ class ServerModelManager:
         print("Length of test dataset", len(test_dataset))
 
         data = torch.utils.data.DataLoader(
-            dataset=test_dataset, batch_size=batch_size, shuffle=True
+            dataset=test_dataset, batch_size=batch_size, shuffle=False
         )
         return data
 
@@ -98,14 +144,40 @@ class ServerModelManager:
         loss_func=None,
         optimizer=None,
         round_no=None,
+        model_weights=None,
+        final=True,
     ):
+        """Validates the global model, or "model_weights" if given. Those are
+        loaded into a separate copy of the model so that the global model
+        can be updated while they are validated. Only rounds that are not
+        "final" are validated on a subsample."""
+        if model_weights is None:
+            return self.validate(
+                self.model, device, loss_func, optimizer, round_no, final
+            )
+        with self.validation_lock:
+            with self.weights_lock:
+                self.validation_model.load_state_dict(model_weights)
+            return self.validate(
+                self.validation_model, device, loss_func, optimizer, round_no, final
+            )
+
+    def validate(
+        self,
+        model,
+        device: str = "cpu",
+        loss_func=None,
+        optimizer=None,
+        round_no=None,
+        final=True,
+    ) -> dict:
         if self.use_custom_validator:
             validator = get_model_class(
                 path=self.model_dir, class_name="CustomModelTrainer"
             )
             res = validator.validate_model(
                 self,
-                model=self.model,
+                model=model,
                 dataloader=self.data,
                 device=device,
                 loss_func=loss_func,
@@ -114,10 +186,13 @@ class ServerModelManager:
                 args=self.custom_validator_args,
             )
 
+        elif self.tensor_cache:
+            res = self.validate_cached(model, round_no, final)
+
         else:
-            self.model = self.model.to(self.torch_device)
+            model = model.to(self.torch_device)
 
-            self.model.eval()
+            model.eval()
 
             acc = 0
             count = 0
@@ -130,7 +205,7 @@ class ServerModelManager:
                 ):
                     x_batch = x_batch.to(self.torch_device)
                     y_batch = y_batch.to(self.torch_device)
-                    y_pred = self.model(x_batch)
+                    y_pred = model(x_batch)
                     loss = cost(y_pred, y_batch)
                     total_loss += loss.item()
                     acc += (torch.argmax(y_pred, 1) == y_batch).float().sum().item()
@@ -140,8 +215,91 @@ class ServerModelManager:
             acc = (acc / count) * 100
             loss = total_loss / batches
 
-            self.model.train()
+            model.train()
             res = {"accuracy": acc, "loss": loss}
             print(res)
 
         return res
+
+    def validate_cached(self, model, round_no=None, final=True) -> dict:
+        if self.cache is None:
+            cache_start_time = time()
+            self.cache = build_tensor_cache(self.data, self.cache_path)
+            self.logger.info(
+                "fedserver.validation.tensor_cache",
+                f"num_samples-time_taken,{len(self.cache[1])},{time()-cache_start_time}",
+            )
+        inputs, labels = self.cache
+
+        indices, strata = None, None
+        if self.subsample_fraction and not final:
+            indices, strata = stratified_sample(
+                labels, self.subsample_fraction, seed=round_no
+            )
+            labels = labels[indices]
+
+        if self.num_processes > 1:
+            outputs = self.forward_sharded(model, indices, len(inputs))
+        else:
+            model = model.to(self.torch_device)
+            model.eval()
+            outputs = forward(
+                model,
+                inputs if indices is None else inputs[indices],
+                self.cache_batch_size,
+                self.torch_device,
+            )
+            model.train()
+
+        # per sample losses, so that a subsample can be extrapolated
+        losses = self.loss_fun(reduction="none")(outputs, labels)
+        losses = losses.reshape(len(labels), -1).mean(dim=1)
+        correct = (torch.argmax(outputs, 1) == labels).float()
+        if strata is None:
+            return {
+                "accuracy": correct.sum().item() / len(labels) * 100,
+                "loss": losses.double().mean().item(),
+            }
+
+        acc, acc_ci = stratified_estimate(correct, strata, self.confidence_z)
+        loss, loss_ci = stratified_estimate(losses, strata, self.confidence_z)
+        return {
+            "accuracy": acc * 100,
+            "loss": loss,
+            "accuracy_ci": acc_ci * 100,
+            "loss_ci": loss_ci,
+            "num_samples": len(labels),
+        }
+
+    def forward_sharded(self, model, indices, num_samples):
+        if self.worker_pool is None:
+            # spawned rather than forked, torch's thread pools do not survive
+            # a fork
+            self.worker_pool = ProcessPoolExecutor(
+                max_workers=self.num_processes,
+                mp_context=get_context("spawn"),
+                initializer=init_worker,
+                initargs=(
+                    self.model_dir,
+                    self.model_class,
+                    self.model_args,
+                    self.cache_path or self.cache[0],
+                    self.num_threads or 1,
+                ),
+            )
+        if indices is None:
+            indices = torch.arange(num_samples)
+        shards = torch.tensor_split(indices, self.num_processes)
+        model_weights = {k: v.cpu() for k, v in model.state_dict().items()}
+        outputs = self.worker_pool.map(
+            forward_shard,
+            [model_weights] * len(shards),
+            shards,
+            [self.cache_batch_size] * len(shards),
+        )
+        return torch.cat(list(outputs))
+
+    def close(self) -> None:
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+            self.worker_pool = None
@@ -11,6 +11,7 @@ from threading import Event, Thread
 
 import paho.mqtt.client as mqtt
 
+from server.server_availability import AvailabilityModel
 from utils.hardware_info import get_hardware_info
 from utils.logger import FedLogger
 
@@ -31,10 +32,23 @@ class MQTTManager:
         ]
         self.max_heartbeats_miss_threshold: int = config["max_heartbeat_miss_threshold"]
         self.type_: str = config["type"]
+        self.availability_prior_session_s: float = config.get(
+            "availability_prior_session_s", 3600
+        )
 
         self.heard_from_client_event: Event = Event()
 
     def mqtt_ad(self, client_info, stop_event, grpc_event):
+        # the silence after which heartbeat_alive_check gives a client up
+        max_gap_s = (
+            self.max_heartbeats_miss_threshold * self.mqtt_heartbeat_interval_s + 2
+        )
+        self.availability = AvailabilityModel(
+            client_info,
+            prior_session_s=self.availability_prior_session_s,
+            max_gap_s=max_gap_s,
+        )
+
         def on_connect(client, userdata, flags, rc):
             self.logger.info(
                 "MQTT.server.connect.request", f"MQTT connection status,{rc}"
@@ -63,32 +77,26 @@ class MQTTManager:
 
             client_id = list(info.keys())[0]
 
-            client_name = info[str(client_id)]["payload"]["name"]
-            client_info.put(f"{client_id}.client_name", client_name)
-
-            grpc_ep = info[str(client_id)]["payload"]["grpc_ep"]
-            client_info.put(f"{client_id}.grpc_ep", grpc_ep)
-
-            benchmark_info = info[str(client_id)]["payload"]["benchmark_info"]
-            client_info.put(f"{client_id}.benchmark_info", benchmark_info)
-
-            hardware_information = info[str(client_id)]["payload"]["hw_info"]
-            client_info.put(f"{client_id}.hardware_information", hardware_information)
-
-            role = info[str(client_id)]["payload"]["type"]
-            client_info.put(f"{client_id}.role", role)
-
-            dataset_details = info[str(client_id)]["payload"]["datasets"]
-            client_info.put(f"{client_id}.dataset_details", dataset_details)
-
-            models = info[str(client_id)]["payload"]["models"]
-            client_info.put(f"{client_id}.models", models)
-
-            client_info.put(f"{client_id}.is_active", True)
-            client_info.put(f"{client_id}.is_training", False)
-            client_info.put(f"{client_id}.heartbeat.timestamp", [time.time()])
-            client_info.put(f"{client_id}.heartbeat.interval", 0)
-            client_info.put(f"{client_id}.join_timestamp", time.time())
+            payload = info[str(client_id)]["payload"]
+            client_name = payload["name"]
+            grpc_ep = payload["grpc_ep"]
+
+            client_info.register_client(
+                client_id,
+                {
+                    "client_name": client_name,
+                    "grpc_ep": grpc_ep,
+                    "benchmark_info": payload["benchmark_info"],
+                    "hardware_information": payload["hw_info"],
+                    "role": payload["type"],
+                    "dataset_details": payload["datasets"],
+                    "models": payload["models"],
+                    "heartbeat.timestamp": [time.time()],
+                    "heartbeat.interval": 0,
+                    "join_timestamp": time.time(),
+                },
+            )
+            self.availability.on_join(client_id)
 
             self.logger.info(
                 "MQTT.server.ad_response_received",
@@ -116,13 +124,11 @@ class MQTTManager:
 
             try:
                 server_time = time.time()
-                client_heartbeat_timestamp = (
-                    client_info.get(f"{client_id}.heartbeat.timestamp")
-                    if isinstance(
-                        client_info.get(f"{client_id}.heartbeat.timestamp"), list
-                    )
-                    else [time.time()]
+                client_heartbeat_timestamp = client_info.get(
+                    f"{client_id}.heartbeat.timestamp"
                 )
+                if not isinstance(client_heartbeat_timestamp, list):
+                    client_heartbeat_timestamp = [time.time()]
                 interval = round(
                     (server_time - client_heartbeat_timestamp[-1]),
                     2,
@@ -132,13 +138,17 @@ class MQTTManager:
                     len(client_heartbeat_timestamp)
                     == self.num_heartbeats_timestamp_cached
                 ):
-                    client_heartbeat_timestamp.pop()
+                    client_heartbeat_timestamp.pop(0)
                 client_heartbeat_timestamp.append(server_time)
 
-                client_info.put(f"{client_id}.heartbeat.interval", interval)
-                client_info.put(
-                    f"{client_id}.heartbeat.timestamp", client_heartbeat_timestamp
+                client_info.put_record(
+                    client_id,
+                    {
+                        "heartbeat.interval": interval,
+                        "heartbeat.timestamp": client_heartbeat_timestamp,
+                    },
                 )
+                self.availability.on_heartbeat(client_id, server_time)
             except KeyError:
                 self.logger.warn(
                     "MQTT.server.heartbeat.invalid.client",
@@ -214,11 +224,11 @@ class MQTTManager:
     def heartbeat_alive_check(self, client_info):
         heartbeat_interval_flag = Event()
         while not heartbeat_interval_flag.is_set():
-            for client in client_info.keys():
-                if client_info.get(f"{client}.is_active"):
-                    if time.time() - client_info.get(f"{client}.heartbeat.timestamp")[
-                        -1
-                    ] >= (
+            active_clients = client_info.active_clients()
+            client_records = client_info.get_records(active_clients)
+            for client, record in client_records.items():
+                if record.get("is_active"):
+                    if time.time() - record["heartbeat.timestamp"][-1] >= (
                         (
                             self.max_heartbeats_miss_threshold
                             * self.mqtt_heartbeat_interval_s
@@ -230,6 +240,6 @@ class MQTTManager:
                             "MQTT.server.heartbeat.delayed",
                             f"Removing client:{client} from active clients",
                         )
-                        client_info.put(f"{client}.is_active", False)
-                        client_info.put(f"{client}.is_training", False)
+                        client_info.set_active(client, False)
+                        self.availability.on_leave(client)
             heartbeat_interval_flag.wait(self.mqtt_heartbeat_interval_s)
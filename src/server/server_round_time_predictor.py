@@ -0,0 +1,64 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import numpy as np
+
+from server.server_client_view import ClientView
+
+
+def predicted_round_times(client_view: ClientView, clients: list, z: float):
+    """
+    Round time each client is expected to finish within, mean + z * std of
+    its observed round times. Clients that have not finished a round yet are
+    estimated from their benchmark latency, scaled by the median ratio of
+    observed round time to benchmark latency over the clients that have.
+    Returns NaN where neither is known.
+    """
+    rows = client_view.rows(clients)
+    mean = client_view.round_time_mean[rows]
+    std = client_view.round_time_std[rows]
+    latency = client_view.latency[rows]
+    predicted = mean + z * std
+
+    observed = ~np.isnan(mean) & ~np.isnan(latency) & (latency > 0)
+    unobserved = np.isnan(mean) & ~np.isnan(latency)
+    if observed.any() and unobserved.any():
+        scale = np.median(mean[observed] / latency[observed])
+        predicted[unobserved] = latency[unobserved] * scale
+    return predicted
+
+
+class RoundTimePredictor:
+    """
+    Learns how long a training round takes on each client, end to end as seen
+    by the server: sending the model, local training and returning the update.
+
+    Every finished round updates an exponentially weighted mean and variance
+    of the client's round time, stored as "{client_id}.round_time" =
+    {"mean": .., "var": .., "samples": ..} in training_state so that it is
+    checkpointed with the session. "alpha" is the weight of the newest
+    observation.
+    """
+
+    def __init__(self, training_state, alpha: float = 0.3) -> None:
+        self.training_state = training_state
+        self.alpha = alpha
+
+    def observe(self, client_id, round_time: float) -> dict:
+        estimate = self.training_state.get(f"{client_id}.round_time")
+        if not estimate:
+            estimate = {"mean": float(round_time), "var": 0.0, "samples": 1}
+        else:
+            diff = round_time - estimate["mean"]
+            increment = self.alpha * diff
+            estimate = {
+                "mean": estimate["mean"] + increment,
+                "var": (1 - self.alpha) * (estimate["var"] + diff * increment),
+                "samples": estimate["samples"] + 1,
+            }
+        self.training_state.put(f"{client_id}.round_time", estimate)
+        return estimate
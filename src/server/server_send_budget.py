@@ -0,0 +1,79 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import asyncio
+from collections import deque
+from threading import Lock
+
+
+def wake(future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class SendBudget:
+    """
+    Bounds the requests the server is sending at once, to at most
+    "max_sends" of them and "max_bytes" of request bytes. Either bound may be
+    None for no bound. Sends are let through in the order they asked for
+    room, so a large one is not starved by smaller ones behind it, and one
+    larger than "max_bytes" on its own goes through once nothing else is in
+    flight. One budget is shared by all sessions, each of which runs its own
+    event loop in its own thread.
+    """
+
+    def __init__(self, max_sends: int = None, max_bytes: int = None) -> None:
+        self.max_sends = max_sends
+        self.max_bytes = max_bytes
+        self.sends = 0
+        self.bytes = 0
+        # [size, future, granted] of the sends waiting for room, first come
+        # first
+        self.waiting = deque()
+        self.lock = Lock()
+
+    def fits(self, size: int) -> bool:
+        if self.sends == 0:
+            return True
+        if self.max_sends is not None and self.sends >= self.max_sends:
+            return False
+        return self.max_bytes is None or self.bytes + size <= self.max_bytes
+
+    async def acquire(self, size: int) -> None:
+        with self.lock:
+            if not self.waiting and self.fits(size):
+                self.sends += 1
+                self.bytes += size
+                return
+            waiter = [size, asyncio.get_running_loop().create_future(), False]
+            self.waiting.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self.lock:
+                granted = waiter[2]
+                if not granted:
+                    self.waiting.remove(waiter)
+            if granted:
+                # room was made for it just before it was cancelled
+                self.release(size)
+            raise
+
+    def release(self, size: int) -> None:
+        with self.lock:
+            self.sends -= 1
+            self.bytes -= size
+            while self.waiting and self.fits(self.waiting[0][0]):
+                waiter = self.waiting.popleft()
+                # the waiter may belong to another session's event loop
+                loop = waiter[1].get_loop()
+                if loop.is_closed():
+                    continue
+                waiter[2] = True
+                self.sends += 1
+                self.bytes += waiter[0]
+                loop.call_soon_threadsafe(wake, waiter[1])
@@ -1,12 +1,18 @@
 import asyncio
-import io
+import copy
+import inspect
+import math
 import os
 import pickle
+import random
 import sys
-import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event
 from time import time
 
 import grpc
+import numpy as np
 from torch import device as torch_device
 from torch.cuda import is_available
 from typing_extensions import OrderedDict
@@ -15,17 +21,30 @@ import proto.grpc_pb2 as grpc_pb2
 import proto.grpc_pb2_grpc as grpc_pb2_grpc
 from server.load_aggregator import load_aggregator
 from server.load_client_selection import load_client_selection
+from server.server_checkpoint_manager import CheckpointManager, put_series
+from server.server_client_view import benchmark_latency, build_client_view
 from server.server_file_manager import (
     OpenYaML,
     get_available_datasets,
     get_model_dir_hash,
 )
+from server.server_link_estimator import LinkEstimator
 from server.server_model_manager import ServerModelManager
+from server.server_round_time_predictor import (
+    RoundTimePredictor,
+    predicted_round_times,
+)
+from server.server_send_budget import SendBudget
 from server.server_state_manager import StateManager
+from utils.hardware_info import hardware_fingerprint
 from utils.logger import FedLogger
 from utils.plot import Plot
 
 
+def payload_size(payload: dict) -> int:
+    return sum(len(value) for value in payload.values())
+
+
 class FloSessionManager:
     def __init__(
         self,
@@ -37,6 +56,7 @@ class FloSessionManager:
         restore,
         revive,
         file,
+        send_budget: SendBudget = None,
     ) -> None:
         self.id = id
         self.logger = FedLogger(id=self.id, loggername="SESSION_MANAGER")
@@ -52,10 +72,12 @@ class FloSessionManager:
             self.state_location = self.state["state_location"]
             self.state_hostname = self.state["state_hostname"]
             self.state_port = self.state["state_port"]
+            self.state_endpoints = self.state.get("state_endpoints")
         except KeyError:
             self.state_location = "inmemory"
             self.state_hostname = None
             self.state_port = None
+            self.state_endpoints = None
 
         grpc_max_message_length: int = server_config["comm_config"]["grpc"][
             "max_message_length"
@@ -68,9 +90,30 @@ class FloSessionManager:
             ("grpc.enable_http_proxy", 0),
         ]
         self.grpc_timeout: int = server_config["comm_config"]["grpc"]["timeout_s"]
+        # CancelTraining is tiny and must not hang for as long as a round may
+        self.grpc_cancel_timeout: float = server_config["comm_config"]["grpc"].get(
+            "cancel_timeout_s", 10
+        )
+        # a training channel may reconnect from a broken connection for this
+        # long before its client is given up on
+        self.channel_failure_grace_s: float = server_config["comm_config"][
+            "grpc"
+        ].get("channel_failure_grace_s", 10)
         self.grpc_chunk_size: int = server_config["comm_config"]["grpc"][
             "chunk_size_bytes"
         ]
+        # model files and StartTraining/StartValidation requests being sent
+        # at once, by count and by bytes, shared with the server's other
+        # sessions when the server manager passes its budget in
+        self.send_budget = send_budget or SendBudget(
+            max_sends=server_config["comm_config"]["grpc"].get("max_concurrent_sends"),
+            max_bytes=server_config["comm_config"]["grpc"].get("max_inflight_bytes"),
+        )
+        # (model_wts, loss, optimizer, pickled request fields) of the round
+        # being sent, pickled once for all of its clients and dropped once
+        # none of the "pending_sends" still needs it
+        self.round_payload = None
+        self.pending_sends = 0
 
         self.temp_dir_path: str = server_config["temp_dir_path"]
         self.checkpoint_dir_path: str = server_config["checkpoint_dir_path"]
@@ -82,6 +125,7 @@ class FloSessionManager:
             host=self.state_hostname,
             port=self.state_port,
             state_id=self.id,
+            endpoints=self.state_endpoints,
         )
         self.training_state = StateManager(
             loc=self.state_location,
@@ -89,6 +133,7 @@ class FloSessionManager:
             host=self.state_hostname,
             port=self.state_port,
             state_id=self.id,
+            endpoints=self.state_endpoints,
         )
         self.client_selection_state = StateManager(
             loc=self.state_location,
@@ -96,6 +141,7 @@ class FloSessionManager:
             host=self.state_hostname,
             port=self.state_port,
             state_id=self.id,
+            endpoints=self.state_endpoints,
         )
         self.aggregator_state = StateManager(
             loc=self.state_location,
@@ -103,6 +149,33 @@ class FloSessionManager:
             host=self.state_hostname,
             port=self.state_port,
             state_id=self.id,
+            endpoints=self.state_endpoints,
+        )
+        # benchmark results of every session, by hardware fingerprint and
+        # benchmark model hash. A client that restarts, or joins with the
+        # same hardware as one already benchmarked, is not benchmarked again
+        self.benchmark_cache = StateManager(
+            loc=self.state_location,
+            name="benchmark_cache",
+            host=self.state_hostname,
+            port=self.state_port,
+            state_id="server",
+            endpoints=self.state_endpoints,
+        )
+
+        self.checkpointer = CheckpointManager(
+            id=self.id,
+            checkpoint_dir_path=self.checkpoint_dir_path,
+            states={
+                "training_session": self.training_session,
+                "training_state": self.training_state,
+                "client_selection_state": self.client_selection_state,
+                "aggregator_state": self.aggregator_state,
+            },
+            compaction_interval=server_config.get(
+                "checkpoint_compaction_interval", 10
+            ),
+            resume=restore or revive,
         )
 
         if restore or revive:
@@ -111,11 +184,9 @@ class FloSessionManager:
             else:
                 session_config = self.restore(restore, revive)
         else:
-            results = dict()
             self.training_session.put(f"{self.id}.session_config", session_config)
             self.training_session.put(f"{self.id}.status", "running")
             self.training_session.put(f"{self.id}.last_round_number", 0)
-            self.training_session.put(f"{self.id}.global_validation_metrics", results)
 
         if session_config["session_config"]["use_gpu"]:
             self.torch_device = torch_device("cuda" if is_available() else "cpu")
@@ -126,7 +197,13 @@ class FloSessionManager:
 
         self.aggregator = session_config["session_config"]["aggregator"]
         self.aggregator_args = session_config["session_config"]["aggregator_args"]
-        self.aggregate = load_aggregator(self.id, self.aggregator).aggregate
+        aggregator_module = load_aggregator(self.id, self.aggregator)
+        self.aggregate = aggregator_module.aggregate
+        # asynchronous aggregators weigh an update by its staleness, the
+        # others only take updates for the round that is still open
+        self.accepts_stale_updates: bool = getattr(
+            aggregator_module, "ACCEPTS_STALE_UPDATES", False
+        )
         self.client_selection_strategy = session_config["session_config"][
             "client_selection"
         ]
@@ -136,6 +213,18 @@ class FloSessionManager:
         self.client_selection = load_client_selection(
             self.id, self.client_selection_strategy
         ).client_selection
+        # strategies written against the ClientView snapshot take a
+        # "client_view" argument, older ones read the state managers directly
+        self.client_selection_takes_view = (
+            "client_view" in inspect.signature(self.client_selection).parameters
+        )
+        self.round_time_predictor = RoundTimePredictor(
+            self.training_state,
+            alpha=server_config.get("round_time_ewma_alpha", 0.3),
+        )
+        self.link_estimator = LinkEstimator(
+            self.client_info, alpha=server_config.get("link_ewma_alpha", 0.3)
+        )
 
         self.checkpoint_interval = (
             session_config["session_config"]["checkpoint_interval"]
@@ -146,9 +235,75 @@ class FloSessionManager:
         self.server_validation_interval = session_config["session_config"][
             "validation_round_interval"
         ]
+        # validate the global model of round v in a background worker while
+        # round v+1 trains. Metrics are appended under the round they belong
+        # to once they are ready
+        self.overlap_validation: bool = session_config["session_config"].get(
+            "overlap_validation", False
+        )
+        self.validation_worker = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="validation")
+            if self.overlap_validation
+            else None
+        )
+        # number of clients selected on top of what the strategy asked for. The
+        # round is aggregated once the strategy's count of updates is in and
+        # the remaining in-flight clients are cancelled
+        self.over_commit: int = session_config["session_config"].get("over_commit", 0)
+        # {client_id: (round_no, task, start_time)} for every StartTraining call
+        # in flight
+        self.inflight = dict()
+        # speculative execution: a StartTraining call still running
+        # "speculative_z" standard deviations past its expected round time is
+        # duplicated on the fastest idle client and the first result is used
+        self.speculative_z = session_config["session_config"].get("speculative_z")
+        self.speculative_poll_s: float = session_config["session_config"].get(
+            "speculative_poll_s", 1.0
+        )
+        # with a deadline every training client gets the mini-batch budget it
+        # is expected to finish by then, instead of the uniform timeout
+        self.mini_batch_deadline_s = session_config["session_config"].get(
+            "mini_batch_deadline_s"
+        )
+        # event driven dispatch for asynchronous strategies: keep this many
+        # clients training and refill a slot as soon as an update is in
+        self.concurrency_target: int = session_config["session_config"].get(
+            "concurrency_target", 0
+        )
+        self.dispatch_poll_s: float = session_config["session_config"].get(
+            "dispatch_poll_s", 1.0
+        )
+        # wall-clock bound of a round: clients still training when it passes
+        # are told to stop and return what they have trained so far
+        self.round_deadline_s = session_config["session_config"].get(
+            "round_deadline_s"
+        )
+        # CancelTraining calls in flight, kept so that they are not collected
+        self.cancel_requests = set()
+        # {straggler_client_id: backup_client_id}
+        self.backups = dict()
+        # clients whose update lost the race against their pair
+        self.superseded = set()
+        # clients given up on mid-call, by a missed heartbeat or a broken
+        # channel. Their StartTraining call is cancelled and reported to the
+        # aggregator as a dropped client rather than waiting out grpc_timeout
+        self.lost_clients = set()
+        self.loop = None
+        # {fingerprint: clients} waiting on the background benchmark of one of
+        # them, and the tasks running those benchmarks
+        self.benchmark_groups = dict()
+        self.benchmark_tasks = set()
+
         self.generate_plots = session_config["session_config"]["generate_plots"]
+        self.plot_stop_event = Event()
         if self.generate_plots:
-            plotting_obj = Plot(self.id)
+            plotting_obj = Plot(
+                self.id,
+                metrics_series=lambda: self.training_session.series_range(
+                    f"{self.id}.global_validation_metrics", max_points=500
+                ),
+                stop_event=self.plot_stop_event,
+            )
 
         self.bench_config: dict = session_config["benchmark_config"]
         try:
@@ -186,6 +341,7 @@ class FloSessionManager:
             use_custom_validator=self.model_config["use_custom_validator"],
             custom_validator_args=self.model_config["custom_validator_args"],
             model_args=self.model_config["model_args"],
+            validation_config=self.train_config.get("validation_config"),
         )
 
         self.model_util.set_loss_fun(
@@ -203,8 +359,10 @@ class FloSessionManager:
             )
         else:
             print("INITIATING RANDOM MODEL")
+            # a copy, the live weights are loaded into in place every round
             self.training_session.put(
-                f"{self.id}.global_model", self.model_util.get_model_weights()
+                f"{self.id}.global_model",
+                copy.deepcopy(self.model_util.get_model_weights()),
             )
 
     def restore(self, restore, revive):
@@ -236,41 +394,31 @@ class FloSessionManager:
         self.client_selection_state.clear()
         self.aggregator_state.clear()
         active_clients = self.get_active_clients()
-        with tarfile.open(
-            os.path.join(self.checkpoint_dir_path, f"checkpoint_{self.id}.tar")
-        ) as tf:
-            training_session_bytearray = tf.extractfile(
-                f"training_session_{self.id}"
-            ).read()
-            self.training_session.putall(pickle.loads(training_session_bytearray))
-            training_state_bytearray = tf.extractfile(
-                f"training_state_{self.id}"
-            ).read()
-            self.training_state.putall(pickle.loads(training_state_bytearray))
-            session_clients = self.training_state.keys()
-            session_config = self.training_session.get(f"{self.id}.session_config")
-
-            restore_check = (
-                True if set(active_clients) == set(session_clients) else False
-            )
-            if restore and restore_check:
-                print("RESTORING FROM FILE")
-                client_selection_bytearray = tf.extractfile(
-                    f"client_selection_state_{self.id}"
-                ).read()
-                self.client_selection_state.putall(
-                    pickle.loads(client_selection_bytearray)
-                )
-                aggregator_state_bytearray = tf.extractfile(
-                    f"aggregator_state_{self.id}"
-                ).read()
-                self.aggregator_state.putall(pickle.loads(aggregator_state_bytearray))
-            elif revive:
-                print("REVIVING")
-                self.training_state.clear()
-            else:
-                raise Exception("Session can't continue")
-            return session_config
+        restored, restored_series = self.checkpointer.restore(lazy=True)
+
+        self.training_session.putall(restored["training_session"])
+        put_series(self.training_session, restored_series["training_session"])
+        self.training_state.putall(restored["training_state"])
+        put_series(self.training_state, restored_series["training_state"])
+        session_clients = self.training_state.keys()
+        session_config = self.training_session.get(f"{self.id}.session_config")
+
+        restore_check = True if set(active_clients) == set(session_clients) else False
+        if restore and restore_check:
+            print("RESTORING FROM FILE")
+            self.client_selection_state.putall(restored["client_selection_state"])
+            self.aggregator_state.putall(restored["aggregator_state"])
+        elif revive:
+            print("REVIVING")
+            self.training_state.clear()
+        else:
+            raise Exception("Session can't continue")
+
+        # what was just loaded is already on disk, only later changes are new
+        for state in self.checkpointer.states.values():
+            state.pop_dirty()
+            state.pop_dirty_series()
+        return session_config
 
     async def start_session(self):
         print(f"[FLOW] server_session_manager.py: start_session called for {self.id}")
@@ -278,6 +426,8 @@ class FloSessionManager:
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(None, self.mqtt_init_event.wait)
         print("[FLOW] server_session_manager.py: MQTT initialization complete")
+        self.loop = loop
+        self.client_info.add_inactive_listener(self.on_client_inactive)
 
         active_clients = self.get_active_clients()
         if len(active_clients) > 0:
@@ -287,9 +437,34 @@ class FloSessionManager:
             print("[FLOW] server_session_manager.py: No active clients found for Echo")
 
         print("[FLOW] server_session_manager.py: Starting training loop")
-        await self.train()
+        try:
+            await self.train()
+        finally:
+            self.client_info.remove_inactive_listener(self.on_client_inactive)
+            # benchmarks still running are of no use to this session anymore
+            benchmark_tasks = list(self.benchmark_tasks)
+            for task in benchmark_tasks:
+                task.cancel()
+            await asyncio.gather(*benchmark_tasks, return_exceptions=True)
+            # the fleet is shared, clients this session still holds go back
+            self.client_info.release_session(self.id)
+        if self.validation_worker:
+            # metrics of the last rounds may still be in the works
+            await loop.run_in_executor(None, self.validation_worker.shutdown)
+            if self.checkpoint_interval:
+                self.checkpoint(
+                    self.training_session.get(f"{self.id}.last_round_number") - 1
+                )
+        self.model_util.close()
+        await loop.run_in_executor(None, self.checkpointer.close)
+        self.plot_stop_event.set()
 
-        results = self.training_session.get(f"{self.id}.global_validation_metrics")
+        results = dict()
+        for _, metrics in self.training_session.series_range(
+            f"{self.id}.global_validation_metrics"
+        ):
+            for key, value in metrics.items():
+                results.setdefault(key, list()).append(value)
         for key in results:
             self.logger.info(
                 f"session.train.{key}", ",".join([str(x) for x in results[key]])
@@ -297,7 +472,7 @@ class FloSessionManager:
         self.logger.info(
             "fedserver_session_finished_running", f"{self.id}.finished_running"
         )
-        return
+        return results
 
     async def grpc_echo(self, client_id: str) -> None:
         """
@@ -313,9 +488,11 @@ class FloSessionManager:
 
         try:
             stub = grpc_pb2_grpc.EdgeServiceStub(channel)
+            rpc_start_time = time()
             response = await stub.Echo(
                 grpc_pb2.echoMessage(text=f"{self.id}"), timeout=self.grpc_timeout
             )
+            self.link_estimator.observe_rtt(client_id, time() - rpc_start_time)
         except AttributeError:
             self.logger.error("fedserver_gRPC.echo.invalid_channel", f"{client_id}")
             response = None
@@ -373,20 +550,32 @@ class FloSessionManager:
                 channel = grpc.aio.insecure_channel(f"{grpc_ep}", self.grpc_opts)
                 stub = grpc_pb2_grpc.EdgeServiceStub(channel)
                 if os.path.isdir(path):
-                    for f in os.scandir(path):
-                        if os.path.isfile(f.path):
+                    files = [f.path for f in os.scandir(path) if os.path.isfile(f.path)]
+                    model_bytes = sum(os.path.getsize(f) for f in files)
+                    sent_bytes, send_time = 0, 0.0
+                    await self.send_budget.acquire(model_bytes)
+                    try:
+                        for file_path in files:
+                            file_start_time = time()
                             response = await stub.StreamFile(
-                                self.stream_file_chunk(model_id=model_id, path=f.path),
+                                self.stream_file_chunk(model_id=model_id, path=file_path),
                                 timeout=self.grpc_timeout,
                             )
                             self.logger.info(
                                 "fedserver_gRPC.send_model.cache_miss",
                                 f"{client_id},{response}",
                             )
+                            send_time += time() - file_start_time
+                            sent_bytes += os.path.getsize(file_path)
                             models_on_client[model_id] = model_hash
                             self.client_info.put(
                                 f"{client_id}.models", models_on_client
                             )
+                    finally:
+                        self.send_budget.release(model_bytes)
+                    self.link_estimator.observe_downlink(
+                        client_id, sent_bytes, send_time
+                    )
                 else:
                     self.logger.error(
                         "fedserver_gRPC.send_model.invaid.path",
@@ -445,7 +634,6 @@ class FloSessionManager:
         """
         start_time = time()
         try:
-            self.client_info.put(f"{client_id}.is_training", True)
             self.logger.info("fedserver_gRPC.bench.connect", f"{client_id}")
             grpc_ep = self.client_info.get(f"{client_id}.grpc_ep")
             channel = grpc.aio.insecure_channel(f"{grpc_ep}", self.grpc_opts)
@@ -522,7 +710,7 @@ class FloSessionManager:
             f"client_id and time,{client_id},{time()-start_time}",
         )
 
-        self.client_info.put(f"{client_id}.is_training", False)
+        self.client_info.release(self.id, client_id)
 
     async def benchmark(self, clients):
         """
@@ -562,6 +750,85 @@ class FloSessionManager:
             "fedserver_gRPC.bench.finished", f"time_taken,{time()-start_time}"
         )
 
+    def serialize_round(self, model_wts, loss, optimizer) -> dict:
+        """The pickled model config, "model_wts", "loss" and "optimizer"
+        request fields. Pickled once for every client the same objects are
+        sent to, rather than once per client."""
+        if self.round_payload is None or any(
+            cached is not current
+            for cached, current in zip(
+                self.round_payload[:3], (model_wts, loss, optimizer)
+            )
+        ):
+            pickle_time = time()
+            payload = {
+                "model_config": pickle.dumps(self.model_config),
+                "model_wts": pickle.dumps(model_wts),
+                "loss_function": pickle.dumps(loss),
+                "optimizer": pickle.dumps(optimizer),
+            }
+            self.logger.info(
+                "fedserver_gRPC.round.pickle.time",
+                f"size-time_taken,{payload_size(payload)},{time() - pickle_time}",
+            )
+            self.round_payload = (model_wts, loss, optimizer, payload)
+        return self.round_payload[3]
+
+    async def send_within_budget(
+        self, client_id, channel, method, response_class, build_request, size
+    ):
+        """
+        Waits for room for "size" bytes in the send budget, then sends the
+        request "build_request" makes to the unary EdgeService "method". It
+        is called as a client streaming method, the same call on the wire,
+        so that writing the request completes on its own once it is handed
+        to the transport. Room is given back then, and the budget bounds the
+        sending rather than the training. The request is built only once
+        there is room, so requests waiting for it do not hold a copy of
+        their payload. Returns the call, to await the response on, and the
+        time its send began, which a client's round time counts from.
+        """
+        queue_time = time()
+        self.pending_sends += 1
+        try:
+            await self.send_budget.acquire(size)
+        except asyncio.CancelledError:
+            self.finish_send()
+            raise
+        send_start_time = time()
+        if client_id in self.inflight:
+            # the time spent queued is not the client's doing
+            round_no, task, _ = self.inflight[client_id]
+            self.inflight[client_id] = (round_no, task, send_start_time)
+        call = None
+        try:
+            call = channel.stream_unary(
+                f"/EdgeService/{method}",
+                request_serializer=lambda request: request.SerializeToString(),
+                response_deserializer=response_class.FromString,
+            )(timeout=self.grpc_timeout)
+            await call.write(build_request())
+            await call.done_writing()
+            self.logger.info(
+                "fedserver_gRPC.send.finished",
+                f"client_id-method-bytes-queue_time-send_time,{client_id},{method},{size},{send_start_time-queue_time},{time()-send_start_time}",
+            )
+        except asyncio.CancelledError:
+            if call is not None:
+                call.cancel()
+            raise
+        finally:
+            self.send_budget.release(size)
+            self.finish_send()
+        return call, send_start_time
+
+    def finish_send(self):
+        self.pending_sends -= 1
+        if self.pending_sends == 0:
+            # every client of the round has its request, the pickled round
+            # need not outlive the training it started
+            self.round_payload = None
+
     async def async_grpc_train(
         self,
         client_id: str,
@@ -579,64 +846,69 @@ class FloSessionManager:
         optimizer,
         model_updated_event,
         model_updated_condition,
+        max_mini_batch_count: int = None,
+        completions: asyncio.Queue = None,
     ) -> None:
         """
         Asynchronous function that initiates a training round of round number "round_no"
-        with whose ID is passed to it as the argument "client_id".
+        with whose ID is passed to it as the argument "client_id". The client
+        trains for "timeout_duration_s" unless it is given a
+        "max_mini_batch_count" budget. With a "completions" queue the
+        response is handed to the dispatcher's aggregation worker instead of
+        running the callback here.
         """
         train_start_time = time()
+        finish_time = None
         self.logger.info("fedserver_gRPC.train.connect", f"connecting to,{client_id}")
+        watcher = None
         try:
             grpc_ep = self.client_info.get(f"{client_id}.grpc_ep")
             channel = grpc.aio.insecure_channel(f"{grpc_ep}", self.grpc_opts)
-            stub = grpc_pb2_grpc.EdgeServiceStub(channel)
+            watcher = asyncio.create_task(self.watch_channel(client_id, channel))
 
             self.logger.info("fedserver_gRPC.train.await.response", f"{client_id}")
-            model_config = pickle.dumps(self.model_config)
-            weights_time = time()
-            serialized_model_wts: bytes = pickle.dumps(model_wts)
-            self.logger.info(
-                "fedserver_gRPC.train.round.model_wts.pickle.time",
-                f"client_id-round_no-time_taken,{client_id},{round_no},{time() - weights_time}",
-            )
+            payload = self.serialize_round(model_wts, loss, optimizer)
 
-            loss_time = time()
-            serialized_loss_fun: bytes = pickle.dumps(loss)
-            self.logger.info(
-                "fedserver_gRPC.train.round.loss_function.pickle.time",
-                f"client_id - round_no - time_taken,{client_id},{round_no},{time() - loss_time}",
+            round_bound = (
+                {"max_mini_batch_count": max_mini_batch_count}
+                if max_mini_batch_count
+                else {"timeout_duration_s": timeout_duration_s}
             )
-
-            optimizer_time = time()
-            serialized_optimizer: bytes = pickle.dumps(optimizer)
-            self.logger.info(
-                "fedserver_gRPC.train.round.optimizer.pickle.time",
-                f"client_id - round_no - time_taken,{client_id},{round_no},{time() - optimizer_time}",
-            )
-
-            response_time = time()
-            response = await stub.StartTraining(
-                grpc_pb2.InitTrainRequest(
+            request_bytes = payload_size(payload)
+            call, train_start_time = await self.send_within_budget(
+                client_id,
+                channel,
+                "StartTraining",
+                grpc_pb2.InitTrainResponse,
+                partial(
+                    grpc_pb2.InitTrainRequest,
                     session_id=session_id,
                     model_id=model_id,
                     model_class=model_class,
-                    model_config=model_config,
-                    model_wts=serialized_model_wts,
                     dataset_id=dataset_id,
                     batch_size=batch_size,
                     learning_rate=learning_rate,
                     num_epochs=num_epochs,
                     round_idx=round_no,
-                    timeout_duration_s=timeout_duration_s,
-                    loss_function=serialized_loss_fun,
-                    optimizer=serialized_optimizer,
+                    **payload,
+                    **round_bound,
                 ),
-                timeout=self.grpc_timeout,
+                request_bytes,
+            )
+            # the pickled round is not held on to while the client trains
+            del payload
+            response = await call
+            finish_time = time()
+            # measured here, on the event loop, rather than when the update
+            # gets its turn at the aggregator
+            self.round_time_predictor.observe(client_id, finish_time - train_start_time)
+            self.observe_train_exchange(
+                client_id, request_bytes, response, finish_time - train_start_time
             )
 
             self.logger.info(
                 "fedserver_gRPC.train.round.await.response_time",
-                f"{client_id},{round_no},{time()-response_time}",
+                f"{client_id},{round_no},{time()-train_start_time}",
             )
 
             self.logger.info(
@@ -655,21 +927,169 @@ class FloSessionManager:
             )
             print(e)
             response = None
+        except asyncio.CancelledError:
+            if client_id in self.lost_clients:
+                # the client is gone, it is dropped from the round right away
+                self.lost_clients.discard(client_id)
+                self.logger.warn(
+                    "fedserver_gRPC.train.client_lost",
+                    f"client_id-round_no-time_taken,{client_id},{round_no},{time() - train_start_time}",
+                )
+                response = None
+            else:
+                # the round was aggregated without this client
+                self.logger.info(
+                    "fedserver_gRPC.train.cancelled",
+                    f"client_id-round_no-time_taken,{client_id},{round_no},{time() - train_start_time}",
+                )
+                self.inflight.pop(client_id, None)
+                self.superseded.discard(client_id)
+                self.client_info.release(self.id, client_id)
+                # the client would otherwise train on for an update nobody awaits
+                request = asyncio.create_task(
+                    self.grpc_cancel_training(client_id, round_no)
+                )
+                self.cancel_requests.add(request)
+                request.add_done_callback(self.cancel_requests.discard)
+                return
         finally:
-            await model_updated_condition.acquire()
-            self.client_info.put(f"{client_id}.is_training", False)
+            if watcher is not None:
+                watcher.cancel()
+        # popped before yielding so that only calls still waiting on the edge
+        # are ever cancelled
+        self.inflight.pop(client_id, None)
+        if completions is not None:
+            await completions.put((client_id, train_start_time, finish_time, response))
+            return
+        async with model_updated_condition:
+            self.client_info.release(self.id, client_id)
+            if not self.resolve_backup(client_id, response):
+                return
             print("BEFORE TRAIN CALLBACK")
             round_no = self.grpc_train_callback(
                 client_id=client_id,
                 start_time=train_start_time,
                 response=response,
+                finish_time=finish_time,
             )
             print("AFTER TRAIN CALLBACK")
             print("ROUND NO = ", round_no)
             model_updated_event.set()
             print(model_updated_event)
 
-    def grpc_train_callback(self, client_id, start_time, response):
+    async def grpc_cancel_training(self, client_id, round_no) -> bool:
+        """Asks "client_id" to stop training round "round_no" at its next
+        mini batch. Its StartTraining call then returns the partial update."""
+        try:
+            grpc_ep = self.client_info.get(f"{client_id}.grpc_ep")
+            channel = grpc.aio.insecure_channel(f"{grpc_ep}", self.grpc_opts)
+            stub = grpc_pb2_grpc.EdgeServiceStub(channel)
+            response = await stub.CancelTraining(
+                grpc_pb2.CancelTrainingRequest(session_id=self.id, round_idx=round_no),
+                timeout=self.grpc_cancel_timeout,
+            )
+        except grpc.RpcError as e:
+            self.logger.error(
+                "fedserver_gRPC.train.cancel.failed", f"{client_id},{round_no},{e}"
+            )
+            return False
+        self.logger.info(
+            "fedserver_gRPC.train.cancel",
+            f"client_id-round_no-cancelled,{client_id},{round_no},{response.cancelled}",
+        )
+        return response.cancelled
+
+    def on_client_inactive(self, client_id):
+        """client_info listener, called from the MQTT thread when "client_id"
+        misses its heartbeats."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.fail_client, client_id, "heartbeat")
+
+    def fail_client(self, client_id, reason):
+        """Cancels the StartTraining call in flight to "client_id" so that the
+        aggregator sees the client as dropped now instead of after
+        grpc_timeout."""
+        if client_id not in self.inflight or client_id in self.lost_clients:
+            return
+        round_no, task, start_time = self.inflight[client_id]
+        self.logger.warn(
+            "fedserver.train.client_failed",
+            f"client_id-round_no-reason-elapsed,{client_id},{round_no},{reason},{time() - start_time}",
+        )
+        self.lost_clients.add(client_id)
+        task.cancel()
+
+    async def watch_channel(self, client_id, channel):
+        """Fails "client_id" once the channel of its StartTraining call has
+        been broken for "channel_failure_grace_s" without getting back to
+        READY, or as soon as it is shut down. A missed heartbeat fails the
+        client sooner through on_client_inactive."""
+        state = channel.get_state(try_to_connect=False)
+        failed_since = None
+        while state != grpc.ChannelConnectivity.SHUTDOWN:
+            if state == grpc.ChannelConnectivity.READY:
+                failed_since = None
+            elif (
+                state == grpc.ChannelConnectivity.TRANSIENT_FAILURE
+                and failed_since is None
+            ):
+                failed_since = time()
+            timeout = None
+            if failed_since is not None:
+                timeout = failed_since + self.channel_failure_grace_s - time()
+                if timeout <= 0:
+                    break
+            try:
+                await asyncio.wait_for(channel.wait_for_state_change(state), timeout)
+            except asyncio.TimeoutError:
+                break
+            state = channel.get_state(try_to_connect=False)
+        self.fail_client(client_id, f"channel_{state.name.lower()}")
+
+    async def enforce_round_deadline(self, round_no):
+        """Stops the clients still training round "round_no" once
+        "round_deadline_s" has passed, so the round is bounded in wall-clock
+        time while their partial work still reaches the aggregator."""
+        await asyncio.sleep(self.round_deadline_s)
+        if self.training_session.get(f"{self.id}.last_round_number") > round_no:
+            return
+        clients = [
+            client_id
+            for client_id, (inflight_round, _, _) in list(self.inflight.items())
+            if inflight_round == round_no
+        ]
+        self.logger.info(
+            "fedserver.train.round.deadline",
+            f"round_no-clients,{round_no},{','.join(str(c) for c in clients)}",
+        )
+        await asyncio.gather(
+            *(self.grpc_cancel_training(client_id, round_no) for client_id in clients)
+        )
+
+    def observe_train_exchange(self, client_id, request_bytes, response, call_time):
+        """Feeds the network share of a StartTraining call, the call time
+        minus the training time the client reports, to the link estimator."""
+        metrics = pickle.loads(response.metrics)
+        train_time = metrics.get("time_taken_s", metrics.get("run_time"))
+        if train_time is None:
+            return
+        self.link_estimator.observe_exchange(
+            client_id, request_bytes, response.ByteSize(), call_time - train_time
+        )
+
+    def grpc_train_callback(self, client_id, start_time, response, finish_time=None):
+        current_round = int(self.training_session.get(f"{self.id}.last_round_number"))
+        if (
+            response
+            and not self.accepts_stale_updates
+            and response.round_idx < current_round
+        ):
+            # the round this update was trained for has already been aggregated
+            self.logger.info(
+                "fedserver.train.stale_update",
+                f"client_id-round_no-current_round,{client_id},{response.round_idx},{current_round}",
+            )
+            return current_round
         if response:
             metrics = pickle.loads(response.metrics)
             local_model_wts = pickle.loads(response.model_weights)
@@ -690,22 +1110,31 @@ class FloSessionManager:
             )
             self.logger.info(
                 "fedserver.train.round.client.finished",
-                f"client_id-round_no-time_taken,{client_id},{round_no},{time()-start_time}",
+                f"client_id-round_no-time_taken,{client_id},{round_no},{(finish_time or time())-start_time}",
             )
 
-            self.training_state.put(f"{client_id}.last_round_participated", round_no)
-            self.training_state.put(f"{client_id}.weights", local_model_wts)
+            mini_batches = metrics.get(
+                "total_mini_batches", metrics.get("total_num_minibatches")
+            )
+            self.training_state.put_record(
+                client_id,
+                {
+                    "last_round_participated": round_no,
+                    "global_model_version": round_no,
+                    "last_training_metrics": metrics,
+                    "weights": local_model_wts,
+                    # samples processed, for aggregators weighting by work
+                    "work_done": (
+                        mini_batches * self.train_config["batch_size"]
+                        if mini_batches is not None
+                        else None
+                    ),
+                },
+            )
 
-            training_metrics = self.training_state.get(f"{client_id}.training_metrics")
-            if training_metrics is None:
-                self.training_state.put(
-                    f"{client_id}.training_metrics", {round_no: metrics}
-                )
-            else:
-                training_metrics[round_no] = metrics
-                self.training_state.put(
-                    f"{client_id}.training_metrics", training_metrics
-                )
+            self.training_state.series_append(
+                f"{client_id}.training_metrics", round_no, metrics
+            )
 
             aggregate_start_time = time()
             aggregated_model = self.aggregate(
@@ -725,6 +1154,7 @@ class FloSessionManager:
             print("CLIENT DIED")
             print(client_id, " TRAIN RESPONSE EMPTY")
             round_no = int(self.training_session.get(f"{self.id}.last_round_number"))
+            aggregate_start_time = time()
             aggregated_model = self.aggregate(
                 session_id=self.id,
                 client_id=client_id,
@@ -746,30 +1176,14 @@ class FloSessionManager:
             self.training_session.put(f"{self.id}.global_model", aggregated_model)
             self.model_util.set_model_weights(aggregated_model)
             if round_no % self.server_validation_interval == 0:
-                server_validation_time = time()
-                global_validation_metrics = self.model_util.validate_model(
-                    round_no=round_no
-                )
-                self.logger.info(
-                    "fedserver.train_callback.server_validation_time",
-                    f"{time()-server_validation_time}",
-                )
-                results = self.training_session.get(
-                    f"{self.id}.global_validation_metrics"
-                )
-                for key in global_validation_metrics.keys():
-                    if key in results:
-                        results[key].append(global_validation_metrics[key])
-                    else:
-                        results[key] = [global_validation_metrics[key]]
-                self.training_session.put(
-                    f"{self.id}.global_validation_metrics", results
-                )
-
-                self.logger.info(
-                    "fedserver.train_callback",
-                    f"round_no,{','.join(list(global_validation_metrics.keys()))},{round_no+1},{','.join([str(i) for i in global_validation_metrics.values()])}",
-                )
+                if self.validation_worker:
+                    self.validation_worker.submit(
+                        self.validate_global_model,
+                        round_no,
+                        copy.deepcopy(aggregated_model),
+                    )
+                else:
+                    self.validate_global_model(round_no)
                 self.logger.info(
                     "fedserver.train_callback.aggregate_time",
                     f"{round_no},{aggregate_end_time}",
@@ -791,51 +1205,42 @@ class FloSessionManager:
         print("ROUND NO = ", round_no)
         return round_no
 
-    def checkpoint(self, round_no):
-        checkpoint_start_time = time()
-        print("CHECKPOINTING", round_no)
-        training_session_bytearray = pickle.dumps(self.training_session.getall())
-        training_session_source_file = io.BytesIO(
-            initial_bytes=training_session_bytearray
-        )
-        training_session_info = tarfile.TarInfo(f"training_session_{self.id}")
-        training_session_info.size = len(training_session_bytearray)
-
-        training_state_bytearray = pickle.dumps(self.training_state.getall())
-        training_state_source_file = io.BytesIO(initial_bytes=training_state_bytearray)
-        training_state_info = tarfile.TarInfo(f"training_state_{self.id}")
-        training_state_info.size = len(training_state_bytearray)
-
-        client_selection_state_bytearray = pickle.dumps(
-            self.client_selection_state.getall()
-        )
-        client_selection_state_source_file = io.BytesIO(
-            initial_bytes=client_selection_state_bytearray
-        )
-        client_selection_state_info = tarfile.TarInfo(
-            f"client_selection_state_{self.id}"
+    def validate_global_model(self, round_no, model_weights=None):
+        """Validates the global model aggregated in round "round_no", or the
+        snapshot "model_weights" of it, and appends the metrics under that
+        round."""
+        server_validation_time = time()
+        try:
+            global_validation_metrics = self.model_util.validate_model(
+                round_no=round_no,
+                model_weights=model_weights,
+                final=round_no + 1 >= self.train_config["num_training_rounds"],
+            )
+        except Exception as e:
+            self.logger.error(
+                "fedserver.train_callback.server_validation_failed",
+                f"{round_no},{e}",
+            )
+            return None
+        self.logger.info(
+            "fedserver.train_callback.server_validation_time",
+            f"{time()-server_validation_time}",
         )
-        client_selection_state_info.size = len(client_selection_state_bytearray)
-
-        aggregator_state_bytearray = pickle.dumps(self.aggregator_state.getall())
-        aggregator_state_source_file = io.BytesIO(
-            initial_bytes=aggregator_state_bytearray
+        self.training_session.series_append(
+            f"{self.id}.global_validation_metrics",
+            round_no,
+            global_validation_metrics,
         )
-        aggregator_state_info = tarfile.TarInfo(f"aggregator_state_{self.id}")
-        aggregator_state_info.size = len(aggregator_state_bytearray)
-
-        os.makedirs(self.checkpoint_dir_path, exist_ok=True)
-        with tarfile.open(
-            os.path.join(self.checkpoint_dir_path, f"checkpoint_{self.id}.tar"), "w"
-        ) as tf:
-            tf.addfile(training_session_info, training_session_source_file)
-            tf.addfile(training_state_info, training_state_source_file)
-            tf.addfile(client_selection_state_info, client_selection_state_source_file)
-            tf.addfile(aggregator_state_info, aggregator_state_source_file)
 
         self.logger.info(
-            "fedserver.train.checkpoint", f"{round_no},{time()-checkpoint_start_time}"
+            "fedserver.train_callback",
+            f"round_no,{','.join(list(global_validation_metrics.keys()))},{round_no+1},{','.join([str(i) for i in global_validation_metrics.values()])}",
         )
+        return global_validation_metrics
+
+    def checkpoint(self, round_no):
+        print("CHECKPOINTING", round_no)
+        self.checkpointer.checkpoint(round_no)
 
     async def async_grpc_validation(
         self,
@@ -864,47 +1269,29 @@ class FloSessionManager:
         try:
             grpc_ep = self.client_info.get(f"{client_id}.grpc_ep")
             channel = grpc.aio.insecure_channel(f"{grpc_ep}", self.grpc_opts)
-            stub = grpc_pb2_grpc.EdgeServiceStub(channel)
 
             self.logger.info("fedserver_gRPC.validation.await.response", f"{client_id}")
-
-            weights_time = time()
-            serialized_model_wts: bytes = pickle.dumps(model_wts)
-            self.logger.info(
-                "fedserver_gRPC.validation.round.loss_function.pickle.time",
-                f"client_id - round_no - time_taken,{client_id},{round_no},{time() - weights_time}",
-            )
-
-            loss_time = time()
-            serialized_loss_fun: bytes = pickle.dumps(loss)
-            self.logger.info(
-                "fedserver_gRPC.validation.round.loss_function.pickle.time",
-                f"client_id - round_no - time_taken,{client_id},{round_no},{time() - loss_time}",
-            )
-
-            optimizer_time = time()
-            serialized_optimizer: bytes = pickle.dumps(optimizer)
-            self.logger.info(
-                "fedserver_gRPC.train.round.optimizer.pickle.time",
-                f"client_id - round_no - time_taken,{client_id},{round_no},{time() - optimizer_time}",
-            )
-
-            response_time = time()
-            response = await stub.StartValidation(
-                grpc_pb2.InitValidationRequest(
+            payload = self.serialize_round(model_wts, loss, optimizer)
+
+            call, response_time = await self.send_within_budget(
+                client_id,
+                channel,
+                "StartValidation",
+                grpc_pb2.InitValidationResponse,
+                partial(
+                    grpc_pb2.InitValidationRequest,
                     session_id=session_id,
                     model_id=model_id,
                     model_class=model_class,
-                    model_config=pickle.dumps(self.model_config),
                     dataset_id=dataset_id,
-                    model_wts=serialized_model_wts,
                     batch_size=batch_size,
                     round_idx=round_no,
-                    loss_function=serialized_loss_fun,
-                    optimizer=serialized_optimizer,
+                    **payload,
                 ),
-                timeout=self.grpc_timeout,
+                payload_size(payload),
             )
+            del payload
+            response = await call
 
             self.logger.info(
                 "fedserver_gRPC.validation.round.await.response_time",
@@ -929,9 +1316,8 @@ class FloSessionManager:
             print("SERVER_MANAGER.grpc_validation:: Error = ", e)
             response = None
 
-        finally:
-            await model_updated_condition.acquire()
-            self.client_info.put(f"{client_id}.is_training", False)
+        async with model_updated_condition:
+            self.client_info.release(self.id, client_id)
             self.grpc_validation_callback(
                 client_id=client_id,
                 round_no=round_no,
@@ -963,15 +1349,10 @@ class FloSessionManager:
             f"client_id-round_no-time_taken,{client_id},{round_no},{time()-start_time}",
         )
 
-        self.client_info.put(f"{client_id}.is_training", False)
-        try:
-            res = self.training_state.get(f"{client_id}.validation_metrics")
-            res[round_no] = metrics
-            self.training_state.put(f"{client_id}.validation_metrics", res)
-        except Exception as e:
-            self.training_state.put(
-                f"{client_id}.validation_metrics", {round_no: metrics}
-            )
+        self.client_info.release(self.id, client_id)
+        self.training_state.series_append(
+            f"{client_id}.validation_metrics", round_no, metrics
+        )
 
     async def train(self):
         print("[FLOW] server_session_manager.py: train() method started")
@@ -991,6 +1372,16 @@ class FloSessionManager:
         lr: float = self.train_config["learning_rate"]
         timeout: float = self.train_config["train_timeout_duration_s"]
         bench_model_hash: str = get_model_dir_hash(bench_model_dir)
+        # what a client that has nothing cached has to receive, published for
+        # the transfer cost term of the client selection strategies
+        model_transfer = {
+            "model_id": model_id,
+            "model_hash": get_model_dir_hash(model_dir),
+            "model_bytes": sum(
+                f.stat().st_size for f in os.scandir(model_dir) if f.is_file()
+            ),
+            "weights_bytes": len(pickle.dumps(self.model_util.get_model_weights())),
+        }
 
         self.logger.info("fedserver_gRPC.train_session.init", str(start_time))
         self.logger.info(
@@ -1000,86 +1391,67 @@ class FloSessionManager:
 
         self.logger.info("fedserver_gRPC.train.rounds", str(training_rounds))
 
-        for client in self.training_state.keys():
-            self.training_state.put(f"{client}.current_dataset", dataset_id)
-            data_distribution = self.client_info.get(f"{client}.dataset_details")
-            self.training_state.put(
-                f"{client}.current_dataset_detail", data_distribution[dataset_id]
-            )
-            self.training_state.put(f"{client}.current_model_id", model_id)
+        self.admit_clients(self.training_state.keys(), refresh=True)
 
+        # serialises the train and validation callbacks. It must not be held
+        # while the loop awaits the clients, whose callbacks need it to finish
         model_updated_condition = asyncio.Condition()
         model_updated_event = asyncio.Event()
         model_updated_event.set()
-        await model_updated_condition.acquire()
         print(model_updated_condition)
         self.round_start_time = time()
+        if self.concurrency_target:
+            await self.dispatch(
+                training_rounds=training_rounds,
+                model_dir=model_dir,
+                model_transfer=model_transfer,
+                train_kwargs=dict(
+                    session_id=self.id,
+                    model_id=model_id,
+                    model_class=model_class,
+                    dataset_id=dataset_id,
+                    batch_size=batch_size,
+                    learning_rate=lr,
+                    num_epochs=epochs,
+                    timeout_duration_s=timeout,
+                    model_updated_event=model_updated_event,
+                    model_updated_condition=model_updated_condition,
+                ),
+                bench_model_id=bench_model_id,
+                bench_model_hash=bench_model_hash,
+            )
         while (
             self.training_session.get(f"{self.id}.last_round_number") < training_rounds
         ):
             await model_updated_event.wait()
+            # cleared before the round is dispatched, so that the callbacks of
+            # this round are what sets it again
+            model_updated_event.clear()
             if self.skip_bench == False:
-                benchmark_overhead_time = time()
-                benchmark_clients = list()
-                for client in self.get_active_clients():
-                    benchmark_info = self.client_info.get(f"{client}.benchmark_info")
-                    # print(f"BENCHMARK INFO FOR CLIENT {client} = ", benchmark_info)
-                    if bench_model_id not in benchmark_info.keys() or (
-                        benchmark_info[bench_model_id]
-                        and benchmark_info[bench_model_id]["model_hash"]
-                        != bench_model_hash
-                    ):
-                        benchmark_clients.append(client)
-
-                # print("CLIENTS TO BENCHMARK = ", benchmark_clients)
-                if len(benchmark_clients) > 0:
-                    await self.benchmark(benchmark_clients)
-                self.logger.info(
-                    "train.benchmark_overhead.time", f"{time()-benchmark_overhead_time}"
-                )
+                await self.benchmark_new_clients(bench_model_id, bench_model_hash)
 
-            candidate_clients = [
-                client
-                for client in self.client_info.keys()
-                if self.client_info.get(f"{client}.is_active")
-                and not self.client_info.get(f"{client}.is_training")
-            ]
-            print("IN WHILE LOOP = candidate clients = ", candidate_clients)
-            client_selection_time = time()
-            training_clients, validation_clients = self.client_selection(
-                selectable_clients=candidate_clients,
-                session_id=self.id,
-                client_info=self.client_info,
-                training_state=self.training_state,
-                training_session=self.training_session,
-                aggregate_state=self.aggregator_state,
-                client_selection_state=self.client_selection_state,
-                args=self.client_selection_args,
-            )
-            print(f"[FLOW] server_session_manager.py: Selected training clients: {training_clients}")
-            print(
-                f"IN WHILE LOOP clients selected = {training_clients}, validation clients = {validation_clients}"
-            )
-            self.logger.info(
-                "train.client_selection.time_taken", f"{time()-client_selection_time}"
+            model_transfer["version"] = self.training_session.get(
+                f"{self.id}.last_round_number"
             )
+            self.training_session.put(f"{self.id}.model_transfer", model_transfer)
+            self.admit_clients(self.client_info.idle_clients())
 
-            training_clients = (
-                set(training_clients) if training_clients is not None else set()
-            )
-            validation_clients = (
-                set(validation_clients) if validation_clients is not None else set()
-            )
-            for client in training_clients.union(validation_clients):
-                self.client_info.put(f"{client}.is_training", True)
+            with self.client_info.selection_lock:
+                candidate_clients = self.client_info.idle_clients()
+                training_clients, validation_clients = self.select_clients(
+                    candidate_clients
+                )
+                if self.over_commit > 0 and training_clients:
+                    training_clients = self.over_commit_clients(
+                        training_clients, validation_clients, candidate_clients
+                    )
+                self.client_info.lease(
+                    self.id, training_clients.union(validation_clients)
+                )
 
             assert len(training_clients.intersection(validation_clients)) == 0
 
-            currently_training_clients = [
-                client
-                for client in self.client_info.keys()
-                if self.client_info.get(f"{client}.is_training")
-            ]
+            currently_training_clients = self.client_info.session_clients(self.id)
 
             print(f"CURRENTLY TRAINING CLIENTS::{currently_training_clients}")
 
@@ -1094,28 +1466,49 @@ class FloSessionManager:
                 )
                 await self.send_model(model_id, model_dir, training_clients)
                 print(f"[FLOW] server_session_manager.py: Sending StartTraining requests to {len(training_clients)} clients")
-                await asyncio.gather(
-                    *(
-                        self.async_grpc_train(
-                            client_id=client_id,
-                            session_id=self.id,
-                            model_id=model_id,
-                            model_class=model_class,
-                            model_wts=model_wts,
-                            dataset_id=dataset_id,
-                            batch_size=batch_size,
-                            learning_rate=lr,
-                            num_epochs=epochs,
-                            round_no=round_no,
-                            timeout_duration_s=timeout,
-                            loss=loss,
-                            optimizer=optimizer,
-                            model_updated_event=model_updated_event,
-                            model_updated_condition=model_updated_condition,
-                        )
-                        for client_id in training_clients
-                    )
+                train_kwargs = dict(
+                    session_id=self.id,
+                    model_id=model_id,
+                    model_class=model_class,
+                    model_wts=model_wts,
+                    dataset_id=dataset_id,
+                    batch_size=batch_size,
+                    learning_rate=lr,
+                    num_epochs=epochs,
+                    round_no=round_no,
+                    timeout_duration_s=timeout,
+                    loss=loss,
+                    optimizer=optimizer,
+                    model_updated_event=model_updated_event,
+                    model_updated_condition=model_updated_condition,
                 )
+                tasks = list()
+                for client_id in self.longest_first(training_clients):
+                    tasks.append(self.start_training(client_id, train_kwargs))
+
+                deadline = None
+                if self.round_deadline_s:
+                    deadline = asyncio.create_task(
+                        self.enforce_round_deadline(round_no)
+                    )
+                speculation = None
+                if self.speculative_z is not None:
+                    speculation = asyncio.create_task(
+                        self.speculate(round_no, model_dir, train_kwargs)
+                    )
+
+                if self.over_commit > 0:
+                    await self.wait_for_quorum(tasks, round_no)
+                else:
+                    await asyncio.gather(*tasks)
+
+                if deadline is not None:
+                    deadline.cancel()
+                    await asyncio.gather(deadline, return_exceptions=True)
+                if speculation is not None:
+                    speculation.cancel()
+                    await asyncio.gather(speculation, return_exceptions=True)
+                    await self.wait_for_backups(round_no)
 
             if validation_clients and len(validation_clients) > 0:
                 model_wts = self.model_util.get_model_weights()
@@ -1147,21 +1540,637 @@ class FloSessionManager:
                     )
                 )
 
-            model_updated_event.clear()
-            model_updated_condition.release()
+            if not training_clients and not validation_clients:
+                # nobody to run a round with yet, clients may free up or join
+                await asyncio.sleep(self.dispatch_poll_s)
+            # every call of the round has returned, whether or not it reached
+            # a callback, so the next round can start
+            model_updated_event.set()
 
         self.logger.info("fedserver.session.loop_runtime", f"{time()-start_time}")
         print(f"[FLOW] server_session_manager.py: Training Ends.")
         return
 
+    def admit_clients(self, clients, refresh=False):
+        """Sets the dataset and model of the session in the training state of
+        those of "clients" that do not have them yet, or of all of them with
+        "refresh". Clients that joined after the session started are
+        admitted this way before they can be selected."""
+        dataset_id = self.train_config["dataset"]
+        model_id = self.train_config["model_id"]
+        clients = list(clients)
+        if not refresh:
+            records = self.training_state.get_records(
+                clients, fields=["current_model_id"]
+            )
+            clients = [
+                c
+                for c in clients
+                if records.get(c, dict()).get("current_model_id") != model_id
+            ]
+        for client in clients:
+            data_distribution = self.client_info.get(f"{client}.dataset_details")
+            if not data_distribution or dataset_id not in data_distribution:
+                self.logger.warn(
+                    "fedserver.train.admit.no_dataset", f"{client},{dataset_id}"
+                )
+                continue
+            self.training_state.put(f"{client}.current_dataset", dataset_id)
+            self.training_state.put(
+                f"{client}.current_dataset_detail", data_distribution[dataset_id]
+            )
+            self.training_state.put(f"{client}.current_model_id", model_id)
+
+    async def benchmark_new_clients(self, bench_model_id, bench_model_hash):
+        """
+        Brings the benchmark of the active clients up to date with the
+        benchmark model. Results in the benchmark cache are taken as they
+        are, and of the other clients only one per hardware fingerprint is
+        benchmarked. Those benchmarks run in the background with their
+        clients leased, so rounds go on with the clients that are benchmarked
+        already. Only while there is none does this wait for the first
+        benchmark to finish.
+        """
+        benchmark_overhead_time = time()
+        cache_hits = 0
+        new_groups = dict()
+        for client in self.get_active_clients():
+            benchmark_info = self.client_info.get(f"{client}.benchmark_info")
+            # print(f"BENCHMARK INFO FOR CLIENT {client} = ", benchmark_info)
+            if bench_model_id in benchmark_info.keys() and (
+                not benchmark_info[bench_model_id]
+                or benchmark_info[bench_model_id]["model_hash"] == bench_model_hash
+            ):
+                continue
+
+            fingerprint = hardware_fingerprint(
+                self.client_info.get(f"{client}.hardware_information")
+            )
+            cached = (
+                self.benchmark_cache.get(f"{fingerprint}.{bench_model_hash}")
+                if fingerprint
+                else None
+            )
+            if cached:
+                self.client_info.put(
+                    f"{client}.benchmark_info", {bench_model_id: cached}
+                )
+                cache_hits += 1
+                continue
+
+            # clients of unknown hardware are benchmarked one by one
+            group = fingerprint if fingerprint else client
+            if group in self.benchmark_groups:
+                # waits for the benchmark of its hardware that is running
+                self.benchmark_groups[group].extend(
+                    self.client_info.lease(self.id, [client])
+                )
+            else:
+                new_groups.setdefault(group, (fingerprint, list()))[1].append(client)
+
+        # print("CLIENTS TO BENCHMARK = ", new_groups)
+        for group, (fingerprint, clients) in new_groups.items():
+            # clients busy with another session are benchmarked once they are idle
+            clients = self.client_info.lease(self.id, clients)
+            if len(clients) > 0:
+                self.benchmark_groups[group] = clients
+                task = asyncio.create_task(
+                    self.benchmark_group(
+                        group, fingerprint, bench_model_id, bench_model_hash
+                    )
+                )
+                self.benchmark_tasks.add(task)
+                task.add_done_callback(self.benchmark_tasks.discard)
+
+        if self.benchmark_tasks and not self.client_info.idle_clients():
+            # nothing is benchmarked to train with yet
+            await asyncio.wait(
+                self.benchmark_tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+        self.logger.info(
+            "train.benchmark_overhead.time",
+            f"cache_hits-benchmarks_running-time,{cache_hits},{len(self.benchmark_groups)},{time()-benchmark_overhead_time}",
+        )
+
+    async def benchmark_group(
+        self, group, fingerprint, bench_model_id, bench_model_hash
+    ):
+        """Benchmarks the first client of benchmark_groups[group] and hands
+        its result to the other clients of the group and to the cache."""
+        clients = self.benchmark_groups[group]
+        try:
+            await self.benchmark(clients[:1])
+            result = self.client_info.get(f"{clients[0]}.benchmark_info").get(
+                bench_model_id
+            )
+            if result and result["model_hash"] == bench_model_hash:
+                if fingerprint:
+                    self.benchmark_cache.put(
+                        f"{fingerprint}.{bench_model_hash}", result
+                    )
+                for client_id in clients[1:]:
+                    self.client_info.put(
+                        f"{client_id}.benchmark_info", {bench_model_id: result}
+                    )
+        except Exception as e:
+            self.logger.error("fedserver_gRPC.bench.failed", f"{clients[0]},{e}")
+        finally:
+            del self.benchmark_groups[group]
+            # grpc_benchmark releases the benchmarked client. Should it have
+            # failed, the rest of the group is benchmarked in a later round
+            for client_id in clients[1:]:
+                self.client_info.release(self.id, client_id)
+
+    def select_clients(self, candidate_clients):
+        """Runs the client selection strategy over "candidate_clients" and
+        returns the sets of training and validation clients."""
+        print("IN WHILE LOOP = candidate clients = ", candidate_clients)
+        client_selection_time = time()
+        client_selection_kwargs = dict()
+        if self.client_selection_takes_view:
+            client_selection_kwargs["client_view"] = build_client_view(
+                candidate_clients, self.client_info, self.training_state
+            )
+            self.logger.info(
+                "train.client_view.time_taken",
+                f"{len(candidate_clients)},{time()-client_selection_time}",
+            )
+        training_clients, validation_clients = self.client_selection(
+            selectable_clients=candidate_clients,
+            session_id=self.id,
+            client_info=self.client_info,
+            training_state=self.training_state,
+            training_session=self.training_session,
+            aggregate_state=self.aggregator_state,
+            client_selection_state=self.client_selection_state,
+            args=self.client_selection_args,
+            **client_selection_kwargs,
+        )
+        print(f"[FLOW] server_session_manager.py: Selected training clients: {training_clients}")
+        print(
+            f"IN WHILE LOOP clients selected = {training_clients}, validation clients = {validation_clients}"
+        )
+        self.logger.info(
+            "train.client_selection.time_taken", f"{time()-client_selection_time}"
+        )
+
+        training_clients = (
+            set(training_clients) if training_clients is not None else set()
+        )
+        validation_clients = (
+            set(validation_clients) if validation_clients is not None else set()
+        )
+        return training_clients, validation_clients
+
+    async def dispatch(
+        self,
+        training_rounds,
+        model_dir,
+        model_transfer,
+        train_kwargs,
+        bench_model_id,
+        bench_model_hash,
+    ):
+        """
+        Event driven replacement of the round loop for asynchronous
+        strategies such as fedasync and fedat. Whenever fewer than
+        "concurrency_target" clients are training, the strategy is asked for
+        more and they are dispatched right away. Finished StartTraining calls
+        go on a completion queue that a single aggregation worker drains, so
+        a slot is refilled as soon as its update is taken in rather than when
+        the whole batch is back. The strategy decides how many clients it
+        hands out, so the target may briefly be exceeded.
+        """
+        completions = asyncio.Queue()
+        wakeup = asyncio.Event()
+        worker = asyncio.create_task(
+            self.aggregation_worker(
+                completions, wakeup, train_kwargs["model_updated_condition"]
+            )
+        )
+        validation_tasks = set()
+
+        while (
+            self.training_session.get(f"{self.id}.last_round_number") < training_rounds
+        ):
+            wakeup.clear()
+            if self.skip_bench == False:
+                await self.benchmark_new_clients(bench_model_id, bench_model_hash)
+
+            candidate_clients = self.client_info.idle_clients()
+            self.admit_clients(candidate_clients)
+            dispatched = False
+            if len(self.inflight) < self.concurrency_target and candidate_clients:
+                model_transfer["version"] = self.training_session.get(
+                    f"{self.id}.last_round_number"
+                )
+                self.training_session.put(f"{self.id}.model_transfer", model_transfer)
+                with self.client_info.selection_lock:
+                    # another session may have leased them in the meantime
+                    candidate_clients = self.client_info.idle_clients()
+                    training_clients, validation_clients = (
+                        self.select_clients(candidate_clients)
+                        if candidate_clients
+                        else (set(), set())
+                    )
+                    self.client_info.lease(
+                        self.id, training_clients.union(validation_clients)
+                    )
+
+                # the weights are loaded in place by the aggregation worker,
+                # so the clients get a copy taken between two updates
+                async with train_kwargs["model_updated_condition"]:
+                    round_kwargs = dict(
+                        model_wts=copy.deepcopy(self.model_util.get_model_weights()),
+                        loss=self.model_util.get_loss_fun(),
+                        optimizer=self.model_util.get_optimizer(),
+                        round_no=self.training_session.get(
+                            f"{self.id}.last_round_number"
+                        ),
+                    )
+                if training_clients:
+                    await self.send_model(
+                        train_kwargs["model_id"], model_dir, training_clients
+                    )
+                    for client_id in self.longest_first(training_clients):
+                        self.start_training(
+                            client_id,
+                            train_kwargs | round_kwargs | {"completions": completions},
+                        )
+                if validation_clients:
+                    await self.send_model(
+                        train_kwargs["model_id"], model_dir, validation_clients
+                    )
+                    for client_id in validation_clients:
+                        task = asyncio.create_task(
+                            self.async_grpc_validation(
+                                client_id=client_id,
+                                session_id=self.id,
+                                model_id=train_kwargs["model_id"],
+                                model_class=train_kwargs["model_class"],
+                                model_wts=round_kwargs["model_wts"],
+                                dataset_id=train_kwargs["dataset_id"],
+                                batch_size=train_kwargs["batch_size"],
+                                round_no=round_kwargs["round_no"],
+                                loss=round_kwargs["loss"],
+                                optimizer=round_kwargs["optimizer"],
+                                model_updated_event=train_kwargs[
+                                    "model_updated_event"
+                                ],
+                                model_updated_condition=train_kwargs[
+                                    "model_updated_condition"
+                                ],
+                            )
+                        )
+                        validation_tasks.add(task)
+                        task.add_done_callback(validation_tasks.discard)
+                dispatched = bool(training_clients or validation_clients)
+                self.logger.info(
+                    "fedserver.dispatch.dispatched",
+                    f"round_no-in_flight-clients,{round_kwargs['round_no']},{len(self.inflight)},{','.join(str(c) for c in training_clients)}",
+                )
+
+            if not dispatched or len(self.inflight) >= self.concurrency_target:
+                # a completion or a client joining is what can change things
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.dispatch_poll_s)
+                except asyncio.TimeoutError:
+                    pass
+
+        stragglers = [task for _, task, _ in list(self.inflight.values())]
+        for task in stragglers:
+            task.cancel()
+        await asyncio.gather(*stragglers, *validation_tasks, return_exceptions=True)
+        await completions.join()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        self.logger.info(
+            "fedserver.dispatch.finished", f"cancelled_clients,{len(stragglers)}"
+        )
+
+    async def aggregation_worker(self, completions, wakeup, model_updated_condition):
+        """Takes finished StartTraining calls off "completions" one at a time
+        and runs the train callback, which aggregates and validates, in a
+        worker thread so that dispatching carries on meanwhile. The callback
+        holds "model_updated_condition", as the validation callbacks and the
+        dispatcher do while they touch the global model."""
+        while True:
+            client_id, start_time, finish_time, response = await completions.get()
+            try:
+                async with model_updated_condition:
+                    await asyncio.to_thread(
+                        self.grpc_train_callback,
+                        client_id=client_id,
+                        start_time=start_time,
+                        response=response,
+                        finish_time=finish_time,
+                    )
+            except Exception as e:
+                self.logger.error(
+                    "fedserver.dispatch.callback_failed", f"{client_id},{e}"
+                )
+            finally:
+                # the client is handed out again only once its update is in,
+                # strategies like fedasync key their state by client
+                self.client_info.release(self.id, client_id)
+                completions.task_done()
+                wakeup.set()
+
     def get_active_clients(self):
-        active_clients = [
+        return self.client_info.active_clients()
+
+    def progress(self, start=None) -> dict:
+        """Round the session is in and the global validation metrics of the
+        rounds from "start" on, or of the latest validated round without
+        "start", for the REST API."""
+        key = f"{self.id}.global_validation_metrics"
+        if start is None:
+            last = self.training_session.series_last(key)
+            metrics = [last] if last else list()
+        else:
+            metrics = self.training_session.series_range(key, start=start)
+        return {
+            "round_no": self.training_session.get(f"{self.id}.last_round_number"),
+            "num_training_rounds": self.train_config["num_training_rounds"],
+            "metrics": metrics,
+        }
+
+    def longest_first(self, clients) -> list:
+        """
+        "clients" in longest processing time first order, by predicted round
+        time, so that with a bounded send budget the clients that take the
+        longest are sent their request first and the round's makespan is
+        shorter. Clients with no prediction yet are taken as the slowest.
+        """
+        clients = list(clients)
+        if len(clients) < 2:
+            return clients
+        client_view = build_client_view(
+            clients, self.client_info, self.training_state
+        )
+        expected = predicted_round_times(client_view, clients, 0.0)
+        order = np.argsort(-np.nan_to_num(expected, nan=np.inf), kind="stable")
+        return [clients[i] for i in order]
+
+    def over_commit_clients(self, training_clients, validation_clients, candidates):
+        """Adds up to "over_commit" random idle clients to the strategy's
+        selection and records the strategy's count as the round quorum."""
+        quorum = len(training_clients)
+        spare = [
+            c
+            for c in candidates
+            if c not in training_clients and c not in validation_clients
+        ]
+        extra = random.sample(spare, min(self.over_commit, len(spare)))
+
+        selected_clients = self.client_selection_state.get("selected_clients")
+        if selected_clients is not None:
+            self.client_selection_state.put(
+                "selected_clients", list(selected_clients) + extra
+            )
+        self.client_selection_state.put("round_quorum", quorum)
+        self.logger.info(
+            "fedserver.train.over_commit",
+            f"quorum-extra_clients,{quorum},{','.join(str(c) for c in extra)}",
+        )
+        return training_clients.union(extra)
+
+    async def wait_for_quorum(self, tasks, round_no):
+        """Waits until round "round_no" is aggregated, or every client is
+        done, and then cancels the StartTraining calls still in flight."""
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            if self.training_session.get(f"{self.id}.last_round_number") > round_no:
+                break
+
+        stragglers = [
             client_id
-            for client_id in self.client_info.keys()
-            if self.client_info.get(f"{client_id}.is_active")
+            for client_id, (inflight_round, task, _) in self.inflight.items()
+            if inflight_round == round_no and task in pending
         ]
+        for client_id in stragglers:
+            self.inflight[client_id][1].cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.logger.info(
+            "fedserver.train.round.stragglers_cancelled",
+            f"round_no-clients,{round_no},{','.join(str(c) for c in stragglers)}",
+        )
 
-        return active_clients
+    def start_training(self, client_id, train_kwargs):
+        if self.mini_batch_deadline_s:
+            train_kwargs = train_kwargs | self.mini_batch_budget(
+                client_id, train_kwargs["batch_size"]
+            )
+        task = asyncio.create_task(
+            self.async_grpc_train(client_id=client_id, **train_kwargs)
+        )
+        self.inflight[client_id] = (train_kwargs["round_no"], task, time())
+        return task
+
+    def mini_batch_budget(self, client_id, batch_size) -> dict:
+        """
+        Number of mini batches "client_id" is expected to train before
+        "mini_batch_deadline_s", from its throughput in its last round, or its
+        benchmark before it has trained. The part of its observed round time
+        not spent training, transfers and setup, is taken off the deadline.
+        Returns the async_grpc_train arguments that bound the round, empty if
+        the client's throughput is unknown and it keeps the uniform timeout.
+        """
+        record = self.training_state.get_record(client_id)
+        metrics = record.get("last_training_metrics") or dict()
+        train_time = metrics.get("time_taken_s", metrics.get("run_time"))
+        mini_batches = metrics.get(
+            "total_mini_batches", metrics.get("total_num_minibatches")
+        )
+
+        throughput = None
+        if train_time and mini_batches:
+            throughput = mini_batches / train_time
+        else:
+            latency = benchmark_latency(
+                self.client_info.get(f"{client_id}.benchmark_info"),
+                record.get("current_model_id"),
+            )
+            if not math.isnan(latency) and latency > 0:
+                throughput = 100 / latency
+        if throughput is None:
+            return dict()
+
+        overhead = 0.0
+        round_time = record.get("round_time")
+        if round_time and train_time:
+            overhead = max(round_time["mean"] - train_time, 0.0)
+        budget = max(
+            1, int(throughput * max(self.mini_batch_deadline_s - overhead, 0.0))
+        )
+
+        # enough epochs for the loop on the client to get through the budget
+        num_items = (
+            (record.get("current_dataset_detail") or dict())
+            .get("metadata", dict())
+            .get("num_items")
+        )
+        bound = {"max_mini_batch_count": budget}
+        if num_items:
+            bound["num_epochs"] = math.ceil(
+                budget / math.ceil(num_items / batch_size)
+            )
+        self.logger.info(
+            "fedserver.train.mini_batch_budget",
+            f"client_id-throughput-overhead-budget,{client_id},{throughput},{overhead},{budget}",
+        )
+        return bound
+
+    async def speculate(self, round_no, model_dir, train_kwargs):
+        """
+        Backup tasks in the MapReduce sense for round "round_no". Every
+        "speculative_poll_s" seconds the StartTraining calls still in flight
+        are compared with their expected round time, mean + speculative_z *
+        std of the client's past rounds or, for a client that has not finished
+        one yet, its benchmark latency calibrated against the clients that
+        have. Each straggler gets at most one backup, the idle client expected
+        to finish a round the fastest. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self.speculative_poll_s)
+            paired = set(self.backups.keys()) | set(self.backups.values())
+            stragglers = [
+                c
+                for c, (inflight_round, _, _) in self.inflight.items()
+                if inflight_round == round_no and c not in paired
+            ]
+            idle_clients = self.client_info.idle_clients()
+            if not stragglers or not idle_clients:
+                continue
+
+            client_view = build_client_view(
+                stragglers + idle_clients, self.client_info, self.training_state
+            )
+            expected = predicted_round_times(
+                client_view, stragglers, self.speculative_z
+            )
+            idle_expected = predicted_round_times(client_view, idle_clients, 0.0)
+            order = np.argsort(np.nan_to_num(idle_expected, nan=np.inf))
+            backups = [idle_clients[i] for i in order if np.isfinite(idle_expected[i])]
+
+            now = time()
+            for client_id, limit in zip(stragglers, expected):
+                if not backups:
+                    break
+                if client_id not in self.inflight or client_id in self.backups:
+                    continue
+                if np.isnan(limit) or now - self.inflight[client_id][2] <= limit:
+                    continue
+                await self.launch_backup(
+                    client_id, backups.pop(0), model_dir, train_kwargs
+                )
+
+    async def launch_backup(self, client_id, backup_id, model_dir, train_kwargs):
+        round_no = train_kwargs["round_no"]
+        if not self.client_info.lease(self.id, [backup_id]):
+            # taken by another session since the idle clients were read, the
+            # next check picks another backup
+            return
+        self.logger.info(
+            "fedserver.train.speculative.launch",
+            f"client_id-backup_id-round_no-elapsed,{client_id},{backup_id},{round_no},{time() - self.inflight[client_id][2]}",
+        )
+        self.backups[client_id] = backup_id
+        try:
+            await self.send_model(train_kwargs["model_id"], model_dir, [backup_id])
+        except asyncio.CancelledError:
+            self.backups.pop(client_id, None)
+            self.client_info.release(self.id, backup_id)
+            raise
+        if client_id not in self.inflight or self.backups.get(client_id) != backup_id:
+            # the straggler finished while the model was being sent
+            self.backups.pop(client_id, None)
+            self.client_info.release(self.id, backup_id)
+            return
+        self.start_training(backup_id, train_kwargs)
+
+    def resolve_backup(self, client_id, response) -> bool:
+        """
+        Settles the race between a straggler and its backup once either
+        returns. The first update wins and the other call is cancelled. A
+        backup that wins takes the straggler's place among the selected
+        clients, so the aggregator weighs it by its own dataset. A failed call
+        leaves its pair to stand in for both. Returns False if this response
+        must not reach the aggregator.
+        """
+        if client_id in self.superseded:
+            self.superseded.discard(client_id)
+            return False
+
+        if client_id in self.backups:
+            straggler_id, backup_id = client_id, self.backups[client_id]
+            partner = backup_id
+        else:
+            straggler_id = next(
+                (s for s, b in self.backups.items() if b == client_id), None
+            )
+            if straggler_id is None:
+                return True
+            backup_id, partner = client_id, straggler_id
+        del self.backups[straggler_id]
+
+        if response is None:
+            self.logger.info(
+                "fedserver.train.speculative.failed",
+                f"client_id-partner_id,{client_id},{partner}",
+            )
+            if client_id == straggler_id:
+                self.substitute_selected_client(straggler_id, backup_id)
+            return False
+
+        if partner in self.inflight:
+            self.inflight[partner][1].cancel()
+        else:
+            # the partner's response is in but has not been handled yet
+            self.superseded.add(partner)
+        if client_id == backup_id:
+            self.substitute_selected_client(straggler_id, backup_id)
+        self.logger.info(
+            "fedserver.train.speculative.winner",
+            f"client_id-straggler_id-backup_id-round_no,{client_id},{straggler_id},{backup_id},{response.round_idx}",
+        )
+        return True
+
+    def substitute_selected_client(self, client_id, backup_id):
+        keys = ["selected_clients"] + [
+            f"selected_clients_tier_{i}"
+            for i in range(self.client_selection_state.get("num_tiers") or 0)
+        ]
+        for key in keys:
+            selected_clients = self.client_selection_state.get(key)
+            if selected_clients and client_id in selected_clients:
+                self.client_selection_state.put(
+                    key,
+                    [backup_id if c == client_id else c for c in selected_clients],
+                )
+
+    async def wait_for_backups(self, round_no):
+        """Waits for the backups of round "round_no" still in flight, or
+        cancels them if the round was aggregated without them."""
+        aggregated = (
+            self.training_session.get(f"{self.id}.last_round_number") > round_no
+        )
+        tasks = [
+            task
+            for inflight_round, task, _ in list(self.inflight.values())
+            if inflight_round == round_no
+        ]
+        if aggregated:
+            for task in tasks:
+                task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.backups.clear()
+        self.superseded.clear()
 
     def stream_file_chunk(self, model_id, path):
         filename = path.split(os.sep)[-1]
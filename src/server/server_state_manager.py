@@ -1,4 +1,5 @@
 from importlib import import_module
+from threading import Lock, RLock
 from uuid import uuid4
 
 from utils.logger import FedLogger
@@ -6,14 +7,26 @@ from utils.logger import FedLogger
 
 class StateManager:
     def __init__(
-        self, loc: str, name: str, host: str, port: int, state_id: str = None
+        self,
+        loc: str,
+        name: str,
+        host: str,
+        port: int,
+        state_id: str = None,
+        endpoints: list = None,
     ) -> None:
         self.state_id = state_id if state_id else str(uuid4())
         self.name = f"{name}_{self.state_id}"
         self.logger = FedLogger("0", "STATE_MANAGER")
         try:
             module = import_module(f"server.state_manager.{loc}")
-            kvstore = module.StateManager(name=self.name, host=host, port=port)
+            kvstore = module.StateManager(
+                name=self.name,
+                host=host,
+                port=port,
+                endpoints=endpoints,
+                pinned=[self.state_id],
+            )
         except Exception as e:
             self.logger.error(
                 "fedserver.state_manager", f"{e}\tFalling back to inmemory store"
@@ -31,6 +44,18 @@ class StateManager:
         self.deletebykey = kvstore.deletebykey
         self.getall = kvstore.getall
         self.putall = kvstore.putall
+        self.get_record = kvstore.get_record
+        self.get_records = kvstore.get_records
+        self.put_record = kvstore.put_record
+        self.pop_dirty = kvstore.pop_dirty
+        self.series_append = kvstore.series_append
+        self.series_range = kvstore.series_range
+        self.series_last = kvstore.series_last
+        self.series_keys = kvstore.series_keys
+        self.pop_dirty_series = kvstore.pop_dirty_series
+        self.index_add = kvstore.index_add
+        self.index_remove = kvstore.index_remove
+        self.index_members = kvstore.index_members
 
     def get(self, key):
         raise NotImplementedError
@@ -62,18 +87,205 @@ class StateManager:
     def putall(self):
         raise NotImplementedError
 
+    def get_record(self, prefix):
+        raise NotImplementedError
+
+    def get_records(self, prefixes, fields=None):
+        raise NotImplementedError
+
+    def put_record(self, prefix, record):
+        raise NotImplementedError
+
+    def pop_dirty(self):
+        raise NotImplementedError
+
+    def series_append(self, key, index, value) -> bool:
+        """Appends "value" at "index" to the series "key". Indexes may
+        repeat but must not go back, an older point is dropped and False
+        returned."""
+        raise NotImplementedError
+
+    def series_range(self, key, start=None, end=None, max_points=None):
+        raise NotImplementedError
+
+    def series_last(self, key):
+        raise NotImplementedError
+
+    def series_keys(self):
+        raise NotImplementedError
+
+    def pop_dirty_series(self):
+        raise NotImplementedError
+
+    def index_add(self, index, *members):
+        raise NotImplementedError
+
+    def index_remove(self, index, *members):
+        raise NotImplementedError
+
+    def index_members(self, index):
+        raise NotImplementedError
+
+
+class ClientInfoState(StateManager):
+    """
+    client_info with maintained indexes of active, idle (active and not
+    training) and training clients, so that finding them is a set read rather
+    than a scan over every client record. is_active and is_training must be
+    written through register_client, set_active, set_training, lease and
+    release to keep the indexes in sync with the records.
+
+    client_info is shared by every session the server runs, and it is also
+    the fleet's lease arbiter. A session books clients with lease, which
+    marks them training on behalf of the session only if they are idle, and
+    hands them back with release. Sessions hold selection_lock from reading
+    the idle clients until they have leased their selection, so that a
+    client is never selected by two sessions at once. Callables added with
+    add_inactive_listener are called with the client id, in the thread that
+    called set_active, whenever an active client is marked inactive.
+    """
+
+    ACTIVE = "active"
+    IDLE = "idle"
+    TRAINING = "training"
+
+    def __init__(
+        self,
+        loc: str,
+        name: str,
+        host: str,
+        port: int,
+        state_id: str = None,
+        endpoints: list = None,
+    ) -> None:
+        super().__init__(loc, name, host, port, state_id, endpoints)
+        # the MQTT thread and the session loop both flip client flags
+        self.index_lock = Lock()
+        self.selection_lock = RLock()
+        self.inactive_listeners = list()
+
+    def add_inactive_listener(self, listener) -> None:
+        self.inactive_listeners.append(listener)
+
+    def remove_inactive_listener(self, listener) -> None:
+        if listener in self.inactive_listeners:
+            self.inactive_listeners.remove(listener)
+
+    def register_client(self, client_id, record: dict) -> None:
+        with self.index_lock:
+            self.put_record(
+                client_id,
+                {**record, "is_active": True, "is_training": False, "leased_by": None},
+            )
+            self.index_remove(self.TRAINING, client_id)
+            self.index_add(self.ACTIVE, client_id)
+            self.index_add(self.IDLE, client_id)
+
+    def set_active(self, client_id, is_active: bool) -> None:
+        with self.index_lock:
+            if is_active:
+                self.put(f"{client_id}.is_active", True)
+                self.index_add(self.ACTIVE, client_id)
+                if not self.get(f"{client_id}.is_training"):
+                    self.index_add(self.IDLE, client_id)
+            else:
+                was_active = self.get(f"{client_id}.is_active")
+                self.put_record(
+                    client_id,
+                    {"is_active": False, "is_training": False, "leased_by": None},
+                )
+                self.index_remove(self.ACTIVE, client_id)
+                self.index_remove(self.IDLE, client_id)
+                self.index_remove(self.TRAINING, client_id)
+        if not is_active and was_active:
+            for listener in list(self.inactive_listeners):
+                listener(client_id)
+
+    def set_training(self, client_id, is_training: bool) -> None:
+        with self.index_lock:
+            self.put(f"{client_id}.is_training", is_training)
+            if is_training:
+                self.index_remove(self.IDLE, client_id)
+                self.index_add(self.TRAINING, client_id)
+            else:
+                self.index_remove(self.TRAINING, client_id)
+                if self.get(f"{client_id}.is_active"):
+                    self.index_add(self.IDLE, client_id)
+
+    def lease(self, session_id, client_ids) -> list:
+        """Marks those of "client_ids" that are idle as training for
+        "session_id" and returns them."""
+        with self.index_lock:
+            idle = set(self.index_members(self.IDLE))
+            granted = [client_id for client_id in client_ids if client_id in idle]
+            for client_id in granted:
+                self.put_record(
+                    client_id, {"is_training": True, "leased_by": session_id}
+                )
+                self.index_remove(self.IDLE, client_id)
+                self.index_add(self.TRAINING, client_id)
+        return granted
+
+    def release(self, session_id, client_id) -> bool:
+        """Marks "client_id" idle again, unless it is leased by a session
+        other than "session_id"."""
+        with self.index_lock:
+            if self.get(f"{client_id}.leased_by") not in (None, session_id):
+                return False
+            self.put_record(client_id, {"is_training": False, "leased_by": None})
+            self.index_remove(self.TRAINING, client_id)
+            if self.get(f"{client_id}.is_active"):
+                self.index_add(self.IDLE, client_id)
+        return True
+
+    def release_session(self, session_id) -> list:
+        """Releases every client still leased by "session_id"."""
+        return [
+            client_id
+            for client_id in self.session_clients(session_id)
+            if self.release(session_id, client_id)
+        ]
+
+    def session_clients(self, session_id) -> list:
+        """The training clients leased by "session_id"."""
+        records = self.get_records(self.training_clients(), fields=["leased_by"])
+        return [
+            client_id
+            for client_id, record in records.items()
+            if record.get("leased_by") == session_id
+        ]
+
+    def active_clients(self) -> list:
+        return self.index_members(self.ACTIVE)
+
+    def idle_clients(self) -> list:
+        return self.index_members(self.IDLE)
+
+    def training_clients(self) -> list:
+        return self.index_members(self.TRAINING)
+
 
 class ReadOnlyState:
-    def __init__(self, loc: str, name: str, host: str, port: int) -> None:
+    def __init__(
+        self, loc: str, name: str, host: str, port: int, endpoints: list = None
+    ) -> None:
         self.state_id = str(uuid4())
         module = import_module(f"server.state_manager.{loc}")
         kvstore = module.StateManager(
-            name=f"{name}_{self.state_id}", host=host, port=port
+            name=f"{name}_{self.state_id}",
+            host=host,
+            port=port,
+            endpoints=endpoints,
+            pinned=[self.state_id],
         )
         self.get = kvstore.get
         self.get_large = kvstore.get
         self.keys = kvstore.keys
         self.len = kvstore.len
+        self.get_record = kvstore.get_record
+        self.get_records = kvstore.get_records
+        self.series_range = kvstore.series_range
+        self.series_last = kvstore.series_last
 
     def get(self, key):
         raise NotImplementedError
@@ -86,3 +298,15 @@ class ReadOnlyState:
 
     def len(self):
         raise NotImplementedError
+
+    def get_record(self, prefix):
+        raise NotImplementedError
+
+    def get_records(self, prefixes, fields=None):
+        raise NotImplementedError
+
+    def series_range(self, key, start=None, end=None, max_points=None):
+        raise NotImplementedError
+
+    def series_last(self, key):
+        raise NotImplementedError
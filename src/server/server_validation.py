@@ -0,0 +1,118 @@
+"""
+Authors: Prince Modi, Roopkatha Banerjee, Yogesh Simmhan
+Emails: princemodi@iisc.ac.in, roopkathab@iisc.ac.in, simmhan@iisc.ac.in
+Copyright 2023 Indian Institute of Science
+Licensed under the Apache License, Version 2.0, http://www.apache.org/licenses/LICENSE-2.0
+"""
+
+import math
+
+import torch
+
+from server.server_file_manager import get_model_class
+
+
+def build_tensor_cache(loader, cache_path: str = None):
+    """
+    Runs "loader" once and returns its (inputs, labels) batches concatenated
+    into two contiguous tensors, so that every later validation skips the
+    decoding and transforms. With "cache_path" the tensors are saved there
+    and memory-mapped back, and worker processes map the same file rather
+    than each receiving a copy.
+    """
+    inputs, labels = list(), list()
+    for x_batch, y_batch in loader:
+        inputs.append(x_batch)
+        labels.append(y_batch)
+    inputs = torch.cat(inputs).contiguous()
+    labels = torch.cat(labels).contiguous()
+    if cache_path:
+        torch.save({"inputs": inputs, "labels": labels}, cache_path)
+        inputs, labels = load_tensor_cache(cache_path)
+    return inputs, labels
+
+
+def load_tensor_cache(cache_path: str):
+    cache = torch.load(cache_path, mmap=True, weights_only=True)
+    return cache["inputs"], cache["labels"]
+
+
+def forward(model, inputs, batch_size: int, device=torch.device("cpu")):
+    """Outputs of "model" for all of "inputs", "batch_size" at a time."""
+    outputs = list()
+    with torch.inference_mode():
+        for start in range(0, len(inputs), batch_size):
+            x_batch = inputs[start : start + batch_size].to(device)
+            outputs.append(model(x_batch).cpu())
+    return torch.cat(outputs)
+
+
+# state of a validation worker process, set up once by init_worker
+worker = dict()
+
+
+def init_worker(model_dir, model_class, model_args, cache, num_threads):
+    """Process pool initializer. "cache" is either the path of a memory
+    mapped tensor cache or the inputs tensor itself."""
+    torch.set_num_threads(num_threads)
+    model = get_model_class(path=model_dir, class_name=model_class)(
+        device=torch.device("cpu"), args=model_args
+    )
+    model.eval()
+    worker["model"] = model
+    worker["inputs"] = load_tensor_cache(cache)[0] if isinstance(cache, str) else cache
+
+
+def forward_shard(model_weights, indices, batch_size: int):
+    model = worker["model"]
+    model.load_state_dict(model_weights)
+    return forward(model, worker["inputs"][indices], batch_size)
+
+
+def stratified_sample(labels, fraction: float, seed: int = None):
+    """
+    Indices of a sample with "fraction" of every class in "labels", at least
+    one and at most all of them. Labels that are not one class index per
+    sample are sampled as a single stratum. Returns the indices and
+    [(stratum_size, positions in the sample)] for stratified_estimate.
+    """
+    generator = torch.Generator()
+    if seed is not None:
+        generator.manual_seed(seed)
+    if labels.dim() == 1 and not labels.is_floating_point():
+        strata = [torch.nonzero(labels == c).flatten() for c in labels.unique()]
+    else:
+        strata = [torch.arange(len(labels))]
+
+    indices, positions = list(), list()
+    offset = 0
+    for members in strata:
+        count = min(len(members), max(1, math.ceil(fraction * len(members))))
+        picked = members[torch.randperm(len(members), generator=generator)[:count]]
+        indices.append(picked)
+        positions.append((len(members), slice(offset, offset + count)))
+        offset += count
+    return torch.cat(indices), positions
+
+
+def stratified_estimate(values, strata, z: float = 1.96):
+    """
+    Population mean of the per-sample "values" of a stratified sample, and
+    the half width of its "z" confidence interval, with the finite
+    population correction since strata are sampled without replacement.
+    """
+    values = values.double()
+    population = sum(size for size, _ in strata)
+    mean, variance = 0.0, 0.0
+    for size, positions in strata:
+        stratum = values[positions]
+        weight = size / population
+        mean += weight * stratum.mean().item()
+        if len(stratum) > 1:
+            variance += (
+                weight**2
+                * stratum.var().item()
+                / len(stratum)
+                * (1 - len(stratum) / size)
+            )
+    return mean, z * math.sqrt(variance)
@@ -1,49 +1,147 @@
-from functools import reduce
+from bisect import bisect_left, bisect_right
+
+
+def split_key(key: str):
+    """Splits a dotted key into the record it belongs to and the field inside
+    that record. Keys without a dot are stored in the "" field of their own record."""
+    prefix, _, field = key.partition(".")
+    return prefix, field
+
+
+def downsample(points: list, max_points: int = None) -> list:
+    """Keeps every k-th point, and always the latest one, so that at most
+    "max_points" points are returned."""
+    if not max_points or len(points) <= max_points:
+        return points
+    stride = -(-len(points) // max_points)
+    sampled = points[::stride]
+    if sampled[-1] is not points[-1]:
+        sampled[-1] = points[-1]
+    return sampled
 
 
 class StateManager:
-    def __init__(self, name: str, host=None, port=None) -> None:
+    def __init__(
+        self, name: str, host=None, port=None, endpoints=None, pinned=None
+    ) -> None:
         self.state = dict()
         self.name = name
+        # records written or deleted since the last pop_dirty()
+        self.dirty = set()
+        # append-only metric series kept as columns: {key: {"index": [..],
+        # "values": [..]}}, sorted by index
+        self.series = dict()
+        # {series key: lowest index appended since the last pop_dirty_series()}
+        self.series_dirty = dict()
+        # secondary indexes over record prefixes: {index name: set(prefix)}
+        self.indexes = dict()
 
     def get(self, key):
-        getter = self.state
-        value = reduce(
-            lambda d, key: d.get(key) if isinstance(d, dict) else None,
-            key.split("."),
-            getter,
-        )
-        return value
+        prefix, field = split_key(key)
+        record = self.state.get(prefix)
+        if record is None:
+            return None
+        return record.get(field)
 
     def put(self, key, value) -> None:
-        setter = self.state
-        keys = key.split(".")
-        for k in keys[:-1]:
-            if k not in setter:
-                setter[k] = dict()
-            setter = setter[k]
-        setter[keys[-1]] = value
+        prefix, field = split_key(key)
+        self.state.setdefault(prefix, dict())[field] = value
+        self.dirty.add(prefix)
+
+    def get_record(self, prefix):
+        return dict(self.state.get(prefix, dict()))
+
+    def get_records(self, prefixes, fields=None):
+        if fields is None:
+            return {prefix: self.get_record(prefix) for prefix in prefixes}
+        records = dict()
+        for prefix in prefixes:
+            record = self.state.get(prefix, dict())
+            records[prefix] = {f: record[f] for f in fields if f in record}
+        return records
+
+    def put_record(self, prefix, record: dict):
+        if not record:
+            return
+        self.state.setdefault(prefix, dict()).update(record)
+        self.dirty.add(prefix)
 
     def keys(self):
-        return self.state.keys()
+        return list(self.state.keys())
 
     def len(self):
         return len(self.state)
 
     def clear(self):
+        self.dirty.update(self.state.keys())
         self.state.clear()
+        self.series.clear()
+        self.series_dirty.clear()
+        self.indexes.clear()
 
     def deletebykey(self, key):
-        deleter = self.state
-        keys = key.split(".")
-        for k in keys[-1]:
-            if k not in deleter:
-                return
-            deleter = deleter[k]
-        del deleter[keys[-1]]
+        prefix, field = split_key(key)
+        if field:
+            self.state.get(prefix, dict()).pop(field, None)
+        else:
+            self.state.pop(prefix, None)
+        self.dirty.add(prefix)
 
     def getall(self):
         return self.state
 
     def putall(self, data: dict):
+        self.dirty.update(self.state.keys())
+        self.dirty.update(data.keys())
         self.state = data
+
+    def pop_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def series_append(self, key, index: int, value: dict) -> bool:
+        """Appends one point. Indexes may repeat but not go back, as in the
+        redis backend, and a point older than the last one is dropped.
+        Returns whether it was appended."""
+        series = self.series.setdefault(key, {"index": list(), "values": list()})
+        if series["index"] and index < series["index"][-1]:
+            return False
+        series["index"].append(index)
+        series["values"].append(value)
+        self.series_dirty[key] = min(index, self.series_dirty.get(key, index))
+        return True
+
+    def series_range(self, key, start=None, end=None, max_points=None):
+        series = self.series.get(key)
+        if series is None:
+            return list()
+        lo = 0 if start is None else bisect_left(series["index"], start)
+        hi = (
+            len(series["index"])
+            if end is None
+            else bisect_right(series["index"], end)
+        )
+        points = list(zip(series["index"][lo:hi], series["values"][lo:hi]))
+        return downsample(points, max_points)
+
+    def series_last(self, key):
+        series = self.series.get(key)
+        if not series or not series["index"]:
+            return None
+        return series["index"][-1], series["values"][-1]
+
+    def series_keys(self):
+        return list(self.series.keys())
+
+    def pop_dirty_series(self):
+        dirty, self.series_dirty = self.series_dirty, dict()
+        return dirty
+
+    def index_add(self, index, *members):
+        self.indexes.setdefault(index, set()).update(members)
+
+    def index_remove(self, index, *members):
+        self.indexes.get(index, set()).difference_update(members)
+
+    def index_members(self, index):
+        return list(self.indexes.get(index, set()))
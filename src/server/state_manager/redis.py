@@ -1,87 +1,412 @@
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
 from pickle import PicklingError
 from pickle import dumps as p_dumps
 from pickle import loads as p_loads
+from threading import Lock
 
 from redis import Redis
 from redis import exceptions as redis_exceptions
 
+from server.state_manager.inmemory import downsample
 from utils.logger import FedLogger
 
+# series are streams with "{index}-*" ids, which need Redis 7.0
+MIN_REDIS_VERSION = (7, 0)
+# endpoints whose version this process has checked
+checked_endpoints = set()
+# {endpoints: executor fanning requests out over those shards}, shared by
+# every StateManager of the process so that sessions do not each leave a
+# thread pool behind
+shard_executors = dict()
+shard_executors_lock = Lock()
+
+
+def shard_executor(endpoints: list) -> ThreadPoolExecutor:
+    key = tuple(str(endpoint) for endpoint in endpoints)
+    with shard_executors_lock:
+        if key not in shard_executors:
+            shard_executors[key] = ThreadPoolExecutor(
+                max_workers=len(endpoints), thread_name_prefix="redis_shards"
+            )
+        return shard_executors[key]
+
+
+def check_version(shard: Redis, endpoint) -> None:
+    """Raises if the Redis server at "endpoint" is older than
+    MIN_REDIS_VERSION. Checked once per endpoint and process."""
+    if str(endpoint) in checked_endpoints:
+        return
+    version = shard.info("server")["redis_version"]
+    if tuple(int(part) for part in version.split(".")[:2]) < MIN_REDIS_VERSION:
+        raise RuntimeError(
+            f"Redis {version} at {endpoint} is too old, the state store needs "
+            f"Redis {'.'.join(str(part) for part in MIN_REDIS_VERSION)} or newer"
+        )
+    checked_endpoints.add(str(endpoint))
+
+
+def split_key(key: str):
+    """Splits a dotted key into the record it belongs to and the field inside
+    that record. "{client}.heartbeat.timestamp" -> ("{client}", "heartbeat.timestamp").
+    Keys without a dot are stored in the "" field of their own record."""
+    prefix, _, field = key.partition(".")
+    return prefix, field
+
+
+def parse_endpoint(endpoint):
+    """Accepts "host:port" strings or {"host": .., "port": ..} dicts."""
+    if isinstance(endpoint, dict):
+        return endpoint["host"], int(endpoint["port"])
+    host, _, port = str(endpoint).rpartition(":")
+    return host, int(port)
+
+
+class HashRing:
+    """Consistent hash ring over shard indices. Each shard is placed on the ring
+    "replicas" times so that keys spread evenly and adding a shard only moves
+    the keys that fall between its points and their predecessors."""
+
+    def __init__(self, nodes: list, replicas: int = 64) -> None:
+        self.ring = sorted(
+            (self.hash(f"{node}#{i}"), shard)
+            for shard, node in enumerate(nodes)
+            for i in range(replicas)
+        )
+        self.points = [point for point, _ in self.ring]
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int(md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+    def get_shard(self, key: str) -> int:
+        idx = bisect(self.points, self.hash(key)) % len(self.ring)
+        return self.ring[idx][1]
+
 
 class StateManager:
-    def __init__(self, name: str, host: str = "localhost", port: int = 6379) -> None:
+    def __init__(
+        self,
+        name: str,
+        host: str = "localhost",
+        port: int = 6379,
+        endpoints: list = None,
+        pinned: list = None,
+    ) -> None:
         self.logger = FedLogger("0", "STATE_MANAGER")
-        self.redis = Redis(host=host, port=port)
+        if not endpoints:
+            endpoints = [f"{host}:{port}"]
+        self.shards = list()
+        for endpoint in endpoints:
+            shard_host, shard_port = parse_endpoint(endpoint)
+            self.shards.append(Redis(host=shard_host, port=shard_port))
+            try:
+                check_version(self.shards[-1], endpoint)
+            except redis_exceptions.ConnectionError as e:
+                self.logger.error("fedserver.redis", "-".join(e.args))
+        # session-global records and the index set live on the first endpoint
+        self.redis = self.shards[0]
+        self.ring = HashRing([str(endpoint) for endpoint in endpoints])
+        self.pinned = set(pinned) if pinned else set()
+        self.executor = shard_executor(endpoints) if len(self.shards) > 1 else None
         self.name = name
+        self.index_name = f"keys_{self.name}"
+        # records this process already added to the index set, so that a put
+        # on a known record is a single HSET
+        self.indexed = set()
+        # records written or deleted through this process since the last
+        # pop_dirty(), used for incremental checkpoints
+        self.dirty = set()
+        self.series_index_name = f"series_{self.name}"
+        # {series key: lowest index appended since the last pop_dirty_series()}
+        self.series_dirty = dict()
+        # secondary index sets created through this process, kept on the
+        # primary so that membership queries are a single SMEMBERS
+        self.index_names = set()
         # self.redis.flushdb()
 
+    def record_name(self, prefix: str) -> str:
+        return f"{self.name}:{prefix}"
+
+    def series_name(self, key: str) -> str:
+        return f"{self.name}:series:{key}"
+
+    def secondary_index_name(self, index: str) -> str:
+        return f"{self.name}:index:{index}"
+
+    def shard_for(self, prefix: str) -> Redis:
+        if len(self.shards) == 1 or prefix in self.pinned:
+            return self.redis
+        return self.shards[self.ring.get_shard(prefix)]
+
+    def group_by_shard(self, prefixes) -> dict:
+        groups = dict()
+        for prefix in prefixes:
+            groups.setdefault(self.shard_for(prefix), list()).append(prefix)
+        return groups
+
+    def fan_out(self, groups: dict, fn) -> list:
+        """Runs fn(shard, prefixes) for every shard, in parallel when there is
+        more than one, and returns the results in the order of "groups"."""
+        if self.executor is None or len(groups) <= 1:
+            return [fn(shard, prefixes) for shard, prefixes in groups.items()]
+        futures = [
+            self.executor.submit(fn, shard, prefixes)
+            for shard, prefixes in groups.items()
+        ]
+        return [future.result() for future in futures]
+
     def get(self, key):
+        prefix, field = split_key(key)
         try:
-            value = self.redis.hget(self.name, key)
-            if value == None:
-                return None
-            deserialized_value = p_loads(value)
+            value = self.shard_for(prefix).hget(self.record_name(prefix), field)
         except redis_exceptions.ConnectionError as e:
             print("GET ERROR")
             self.logger.error("fedserver.redis", "-".join(e.args))
-        return deserialized_value
+            return None
+        if value is None:
+            return None
+        return p_loads(value)
 
     def put(self, key, value):
-        client_id = key.split(".")[0]
+        prefix, field = split_key(key)
         try:
             serialized_value = p_dumps(value)
         except PicklingError:
             self.logger.error("fedserver.redis", f"{value} cannot be pickled")
+            return
         try:
-            self.redis.hset(self.name, key, serialized_value)
-            self.redis.sadd(f"keys_{self.name}", client_id)
+            self.shard_for(prefix).hset(
+                self.record_name(prefix), field, serialized_value
+            )
+            self.dirty.add(prefix)
+            if prefix not in self.indexed:
+                self.redis.sadd(self.index_name, prefix)
+                self.indexed.add(prefix)
         except redis_exceptions.ConnectionError as e:
             self.logger.error("fedserver.redis", "-".join(e.args))
         except redis_exceptions.DataError:
             self.logger.error("fedserver.redis", f"Invalid input type")
 
+    def get_record(self, prefix):
+        """Returns every field stored under "prefix" with a single HGETALL."""
+        try:
+            raw = self.shard_for(prefix).hgetall(self.record_name(prefix))
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return dict()
+        return self.deserialize_record(raw)
+
+    def get_records(self, prefixes, fields=None):
+        """Fetches the records of all "prefixes" with one pipelined round trip
+        per shard. With "fields" only those fields are read, which keeps large
+        values such as model weights off the wire."""
+
+        def fetch(shard, shard_prefixes):
+            pipe = shard.pipeline(transaction=False)
+            for prefix in shard_prefixes:
+                if fields is None:
+                    pipe.hgetall(self.record_name(prefix))
+                else:
+                    pipe.hmget(self.record_name(prefix), fields)
+            results = pipe.execute()
+            if fields is not None:
+                results = [
+                    {
+                        field.encode("utf-8"): value
+                        for field, value in zip(fields, values)
+                        if value is not None
+                    }
+                    for values in results
+                ]
+            return zip(shard_prefixes, results)
+
+        try:
+            results = self.fan_out(self.group_by_shard(prefixes), fetch)
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return dict()
+        return {
+            prefix: self.deserialize_record(raw)
+            for shard_result in results
+            for prefix, raw in shard_result
+        }
+
+    def put_record(self, prefix, record: dict):
+        """Writes all fields of "record" under "prefix" with a single HSET."""
+        if not record:
+            return
+        try:
+            mapping = {field: p_dumps(value) for field, value in record.items()}
+        except PicklingError:
+            self.logger.error("fedserver.redis", f"{record} cannot be pickled")
+            return
+        try:
+            self.shard_for(prefix).hset(self.record_name(prefix), mapping=mapping)
+            self.dirty.add(prefix)
+            if prefix not in self.indexed:
+                self.redis.sadd(self.index_name, prefix)
+                self.indexed.add(prefix)
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+        except redis_exceptions.DataError:
+            self.logger.error("fedserver.redis", f"Invalid input type")
+
+    def deserialize_record(self, raw: dict) -> dict:
+        return {
+            field.decode(encoding="utf-8"): p_loads(value)
+            for field, value in raw.items()
+        }
+
     def keys(self):
         try:
             return [
                 i.decode(encoding="utf-8")
-                for i in self.redis.smembers(f"keys_{self.name}")
+                for i in self.redis.smembers(self.index_name)
             ]
         except redis_exceptions.ConnectionError as e:
             self.logger.error("fedserver.redis", "-".join(e.args))
+            return []
 
     def len(self):
         try:
-            return self.redis.scard(f"keys_{self.name}")
+            return self.redis.scard(self.index_name)
         except redis_exceptions.ConnectionError as e:
             self.logger.error("fedserver.redis", "-".join(e.args))
 
     def clear(self):
+        def delete(shard, shard_prefixes):
+            pipe = shard.pipeline(transaction=False)
+            for prefix in shard_prefixes:
+                pipe.delete(self.record_name(prefix))
+            pipe.execute()
+
         try:
-            self.redis.delete(f"keys_{self.name}")
-            keys = [i.decode() for i in self.redis.hkeys(self.name)]
-            for key in keys:
-                self.redis.hdel(self.name, key)
+            prefixes = self.keys()
+            self.fan_out(self.group_by_shard(prefixes), delete)
+            self.dirty.update(prefixes)
+            self.redis.delete(self.index_name)
+            self.indexed.clear()
+            for key in self.series_keys():
+                self.shard_for(split_key(key)[0]).delete(self.series_name(key))
+            self.redis.delete(self.series_index_name)
+            self.series_dirty.clear()
+            for index in self.index_names:
+                self.redis.delete(self.secondary_index_name(index))
+            self.index_names.clear()
         except redis_exceptions.ConnectionError as e:
             self.logger.error("fedserver.redis", "-".join(e.args))
 
     def deletebykey(self, key):
+        prefix, field = split_key(key)
         try:
-            self.redis.srem(f"keys_{self.name}", key)
-            self.redis.hdel(self.name, key)
+            self.dirty.add(prefix)
+            if field:
+                self.shard_for(prefix).hdel(self.record_name(prefix), field)
+            else:
+                self.shard_for(prefix).delete(self.record_name(prefix))
+                self.redis.srem(self.index_name, prefix)
+                self.indexed.discard(prefix)
         except redis_exceptions.ConnectionError as e:
             self.logger.error("fedserver.redis", "-".join(e.args))
 
     def getall(self):
-        return self.redis.hgetall(self.name)
+        return self.get_records(self.keys())
 
     def putall(self, data: dict):
-        for key, value in data.items():
-            key = key.decode(encoding="utf-8")
-            client_id = key.split(".")[0]
-            try:
-                self.redis.hset(self.name, key, value)
-                self.redis.sadd(f"keys_{self.name}", client_id)
-            except redis_exceptions.ConnectionError as e:
-                self.logger.error("fedserver.redis", "-".join(e.args))
-            except redis_exceptions.DataError:
-                self.logger.error("fedserver.redis", f"Invalid input type")
+        for prefix, record in data.items():
+            self.put_record(prefix, record)
+
+    def pop_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def series_append(self, key, index: int, value: dict) -> bool:
+        """Appends one point to a Redis stream. Stream ids are "{index}-{seq}",
+        so range queries by round number map directly onto XRANGE. Indexes
+        may repeat but not go back, a point older than the last one is
+        dropped. Returns whether it was appended."""
+        try:
+            self.shard_for(split_key(key)[0]).xadd(
+                self.series_name(key), {"value": p_dumps(value)}, id=f"{index}-*"
+            )
+            self.redis.sadd(self.series_index_name, key)
+            self.series_dirty[key] = min(index, self.series_dirty.get(key, index))
+            return True
+        except redis_exceptions.ResponseError as e:
+            # ids must grow, an index older than the last appended one is rejected
+            self.logger.warn("fedserver.redis.series", f"{key},{index},{e}")
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+        return False
+
+    def deserialize_series(self, entries) -> list:
+        return [
+            (int(entry_id.decode().split("-")[0]), p_loads(fields[b"value"]))
+            for entry_id, fields in entries
+        ]
+
+    def series_range(self, key, start=None, end=None, max_points=None):
+        try:
+            entries = self.shard_for(split_key(key)[0]).xrange(
+                self.series_name(key),
+                min="-" if start is None else f"{start}",
+                max="+" if end is None else f"{end}",
+            )
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return list()
+        return downsample(self.deserialize_series(entries), max_points)
+
+    def series_last(self, key):
+        try:
+            entries = self.shard_for(split_key(key)[0]).xrevrange(
+                self.series_name(key), count=1
+            )
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return None
+        points = self.deserialize_series(entries)
+        return points[0] if points else None
+
+    def series_keys(self):
+        try:
+            return [
+                i.decode(encoding="utf-8")
+                for i in self.redis.smembers(self.series_index_name)
+            ]
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return []
+
+    def pop_dirty_series(self):
+        dirty, self.series_dirty = self.series_dirty, dict()
+        return dirty
+
+    def index_add(self, index, *members):
+        if not members:
+            return
+        try:
+            self.redis.sadd(self.secondary_index_name(index), *members)
+            self.index_names.add(index)
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+
+    def index_remove(self, index, *members):
+        if not members:
+            return
+        try:
+            self.redis.srem(self.secondary_index_name(index), *members)
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+
+    def index_members(self, index):
+        try:
+            return [
+                i.decode(encoding="utf-8")
+                for i in self.redis.smembers(self.secondary_index_name(index))
+            ]
+        except redis_exceptions.ConnectionError as e:
+            self.logger.error("fedserver.redis", "-".join(e.args))
+            return []
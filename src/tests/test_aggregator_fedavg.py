@@ -0,0 +1,54 @@
+import torch
+
+from server.aggregation.aggregator_fedavg import aggregate
+from server.server_state_manager import StateManager
+
+
+class ClientInfo:
+    def __init__(self, clients):
+        self.clients = clients
+
+    def active_clients(self):
+        return list(self.clients)
+
+
+def run_round(updates, work_done, args):
+    training_state = StateManager("inmemory", "ts", None, None)
+    aggregator_state = StateManager("inmemory", "ag", None, None)
+    selection_state = StateManager("inmemory", "cs", None, None)
+    selection_state.put("selected_clients", list(updates))
+    for client_id in updates:
+        training_state.put(
+            f"{client_id}.current_dataset_detail", {"metadata": {"num_items": 100}}
+        )
+        training_state.put(f"{client_id}.work_done", work_done.get(client_id))
+    result = None
+    for client_id, value in updates.items():
+        result = aggregate(
+            session_id="s",
+            client_id=client_id,
+            client_active=True,
+            client_local_weights={"w": torch.full((2,), value)},
+            client_info=ClientInfo(updates),
+            training_state=training_state,
+            training_session=None,
+            aggregator_state=aggregator_state,
+            client_selection_state=selection_state,
+            args=args,
+        )
+    return result["w"]
+
+
+def test_weight_by_work_uses_samples_processed():
+    w = run_round({"a": 0.0, "b": 4.0}, {"a": 30, "b": 10}, {"weight_by": "work"})
+    assert torch.allclose(w, torch.full((2,), 1.0))
+
+
+def test_weight_by_work_leaves_out_clients_without_work():
+    w = run_round({"a": 0.0, "b": 4.0}, {"a": 30}, {"weight_by": "work"})
+    assert torch.allclose(w, torch.zeros(2))
+
+
+def test_weight_by_work_falls_back_to_dataset_size():
+    w = run_round({"a": 0.0, "b": 4.0}, {}, {"weight_by": "work"})
+    assert torch.allclose(w, torch.full((2,), 2.0))
@@ -0,0 +1,83 @@
+import math
+import time
+
+import pytest
+
+from server import server_availability
+from server.server_availability import (
+    AvailabilityModel,
+    departure_rates,
+    new_record,
+    split_by_hour,
+    stay_online_probability,
+)
+from server.server_state_manager import StateManager
+
+
+@pytest.fixture
+def half_hour_zone(monkeypatch):
+    """Local time of UTC+05:30, as in IST."""
+    offset = 5 * 3600 + 1800
+
+    class Local:
+        def __init__(self, timestamp):
+            self.tm_gmtoff = offset
+            self.tm_hour = int((timestamp + offset) // 3600) % 24
+
+    monkeypatch.setattr(server_availability.time, "localtime", Local)
+    return offset
+
+
+def test_split_cuts_at_local_hour_boundaries(half_hour_zone):
+    # 00:00 UTC is 05:30 local
+    pieces = list(split_by_hour(0.0, 7200.0))
+    assert pieces == [(5, 1800.0), (6, 3600.0), (7, 1800.0)]
+    assert sum(seconds for _, seconds in pieces) == 7200.0
+
+
+def test_heartbeats_are_attributed_to_local_hours(half_hour_zone):
+    model = AvailabilityModel(StateManager("inmemory", "ci", None, None))
+    model.on_join("c", now=0.0)
+    model.on_heartbeat("c", now=1800.0)
+    record = model.on_heartbeat("c", now=2700.0)
+    assert record["hour_online_s"][5] == 1800.0
+    assert record["hour_online_s"][6] == 900.0
+    record = model.on_leave("c")
+    assert record["hour_departures"][6] == 1
+    assert record["online_since"] is None
+
+
+def test_heartbeat_after_a_long_silence_closes_the_open_session():
+    model = AvailabilityModel(StateManager("inmemory", "ci", None, None), max_gap_s=60)
+    model.on_join("c", now=1000.0)
+    model.on_heartbeat("c", now=1030.0)
+    record = model.on_heartbeat("c", now=5000.0)
+    assert record["departures"] == 1
+    assert record["sessions"] == 2
+    assert record["online_s"] == 30.0
+    assert record["online_since"] == 5000.0
+
+
+def test_hazard_follows_the_hours_a_client_leaves_in():
+    record = new_record()
+    record["online_s"] = 24 * 3600.0
+    record["hour_online_s"] = [3600.0] * 24
+    record["departures"] = 4
+    record["hour_departures"][18] = 4
+    rates = departure_rates(record, prior_session_s=3600.0)
+    assert rates[18] > rates[3]
+    assert rates[3] == pytest.approx((5 / (25 * 3600)) / 2)
+
+    record["online_since"] = 0.0
+    start = time.mktime((2024, 1, 1, 3, 0, 0, 0, 0, -1))
+    evening = time.mktime((2024, 1, 1, 18, 0, 0, 0, 0, -1))
+    quiet = stay_online_probability(record, 1800.0, now=start)
+    risky = stay_online_probability(record, 1800.0, now=evening)
+    assert risky < quiet
+    assert quiet == pytest.approx(math.exp(-rates[3] * 1800.0))
+
+
+def test_offline_client_has_no_chance_to_stay_online():
+    record = new_record()
+    record["last_seen"] = 10.0
+    assert stay_online_probability(record, 60.0, now=20.0) == 0.0
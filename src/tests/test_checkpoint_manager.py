@@ -0,0 +1,75 @@
+import os
+
+import torch
+
+from server.server_checkpoint_manager import CheckpointManager
+from server.server_state_manager import StateManager
+
+
+def make_states():
+    return {"training_session": StateManager("inmemory", "ts", None, None)}
+
+
+def test_segments_restore_after_compaction(tmp_path):
+    states = make_states()
+    state = states["training_session"]
+    checkpointer = CheckpointManager(
+        "s", str(tmp_path), states, compaction_interval=2
+    )
+    weights = {"w": torch.zeros(3)}
+    for round_no in range(5):
+        weights = {"w": weights["w"] + 1}
+        state.put("s.global_model", weights)
+        state.put(f"client_{round_no}.loss", float(round_no))
+        state.series_append("s.metrics", round_no, {"loss": round_no})
+        checkpointer.checkpoint(round_no)
+    state.deletebykey("client_0")
+    checkpointer.checkpoint(5)
+    checkpointer.flush()
+
+    assert len(checkpointer.manifest["segments"]) <= 3
+    records, series = checkpointer.restore(lazy=False)
+    restored = records["training_session"]
+    assert torch.equal(restored["s"]["global_model"]["w"], torch.full((3,), 5.0))
+    assert "client_0" not in restored
+    assert restored["client_4"]["loss"] == 4.0
+    assert [index for index, _ in series["training_session"]["s.metrics"]] == [
+        0, 1, 2, 3, 4
+    ]
+    checkpointer.close()
+
+
+def test_snapshot_is_not_affected_by_later_writes(tmp_path):
+    states = make_states()
+    state = states["training_session"]
+    checkpointer = CheckpointManager("s", str(tmp_path), states)
+    model = {"w": torch.zeros(2)}
+    state.put("s.global_model", model)
+    checkpointer.checkpoint(0)
+    model["w"] = torch.ones(2)
+    checkpointer.flush()
+    records, _ = checkpointer.restore(lazy=False)
+    assert torch.equal(records["training_session"]["s"]["global_model"]["w"], torch.zeros(2))
+    checkpointer.close()
+
+
+def test_new_session_with_same_id_starts_a_new_chain(tmp_path):
+    states = make_states()
+    states["training_session"].put("old.record", 1)
+    checkpointer = CheckpointManager("s", str(tmp_path), states)
+    checkpointer.checkpoint(0)
+    checkpointer.close()
+
+    states = make_states()
+    states["training_session"].put("new.record", 2)
+    checkpointer = CheckpointManager("s", str(tmp_path), states)
+    checkpointer.checkpoint(0)
+    records, _ = checkpointer.restore(lazy=False)
+    assert set(records["training_session"]) == {"new"}
+    checkpointer.close()
+    assert any("archived" in name for name in os.listdir(tmp_path))
+
+    resumed = CheckpointManager("s", str(tmp_path), make_states(), resume=True)
+    records, _ = resumed.restore(lazy=False)
+    assert set(records["training_session"]) == {"new"}
+    resumed.close()
@@ -0,0 +1,15 @@
+from client import client as client_module
+from client.client import Client
+
+
+def make_client():
+    return Client("c", "cpu", "/tmp", dict(), dict())
+
+
+def test_cancellations_are_bounded():
+    client = make_client()
+    for round_idx in range(client_module.MAX_CANCELLED_ROUNDS + 10):
+        assert not client.CancelTraining(("s", round_idx))
+    assert len(client.cancelled_rounds) == client_module.MAX_CANCELLED_ROUNDS
+    assert ("s", 0) not in client.cancelled_rounds
+    assert ("s", client_module.MAX_CANCELLED_ROUNDS + 9) in client.cancelled_rounds
@@ -0,0 +1,21 @@
+from server.server_state_manager import ClientInfoState
+
+
+def make_client_info(clients):
+    client_info = ClientInfoState("inmemory", "ci", None, None)
+    for client_id in clients:
+        client_info.register_client(client_id, {"grpc_ep": "localhost:0"})
+    return client_info
+
+
+def test_leases_are_scoped_by_session():
+    client_info = make_client_info(["a", "b", "c"])
+    assert client_info.lease("s1", ["a", "b"]) == ["a", "b"]
+    assert client_info.lease("s2", ["b", "c"]) == ["c"]
+    assert sorted(client_info.session_clients("s1")) == ["a", "b"]
+    assert client_info.session_clients("s2") == ["c"]
+
+    assert not client_info.release("s2", "a")
+    assert sorted(client_info.release_session("s1")) == ["a", "b"]
+    assert sorted(client_info.idle_clients()) == ["a", "b"]
+    assert client_info.training_clients() == ["c"]
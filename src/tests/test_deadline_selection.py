@@ -0,0 +1,25 @@
+from server.clientselection.client_selection_deadline import client_selection
+from server.server_state_manager import StateManager
+
+
+def select(args):
+    client_info = StateManager("inmemory", "ci", None, None)
+    training_state = StateManager("inmemory", "ts", None, None)
+    training_state.put("fast.round_time", {"mean": 5.0, "var": 0.0, "samples": 3})
+    training_state.put("slow.round_time", {"mean": 100.0, "var": 0.0, "samples": 3})
+    selected, _ = client_selection(
+        ["fast", "slow"],
+        "s",
+        client_info,
+        training_state,
+        StateManager("inmemory", "tss", None, None),
+        dict(),
+        StateManager("inmemory", "cs", None, None),
+        args={"client_fraction": 0.5, **args},
+    )
+    return selected
+
+
+def test_deadline_comes_from_selection_deadline_s():
+    for _ in range(10):
+        assert select({"selection_deadline_s": 10}) == ["fast"]
@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+
+from server.server_job_queue import (
+    CANCELLED,
+    FINISHED,
+    INTERRUPTED,
+    QUEUED,
+    RUNNING,
+    JobQueue,
+)
+from server.server_state_manager import StateManager
+
+
+def make_queue(state=None):
+    return JobQueue(state or StateManager("inmemory", "jq", None, None))
+
+
+def test_jobs_run_by_priority_then_submission_order():
+    queue = make_queue()
+    queue.submit("low", {}, priority=0)
+    queue.submit("high", {}, priority=5)
+    queue.submit("low2", {}, priority=0)
+    assert [job["session_id"] for job in queue.queued()] == ["high", "low", "low2"]
+    assert queue.position("low2") == 2
+    assert queue.submit("high", {}) is None
+
+    assert queue.start("high")
+    assert not queue.start("high")
+    assert queue.get("high")["status"] == RUNNING
+    assert queue.cancel("low")
+    assert not queue.cancel("high")
+    assert queue.get("low")["status"] == CANCELLED
+    assert [job["session_id"] for job in queue.queued()] == ["low2"]
+
+
+def test_running_jobs_are_interrupted_on_restart():
+    state = StateManager("inmemory", "jq", None, None)
+    queue = make_queue(state)
+    queue.submit("s", {})
+    queue.submit("q", {})
+    queue.start("s")
+    restarted = make_queue(state)
+    assert restarted.get("s")["status"] == INTERRUPTED
+    assert restarted.get("q")["status"] == QUEUED
+
+
+def test_finished_results_are_stored_as_native_types():
+    queue = make_queue()
+    queue.submit("s", {})
+    queue.start("s")
+    queue.finish(
+        "s",
+        FINISHED,
+        results={"accuracy": np.float32(0.5), "rounds": (np.int64(3), np.arange(2))},
+    )
+    results = queue.get("s")["results"]
+    assert results == {"accuracy": 0.5, "rounds": [3, [0, 1]]}
+    assert type(results["accuracy"]) is float
+    json.dumps(results)
@@ -0,0 +1,159 @@
+import asyncio
+import pickle
+
+import grpc
+import torch
+
+import proto.grpc_pb2 as grpc_pb2
+import proto.grpc_pb2_grpc as grpc_pb2_grpc
+from server.aggregation.aggregator_fedavg import aggregate
+from server.clientselection.client_selection_fedavg import client_selection
+from server.server_link_estimator import LinkEstimator
+from server.server_round_time_predictor import RoundTimePredictor
+from server.server_send_budget import SendBudget
+from server.server_session_manager import FloSessionManager
+from server.server_state_manager import ClientInfoState, StateManager
+from utils.logger import FedLogger
+
+
+class Edge(grpc_pb2_grpc.EdgeServiceServicer):
+    """Client that adds one to every weight it is sent."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rounds = list()
+
+    async def StartTraining(self, request, context):
+        self.rounds.append(request.round_idx)
+        weights = {k: v + 1 for k, v in pickle.loads(request.model_wts).items()}
+        return grpc_pb2.InitTrainResponse(
+            model_id=request.model_id,
+            model_weights=pickle.dumps(weights),
+            client_id=self.name,
+            round_idx=request.round_idx,
+            metrics=pickle.dumps({"loss": 1.0, "total_mini_batches": 1}),
+        )
+
+
+class ModelUtil:
+    def __init__(self):
+        self.weights = {"w": torch.zeros(2)}
+
+    def get_model_weights(self):
+        return self.weights
+
+    def set_model_weights(self, weights):
+        self.weights = weights
+
+    def get_loss_fun(self):
+        return None
+
+    def get_optimizer(self):
+        return None
+
+
+def make_session(endpoints, model_dir, rounds):
+    session = FloSessionManager.__new__(FloSessionManager)
+    session.id = "s"
+    session.logger = FedLogger(id="s", loggername="SESSION_MANAGER")
+    session.client_info = ClientInfoState("inmemory", "ci", None, None)
+    session.training_state = StateManager("inmemory", "ts", None, None)
+    session.training_session = StateManager("inmemory", "tss", None, None)
+    session.aggregator_state = StateManager("inmemory", "ag", None, None)
+    session.client_selection_state = StateManager("inmemory", "cs", None, None)
+    for name, endpoint in endpoints.items():
+        session.client_info.register_client(
+            name,
+            {
+                "grpc_ep": endpoint,
+                "benchmark_info": {},
+                "dataset_details": {"d": {"metadata": {"num_items": 10}}},
+            },
+        )
+        session.training_state.put(f"{name}.current_model_id", None)
+    session.training_session.put("s.last_round_number", 0)
+    session.train_config = {
+        "model_id": "m",
+        "model_dir": model_dir,
+        "model_class": "M",
+        "dataset": "d",
+        "num_training_rounds": rounds,
+        "epochs": 1,
+        "batch_size": 1,
+        "loss_function": "crossentropy",
+        "optimizer": "sgd",
+        "learning_rate": 0.1,
+        "train_timeout_duration_s": 10,
+    }
+    session.bench_config = {"model_id": "m", "model_dir": model_dir}
+    session.skip_bench = True
+    session.model_util = ModelUtil()
+    session.model_config = dict()
+    session.aggregator = "fedavg"
+    session.aggregate = aggregate
+    session.aggregator_args = None
+    session.accepts_stale_updates = False
+    session.client_selection_strategy = "fedavg"
+    session.client_selection = client_selection
+    session.client_selection_args = {"client_fraction": 1.0}
+    session.client_selection_takes_view = False
+    session.round_time_predictor = RoundTimePredictor(session.training_state)
+    session.link_estimator = LinkEstimator(session.client_info)
+    session.send_budget = SendBudget()
+    session.round_payload = None
+    session.pending_sends = 0
+    session.grpc_opts = list()
+    session.grpc_timeout = 10
+    session.grpc_cancel_timeout = 1
+    session.channel_failure_grace_s = 10
+    session.inflight = dict()
+    session.cancel_requests = set()
+    session.backups = dict()
+    session.superseded = set()
+    session.lost_clients = set()
+    session.loop = None
+    session.over_commit = 0
+    session.concurrency_target = 0
+    session.dispatch_poll_s = 0.1
+    session.round_deadline_s = None
+    session.mini_batch_deadline_s = None
+    session.speculative_z = None
+    session.server_validation_interval = rounds + 1
+    session.validation_worker = None
+    session.checkpoint_interval = None
+
+    async def send_model(model_id, model_dir, clients):
+        pass
+
+    session.send_model = send_model
+    return session
+
+
+def test_lockstep_loop_runs_every_round(tmp_path):
+    (tmp_path / "model.py").write_text("")
+
+    async def run():
+        servers, edges, endpoints = list(), dict(), dict()
+        for name in ("a", "b"):
+            server = grpc.aio.server()
+            edges[name] = Edge(name)
+            grpc_pb2_grpc.add_EdgeServiceServicer_to_server(edges[name], server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            servers.append(server)
+            endpoints[name] = f"127.0.0.1:{port}"
+        session = make_session(endpoints, str(tmp_path), rounds=3)
+        try:
+            await asyncio.wait_for(session.train(), 20)
+        finally:
+            for server in servers:
+                await server.stop(None)
+        return session, edges
+
+    session, edges = asyncio.run(run())
+    assert session.training_session.get("s.last_round_number") == 3
+    assert edges["a"].rounds == [0, 1, 2]
+    assert edges["b"].rounds == [0, 1, 2]
+    assert torch.equal(session.model_util.get_model_weights()["w"], torch.full((2,), 3.0))
+    # every round time is learnt once, when its update arrives
+    assert session.training_state.get("a.round_time")["samples"] == 3
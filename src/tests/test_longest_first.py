@@ -0,0 +1,36 @@
+from server.server_round_time_predictor import RoundTimePredictor
+from server.server_session_manager import FloSessionManager
+from server.server_state_manager import ClientInfoState, StateManager
+
+
+def make_states(benchmarks):
+    client_info = ClientInfoState("inmemory", "ci", None, None)
+    training_state = StateManager("inmemory", "ts", None, None)
+    for client_id, time_taken_s in benchmarks.items():
+        benchmark_info = dict()
+        if time_taken_s is not None:
+            benchmark_info["m"] = {"time_taken_s": time_taken_s, "num_mini_batches": 100}
+        client_info.register_client(
+            client_id, {"grpc_ep": "localhost:0", "benchmark_info": benchmark_info}
+        )
+        training_state.put(f"{client_id}.current_model_id", "m")
+    return client_info, training_state
+
+
+def test_longest_first_orders_by_expected_round_time():
+    client_info, training_state = make_states(
+        {"fast": 1.0, "slow": 3.0, "new": None, "mid": 2.0}
+    )
+    predictor = RoundTimePredictor(training_state)
+    for client_id, round_time in {"fast": 5.0, "slow": 15.0, "mid": 10.0}.items():
+        predictor.observe(client_id, round_time)
+    session = FloSessionManager.__new__(FloSessionManager)
+    session.client_info = client_info
+    session.training_state = training_state
+    assert session.longest_first(["fast", "mid", "new", "slow"]) == [
+        "new",
+        "slow",
+        "mid",
+        "fast",
+    ]
+    assert session.longest_first(["fast"]) == ["fast"]
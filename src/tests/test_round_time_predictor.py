@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from server.server_client_view import build_client_view
+from server.server_round_time_predictor import RoundTimePredictor, predicted_round_times
+from server.server_state_manager import ClientInfoState, StateManager
+
+
+def make_states(benchmarks):
+    client_info = ClientInfoState("inmemory", "ci", None, None)
+    training_state = StateManager("inmemory", "ts", None, None)
+    for client_id, time_taken_s in benchmarks.items():
+        benchmark_info = dict()
+        if time_taken_s is not None:
+            benchmark_info["m"] = {"time_taken_s": time_taken_s, "num_mini_batches": 100}
+        client_info.register_client(
+            client_id, {"grpc_ep": "localhost:0", "benchmark_info": benchmark_info}
+        )
+        training_state.put(f"{client_id}.current_model_id", "m")
+    return client_info, training_state
+
+
+def test_ewma_mean_and_variance():
+    training_state = StateManager("inmemory", "ts", None, None)
+    predictor = RoundTimePredictor(training_state, alpha=0.5)
+    assert predictor.observe("a", 10.0) == {"mean": 10.0, "var": 0.0, "samples": 1}
+    estimate = predictor.observe("a", 20.0)
+    assert estimate["mean"] == pytest.approx(15.0)
+    assert estimate["var"] == pytest.approx(25.0)
+    assert estimate["samples"] == 2
+    assert training_state.get("a.round_time") == estimate
+
+
+def test_unobserved_clients_are_scaled_from_their_benchmark():
+    client_info, training_state = make_states({"a": 2.0, "b": 4.0, "c": None})
+    predictor = RoundTimePredictor(training_state, alpha=0.5)
+    predictor.observe("a", 10.0)
+    predictor.observe("a", 20.0)
+    view = build_client_view(["a", "b", "c"], client_info, training_state)
+    predicted = predicted_round_times(view, ["a", "b", "c"], z=1.0)
+    # a: 15 + 1 * 5; b: 4 s benchmark at a's 7.5 s of round per benchmark s
+    assert predicted[0] == pytest.approx(20.0)
+    assert predicted[1] == pytest.approx(30.0)
+    assert np.isnan(predicted[2])
+
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from server.server_send_budget import SendBudget
+
+
+def test_sends_are_bounded_by_count_and_bytes_in_order():
+    async def run():
+        budget = SendBudget(max_sends=2, max_bytes=100)
+        order = list()
+
+        async def send(name, size):
+            await budget.acquire(size)
+            order.append(name)
+
+        await budget.acquire(60)
+        tasks = [
+            asyncio.create_task(send("big", 50)),
+            asyncio.create_task(send("small", 10)),
+        ]
+        await asyncio.sleep(0)
+        # "small" fits but waits behind "big"
+        assert order == [] and (budget.sends, budget.bytes) == (1, 60)
+        budget.release(60)
+        await asyncio.gather(*tasks)
+        assert order == ["big", "small"]
+        assert (budget.sends, budget.bytes) == (2, 60)
+
+        third = asyncio.create_task(send("third", 1))
+        await asyncio.sleep(0)
+        assert order == ["big", "small"]
+        budget.release(50)
+        await third
+        assert (budget.sends, budget.bytes) == (2, 11)
+
+    asyncio.run(run())
+
+
+def test_oversized_send_goes_alone_and_cancelled_waiters_leave():
+    async def run():
+        budget = SendBudget(max_bytes=10)
+        await budget.acquire(1000)
+        assert (budget.sends, budget.bytes) == (1, 1000)
+        waiter = asyncio.create_task(budget.acquire(5))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert not budget.waiting
+        budget.release(1000)
+        assert (budget.sends, budget.bytes) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_room_is_handed_to_a_send_on_another_event_loop():
+    budget = SendBudget(max_sends=1)
+    acquired = threading.Event()
+
+    async def hold_then_release(started):
+        await budget.acquire(1)
+        started.set()
+        await asyncio.sleep(0.1)
+        budget.release(1)
+
+    async def wait_for_room():
+        await budget.acquire(1)
+        acquired.set()
+        budget.release(1)
+
+    started = threading.Event()
+    holder = threading.Thread(target=lambda: asyncio.run(hold_then_release(started)))
+    holder.start()
+    started.wait(1)
+    asyncio.run(asyncio.wait_for(wait_for_room(), 1))
+    holder.join()
+    assert acquired.is_set()
+    assert (budget.sends, budget.bytes) == (0, 0)
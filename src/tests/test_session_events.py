@@ -0,0 +1,99 @@
+import json
+import sys
+import threading
+
+import pytest
+
+from server.server_job_queue import FINISHED, JobQueue
+from server.server_manager import FlotillaServerManager
+from server.server_session_manager import FloSessionManager
+from server.server_state_manager import StateManager
+from utils.logger import FedLogger
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # flo_server parses the command line when it is imported
+    monkeypatch.setattr(sys, "argv", ["flo_server"])
+    import flo_server
+
+    manager = FlotillaServerManager.__new__(FlotillaServerManager)
+    manager.logger = FedLogger(id="0", loggername="SERVER_MANAGER")
+    manager.sessions = dict()
+    manager.sessions_lock = threading.Lock()
+    manager.jobs = JobQueue(StateManager("inmemory", "job_queue", None, None))
+    monkeypatch.setattr(flo_server, "flo_server", manager, raising=False)
+    monkeypatch.setattr(flo_server, "sse_poll_s", 0.01)
+    return flo_server, manager
+
+
+def start_session(manager, id, rounds):
+    session = FloSessionManager.__new__(FloSessionManager)
+    session.id = id
+    session.train_config = {"num_training_rounds": rounds}
+    session.training_session = StateManager("inmemory", "training_session", None, None)
+    session.training_session.put(f"{id}.last_round_number", 0)
+    manager.jobs.submit(id, {})
+    manager.jobs.start(id)
+    manager.sessions[id] = session
+    return session
+
+
+def validate(session, round_no):
+    session.training_session.series_append(
+        f"{session.id}.global_validation_metrics", round_no, {"accuracy": round_no}
+    )
+    session.training_session.put(f"{session.id}.last_round_number", round_no + 1)
+
+
+def end_session(manager, id):
+    # the order of FlotillaServerManager.run and flo_server.handle_request
+    manager.keep_progress(id)
+    manager.sessions.pop(id)
+    manager.jobs.finish(id, FINISHED)
+
+
+def parse(message):
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_stream_replays_a_finished_session(server):
+    flo_server, manager = server
+    session = start_session(manager, "s", 3)
+    for round_no in range(3):
+        validate(session, round_no)
+    end_session(manager, "s")
+
+    events = [parse(m) for m in flo_server.session_event_stream("s")]
+    assert [data["round_no"] for event, data in events if event == "metrics"] == [
+        0,
+        1,
+        2,
+    ]
+    assert events[-1][0] == "status" and events[-1][1]["status"] == FINISHED
+    assert "metrics" not in events[-1][1]
+    assert events[-1][1]["progress"]["metrics"] == [[2, {"accuracy": 2}]]
+
+    resumed = [parse(m) for m in flo_server.session_event_stream("s", next_round=2)]
+    assert [data["round_no"] for event, data in resumed if event == "metrics"] == [2]
+
+
+def test_metrics_of_the_last_round_come_before_the_final_status(server):
+    flo_server, manager = server
+    session = start_session(manager, "s", 2)
+    validate(session, 0)
+
+    stream = flo_server.session_event_stream("s")
+    events = [parse(next(stream)) for _ in range(3)]
+    assert [event for event, _ in events] == ["metrics", "progress", "status"]
+
+    # the last round is validated and the session leaves the registry
+    # between two polls of the stream
+    validate(session, 1)
+    end_session(manager, "s")
+
+    rest = [parse(m) for m in stream]
+    assert [event for event, _ in rest] == ["metrics", "progress", "status"]
+    assert rest[0][1] == {"round_no": 1, "metrics": {"accuracy": 1}}
+    assert rest[-1][1]["status"] == FINISHED
@@ -0,0 +1,59 @@
+import copy
+import threading
+import time
+
+import torch
+
+from server.server_model_manager import ServerModelManager
+
+
+class SlowModel(torch.nn.Module):
+    """Predicts class 0 or class 1 depending on its bias, one batch at a
+    time slowly enough for validations to overlap."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.linear = torch.nn.Linear(1, 2)
+
+    def forward(self, x):
+        time.sleep(0.02)
+        return self.linear(x)
+
+
+def weights_for(label):
+    bias = torch.zeros(2)
+    bias[label] = 1.0
+    return {"linear.weight": torch.zeros(2, 1), "linear.bias": bias}
+
+
+def make_manager():
+    manager = ServerModelManager.__new__(ServerModelManager)
+    manager.torch_device = torch.device("cpu")
+    manager.model = SlowModel()
+    manager.weights_lock = threading.Lock()
+    manager.validation_model = copy.deepcopy(manager.model)
+    manager.validation_lock = threading.Lock()
+    manager.use_custom_validator = False
+    manager.tensor_cache = False
+    manager.loss_fun = torch.nn.CrossEntropyLoss
+    # every sample is of class 0
+    manager.data = [(torch.ones(4, 1), torch.zeros(4, dtype=torch.long))] * 10
+    return manager
+
+
+def test_overlapping_snapshot_validations_keep_their_own_weights():
+    manager = make_manager()
+    results = dict()
+
+    def run(label):
+        results[label] = manager.validate_model(model_weights=weights_for(label))
+
+    threads = [threading.Thread(target=run, args=(label,)) for label in (0, 1)]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    assert results[0]["accuracy"] == 100.0
+    assert results[1]["accuracy"] == 0.0
@@ -0,0 +1,41 @@
+import pytest
+
+from server.server_state_manager import StateManager
+from server.state_manager import redis as redis_backend
+
+
+def test_series_indexes_may_repeat_but_not_go_back():
+    state = StateManager("inmemory", "ts", None, None)
+    assert state.series_append("c.metrics", 1, {"loss": 1.0})
+    assert state.series_append("c.metrics", 2, {"loss": 0.9})
+    assert state.series_append("c.metrics", 2, {"loss": 0.8})
+    assert not state.series_append("c.metrics", 1, {"loss": 2.0})
+    assert state.series_range("c.metrics") == [
+        (1, {"loss": 1.0}),
+        (2, {"loss": 0.9}),
+        (2, {"loss": 0.8}),
+    ]
+    assert state.pop_dirty_series() == {"c.metrics": 1}
+
+
+class Shard:
+    def __init__(self, version):
+        self.version = version
+
+    def info(self, section):
+        return {"redis_version": self.version}
+
+
+def test_redis_older_than_7_is_refused(monkeypatch):
+    monkeypatch.setattr(redis_backend, "checked_endpoints", set())
+    with pytest.raises(RuntimeError):
+        redis_backend.check_version(Shard("6.2.14"), "old:6379")
+    redis_backend.check_version(Shard("7.2.4"), "new:6379")
+    assert redis_backend.checked_endpoints == {"new:6379"}
+
+
+def test_state_managers_share_one_executor_per_shard_set():
+    endpoints = ["localhost:1", "localhost:2"]
+    first = redis_backend.shard_executor(endpoints)
+    assert redis_backend.shard_executor(list(endpoints)) is first
+    assert redis_backend.shard_executor(endpoints[:1]) is not first
@@ -0,0 +1,57 @@
+import numpy as np
+
+from server.clientselection.client_selection_fedat import init_tier_bookkeeping
+from server.clientselection.tiering import IncrementalTiering
+from server.server_state_manager import StateManager
+
+
+def make_state():
+    return StateManager("inmemory", "cs", None, None)
+
+
+def test_fit_numbers_tiers_from_fastest():
+    tiering = IncrementalTiering(make_state(), num_tiers=2)
+    tiering.fit({"a": 1.0, "b": 1.1, "c": 10.0, "d": 10.5, "e": np.nan})
+    assert tiering.num_tiers == 2
+    assert sorted(tiering.tier_members(0)) == ["a", "b"]
+    assert sorted(tiering.tier_members(1)) == ["c", "d"]
+    assert "e" not in tiering.client_to_tier
+
+
+def test_update_places_new_client_in_nearest_tier_and_persists():
+    state = make_state()
+    tiering = IncrementalTiering(state, num_tiers=2, drift_threshold=0.5)
+    tiering.fit({"a": 1.0, "b": 1.2, "c": 10.0, "d": 10.4})
+    assert not tiering.update({"e": 9.8, "f": np.nan})
+    assert tiering.client_to_tier["e"] == 1
+    assert "f" not in tiering.client_to_tier
+
+    restored = IncrementalTiering(state, num_tiers=2)
+    assert restored.client_to_tier == tiering.client_to_tier
+    assert restored.stats["count"] == [2, 3]
+
+
+def test_remove_and_drift_recluster():
+    tiering = IncrementalTiering(make_state(), num_tiers=2, drift_threshold=0.05)
+    tiering.fit({"a": 1.0, "b": 1.1, "c": 10.0})
+    assert not tiering.remove(["x"])
+    # a client far from both centroids spreads the tiers and forces a refit
+    assert tiering.update({"b": 30.0})
+    assert tiering.client_to_tier["b"] == 1
+    assert tiering.client_to_tier["c"] == 0
+
+
+def test_dropped_tier_is_kept_while_its_clients_train():
+    session = StateManager("inmemory", "ts", None, None)
+    session.put("s.global_model", {"w": 0})
+    aggregate = StateManager("inmemory", "ag", None, None)
+    selection = make_state()
+    init_tier_bookkeeping(3, "s", session, aggregate, selection)
+    selection.put("selected_clients_tier_2", ["slow"])
+
+    init_tier_bookkeeping(2, "s", session, aggregate, selection)
+    assert selection.get("num_tiers") == 3
+
+    selection.put("selected_clients_tier_2", [])
+    init_tier_bookkeeping(2, "s", session, aggregate, selection)
+    assert selection.get("num_tiers") == 2
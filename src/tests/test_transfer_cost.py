@@ -0,0 +1,48 @@
+import numpy as np
+
+from server.clientselection.transfer_cost import transfer_bytes, transfer_preference
+from server.server_state_manager import StateManager
+
+
+def make_states():
+    client_info = StateManager("inmemory", "ci", None, None)
+    training_state = StateManager("inmemory", "ts", None, None)
+    training_session = StateManager("inmemory", "tss", None, None)
+    client_info.put("cached.models", {"m": "hash"})
+    client_info.put("fresh.models", {})
+    training_session.put(
+        "s.model_transfer",
+        {
+            "model_id": "m",
+            "model_hash": "hash",
+            "model_bytes": 10,
+            "weights_bytes": 1000,
+            "version": 3,
+        },
+    )
+    return client_info, training_state, training_session
+
+
+def test_weights_are_charged_to_every_client():
+    client_info, training_state, training_session = make_states()
+    sizes = transfer_bytes(
+        ["cached", "fresh"],
+        client_info,
+        training_state,
+        training_session.get("s.model_transfer"),
+    )
+    assert list(sizes) == [1000.0, 1010.0]
+
+
+def test_preference_favours_cached_model_files_only_slightly():
+    client_info, training_state, training_session = make_states()
+    preference = transfer_preference(
+        ["cached", "fresh"],
+        client_info,
+        training_state,
+        training_session,
+        "s",
+        args={"transfer_cost_weight": 1.0},
+    )
+    assert preference[0] > preference[1]
+    assert np.isclose(preference[0] / preference[1], np.exp(10 / 1010))
@@ -0,0 +1,77 @@
+import asyncio
+
+import grpc
+
+from server.server_session_manager import FloSessionManager
+
+State = grpc.ChannelConnectivity
+
+
+class FakeChannel:
+    def __init__(self, state):
+        self.state = state
+        self.changed = asyncio.Event()
+
+    def get_state(self, try_to_connect=False):
+        return self.state
+
+    async def wait_for_state_change(self, state):
+        while self.state == state:
+            self.changed.clear()
+            await self.changed.wait()
+
+    def set_state(self, state):
+        self.state = state
+        self.changed.set()
+
+
+def make_session(grace):
+    session = FloSessionManager.__new__(FloSessionManager)
+    session.channel_failure_grace_s = grace
+    session.failed = list()
+    session.fail_client = lambda client_id, reason: session.failed.append(reason)
+    return session
+
+
+def test_channel_that_reconnects_within_the_grace_period_is_kept():
+    async def run():
+        session = make_session(grace=0.5)
+        channel = FakeChannel(State.READY)
+        watcher = asyncio.create_task(session.watch_channel("c", channel))
+        await asyncio.sleep(0.05)
+        channel.set_state(State.TRANSIENT_FAILURE)
+        await asyncio.sleep(0.1)
+        channel.set_state(State.CONNECTING)
+        await asyncio.sleep(0.1)
+        channel.set_state(State.READY)
+        await asyncio.sleep(0.6)
+        assert session.failed == []
+        watcher.cancel()
+
+    asyncio.run(run())
+
+
+def test_channel_broken_past_the_grace_period_fails_the_client():
+    async def run():
+        session = make_session(grace=0.2)
+        channel = FakeChannel(State.READY)
+        watcher = asyncio.create_task(session.watch_channel("c", channel))
+        await asyncio.sleep(0.05)
+        channel.set_state(State.TRANSIENT_FAILURE)
+        await asyncio.sleep(0.1)
+        channel.set_state(State.CONNECTING)
+        await asyncio.sleep(0.05)
+        channel.set_state(State.TRANSIENT_FAILURE)
+        await asyncio.wait_for(watcher, 1)
+        assert session.failed == ["channel_transient_failure"]
+
+    asyncio.run(run())
+
+
+def test_shut_down_channel_fails_the_client_at_once():
+    async def run():
+        session = make_session(grace=10)
+        await session.watch_channel("c", FakeChannel(State.SHUTDOWN))
+        assert session.failed == ["channel_shutdown"]
+
+    asyncio.run(run())
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import subprocess
 
 
@@ -34,5 +36,17 @@ def get_hardware_info():
     return hardware_info
 
 
+def hardware_fingerprint(hardware_info: dict) -> str:
+    """Digest of what get_hardware_info reported, equal for devices of the
+    same make. None if nothing about the hardware is known."""
+    if not hardware_info or not any(
+        value for key, value in hardware_info.items() if key != "cuda_available"
+    ):
+        return None
+    return hashlib.sha256(
+        json.dumps(hardware_info, sort_keys=True).encode()
+    ).hexdigest()
+
+
 if __name__ == "__main__":
     print(get_hardware_info())
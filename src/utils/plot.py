@@ -9,9 +9,19 @@ import numpy as np
 
 
 class Plot:
-    def __init__(self, log_name) -> None:
+    def __init__(self, log_name, metrics_series=None, stop_event=None) -> None:
+        """
+        Plots global accuracy and loss against the round number every 10s.
+
+        If "metrics_series" is given it is called to fetch the global validation
+        metrics as [(round_no, {"accuracy": .., "loss": ..}), ..] from the state
+        store and plotting stops once "stop_event" is set. Otherwise the metrics
+        are parsed back out of the session log.
+        """
         self.id = log_name
         self.session_log_name = f"/home/fedml/fedml-ng/logs/flotilla_{log_name}.log"
+        self.metrics_series = metrics_series
+        self.stop_event = stop_event if stop_event else Event()
         self.colors = [
             [1.0, 0.31994636, 0.11065268, 1.0],
             [0.6627451, 0.8505867, 0.53165947, 1.0],
@@ -21,6 +31,13 @@ class Plot:
         plot_thread.start()
 
     def plot(self) -> None:
+        if self.metrics_series is not None:
+            while not self.stop_event.wait(10):
+                self.plot_series_vs_accuracy()
+            self.plot_series_vs_accuracy()
+            print("STOPPING PLOTTER")
+            return
+
         sleep = Event()
         while not sleep.is_set():
             df = parse_log_file(self.session_log_name)
@@ -52,7 +69,20 @@ class Plot:
             return
 
         round_numbers = np.arange(0, rounds + 1)
+        self.draw(round_numbers, acc, loss)
+
+    def plot_series_vs_accuracy(self) -> None:
+        points = self.metrics_series()
+        if len(points) < 2:
+            return
+
+        round_numbers = [round_no for round_no, _ in points]
+        acc = [float(metrics["accuracy"]) for _, metrics in points]
+        loss = [float(metrics["loss"]) for _, metrics in points]
+        self.draw(round_numbers, acc, loss)
 
+    def draw(self, round_numbers, acc, loss) -> None:
+        rounds = round_numbers[-1]
         fig, ax1 = plt.subplots()
         ax1.set_xlim(0, rounds)
         ax1.set_ylim(0, 100)